@@ -0,0 +1,451 @@
+"""Pluggable cache backends shared by upstream fetching and scoring"""
+
+import asyncio
+import hashlib
+import json
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from .config import CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_REDIS_URL, CACHE_RETRY_INTERVAL
+from .series import DailySeries
+
+
+class RedisError(Exception):
+    """Error reply or protocol failure from a Redis-protocol server"""
+
+
+def _encode(value):
+    """Tag the types plain JSON can't round-trip (tuples, DailySeries)"""
+    if isinstance(value, DailySeries):
+        return {"__series__": value.to_dict()}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    return value
+
+
+def _decode_object(obj: dict):
+    if "__series__" in obj:
+        return DailySeries.from_dict(obj["__series__"])
+    if "__tuple__" in obj:
+        return tuple(obj["__tuple__"])
+    return obj
+
+
+def dumps(value) -> bytes:
+    """
+    Serialize a cache value for a shared store.
+
+    Plain JSON (plus tagged tuples and DailySeries) rather than pickle, so
+    whoever can write to the shared store can't make workers run code.
+    """
+    return json.dumps(_encode(value), separators=(",", ":")).encode()
+
+
+def loads(blob: bytes):
+    return json.loads(blob, object_hook=_decode_object)
+
+
+# Failures of a shared store that degrade it to a miss, not an error
+CACHE_ERRORS = (OSError, sqlite3.Error, RedisError, ValueError, TypeError)
+
+
+class CacheBackend:
+    """
+    Base class for a bounded key/value cache namespace.
+
+    Keys are any repr-stable values (tuples of str/float/int/bool/None).
+    Shared stores hold values serialized with dumps(): JSON-compatible
+    data, tuples and DailySeries. Backends evict the least recently used
+    entries beyond `max_entries`.
+
+    A failing shared store (database locked, Redis down) behaves like a
+    miss, never like an error, and is then bypassed for
+    CACHE_RETRY_INTERVAL seconds: lookups go to an in-process fallback
+    instead of waiting on the store again. From async code use aget/aset,
+    which keep a shared store's blocking I/O off the event loop.
+    """
+
+    backend_name = "base"
+    # Whether get/set block on I/O (and so belong in a worker thread)
+    blocking = False
+
+    def __init__(self, namespace: str, max_entries: int):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._down_until = 0.0
+        self._fallback: OrderedDict | None = None
+        self._fallback_lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for `key` (marking it recently used) or `default`"""
+        if self.degraded:
+            found, value = self._fallback_get(key)
+        else:
+            try:
+                found, value = self._get(key)
+            except CACHE_ERRORS as e:
+                self._report_error("get", e)
+                found, value = False, None
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        """Store `value`, evicting the oldest entries beyond `max_entries`"""
+        if self.degraded:
+            self._fallback_set(key, value)
+            return
+        try:
+            self._set(key, value)
+        except CACHE_ERRORS as e:
+            self._report_error("set", e)
+            self._fallback_set(key, value)
+
+    def delete(self, key):
+        if self._fallback is not None:
+            with self._fallback_lock:
+                self._fallback.pop(key, None)
+        if self.degraded:
+            return
+        try:
+            self._delete(key)
+        except CACHE_ERRORS as e:
+            self._report_error("delete", e)
+
+    async def aget(self, key, default=None):
+        """get() without blocking the event loop"""
+        if not self.blocking or self.degraded:
+            return self.get(key, default)
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key, value):
+        """set() without blocking the event loop"""
+        if not self.blocking or self.degraded:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    @property
+    def degraded(self) -> bool:
+        """True while a recently failed store is being bypassed"""
+        return time.monotonic() < self._down_until
+
+    def _fallback_get(self, key) -> tuple[bool, object]:
+        with self._fallback_lock:
+            if self._fallback is None or key not in self._fallback:
+                return False, None
+            self._fallback.move_to_end(key)
+            return True, self._fallback[key]
+
+    def _fallback_set(self, key, value):
+        with self._fallback_lock:
+            if self._fallback is None:
+                self._fallback = OrderedDict()
+            self._fallback[key] = value
+            self._fallback.move_to_end(key)
+            while len(self._fallback) > self.max_entries:
+                self._fallback.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counts for this worker process"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend_name,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "degraded": self.degraded,
+        }
+
+    def _report_error(self, op: str, error: Exception):
+        self.errors += 1
+        self._down_until = time.monotonic() + CACHE_RETRY_INTERVAL
+        print(f"⚠️ Cache {self.backend_name}:{self.namespace} {op} failed, "
+              f"using an in-process fallback for {CACHE_RETRY_INTERVAL:.0f}s: {error}")
+
+    def _key_id(self, key) -> str:
+        """Stable string id for a key, usable across processes"""
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _get(self, key) -> tuple[bool, object]:
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU; fastest, but each worker has its own copy"""
+
+    backend_name = "memory"
+
+    def __init__(self, namespace: str, max_entries: int):
+        super().__init__(namespace, max_entries)
+        self._data = OrderedDict()
+
+    def _get(self, key):
+        if key not in self._data:
+            return False, None
+        self._data.move_to_end(key)
+        return True, self._data[key]
+
+    def _set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _delete(self, key):
+        self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "entries": len(self._data)}
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Shared-file store for workers on one host.
+
+    Uses WAL mode so readers don't block the writer; each namespace is
+    trimmed to `max_entries` by last access time.
+    """
+
+    backend_name = "sqlite"
+    blocking = True
+
+    def __init__(self, namespace: str, max_entries: int, path: str = CACHE_SQLITE_PATH):
+        super().__init__(namespace, max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+            " accessed REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed)")
+
+    def _get(self, key):
+        key_id = self._key_id(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key_id)
+            ).fetchone()
+            if row is None:
+                return False, None
+            self._conn.execute(
+                "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key_id)
+            )
+        return True, loads(row[0])
+
+    def _set(self, key, value):
+        blob = dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, accessed) VALUES (?, ?, ?, ?)",
+                (self.namespace, self._key_id(key), blob, time.time())
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ?"
+                " ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries)
+            ).rowcount
+        self.evictions += max(evicted, 0)
+
+    def _delete(self, key):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, self._key_id(key))
+            )
+
+    def stats(self) -> dict:
+        entries = None
+        if not self.degraded:
+            try:
+                with self._lock:
+                    entries = self._conn.execute(
+                        "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+                    ).fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return {**super().stats(), "entries": entries, "path": self.path}
+
+
+class RedisConnection:
+    """Minimal RESP2 client: enough for GET/SET/DEL and sorted sets"""
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", self.db)
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+    def execute(self, *args):
+        """Send one command and return its decoded reply (reconnecting once if needed)"""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._call(*args)
+                except OSError:
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+    def _call(self, *args):
+        payload = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            payload.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        self._sock.sendall(b"".join(payload))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise OSError("Connection closed by server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(body)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+
+class RedisBackend(CacheBackend):
+    """
+    Store shared by workers across hosts, over the Redis protocol.
+
+    Each namespace keeps a sorted set of last-access times so it can be
+    trimmed to `max_entries` independently of the server's own eviction.
+    """
+
+    backend_name = "redis"
+    blocking = True
+
+    def __init__(self, namespace: str, max_entries: int, url: str = CACHE_REDIS_URL,
+                 prefix: str = "bahalana"):
+        super().__init__(namespace, max_entries)
+        self.url = url
+        self._redis = RedisConnection(url)
+        self._prefix = f"{prefix}:{namespace}"
+        self._lru_key = f"{self._prefix}:lru"
+
+    def _get(self, key):
+        key_id = self._key_id(key)
+        blob = self._redis.execute("GET", f"{self._prefix}:{key_id}")
+        if blob is None:
+            return False, None
+        self._redis.execute("ZADD", self._lru_key, time.time(), key_id)
+        return True, loads(blob)
+
+    def _set(self, key, value):
+        key_id = self._key_id(key)
+        self._redis.execute("SET", f"{self._prefix}:{key_id}", dumps(value))
+        self._redis.execute("ZADD", self._lru_key, time.time(), key_id)
+        excess = self._redis.execute("ZCARD", self._lru_key) - self.max_entries
+        if excess > 0:
+            oldest = [k.decode() for k in self._redis.execute("ZRANGE", self._lru_key, 0, excess - 1)]
+            if oldest:
+                self._redis.execute("DEL", *(f"{self._prefix}:{k}" for k in oldest))
+                self._redis.execute("ZREM", self._lru_key, *oldest)
+                self.evictions += len(oldest)
+
+    def _delete(self, key):
+        key_id = self._key_id(key)
+        self._redis.execute("DEL", f"{self._prefix}:{key_id}")
+        self._redis.execute("ZREM", self._lru_key, key_id)
+
+    def stats(self) -> dict:
+        entries = None
+        if not self.degraded:
+            try:
+                entries = self._redis.execute("ZCARD", self._lru_key)
+            except (OSError, RedisError):
+                pass
+        return {**super().stats(), "entries": entries}
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "sqlite": SQLiteBackend,
+    "redis": RedisBackend,
+}
+
+_caches: dict[str, CacheBackend] = {}
+
+
+def get_cache(namespace: str, max_entries: int, backend: str | None = None) -> CacheBackend:
+    """
+    Get (or create) the cache for a namespace.
+
+    The backend comes from CACHE_BACKEND ("memory", "sqlite" or "redis")
+    unless given explicitly.
+    """
+    if namespace not in _caches:
+        name = backend or CACHE_BACKEND
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown cache backend '{name}' (choose from {', '.join(BACKENDS)})")
+        _caches[namespace] = BACKENDS[name](namespace, max_entries)
+    return _caches[namespace]
+
+
+def cache_stats() -> dict[str, dict]:
+    """Stats for every cache namespace created in this process"""
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
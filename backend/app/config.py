@@ -1,6 +1,7 @@
 """Configuration settings for BahaLa Na API"""
 
 import os
+import tempfile
 
 # API Endpoints
 CMR_SEARCH_URL = "https://cmr.earthdata.nasa.gov/search/granules.json"
@@ -17,3 +18,80 @@ DEFAULT_PAGE_SIZE = 20
 MAX_PAGE_SIZE = 100
 REQUEST_TIMEOUT = 60.0
 DOWNLOAD_TIMEOUT = 120.0
+
+# Upstream Resilience
+UPSTREAM_TIMEOUT = 30.0
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "2.0"))  # seconds before a duplicate request is sent
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before a host's circuit opens
+CIRCUIT_RESET_TIMEOUT = 30.0   # seconds an open circuit waits before letting a probe through
+
+# POWER Response Cache
+POWER_CACHE_SIZE = 512
+POWER_FRESH_TTL = 6 * 3600  # seconds a cached POWER response is served without refetching
+
+# Flood Risk Response Cache
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_FRESH_TTL = 15 * 60  # seconds before a recent-window response is revalidated in the background
+RECENT_WINDOW_DAYS = 7        # POWER backfills the last few days, so windows ending this recently can change
+
+# NASA POWER meteorology grid (MERRA-2) cell size in degrees
+POWER_CELL_LAT = 0.5
+POWER_CELL_LON = 0.625
+
+# Model Registry
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "ml", "models"))
+MODEL_POLL_INTERVAL = 30.0  # seconds between checks for new model versions
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))  # share of requests shadow-scored by a candidate
+
+# Cache Backend: "memory" (per worker), "sqlite" (shared file, one host) or "redis" (shared, any host)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "bahalana_cache.sqlite3"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+CACHE_RETRY_INTERVAL = 30.0  # seconds a failing shared cache is bypassed (in-process fallback) before retrying
+
+# Upstream Rate Limits: host -> (requests per second, burst)
+UPSTREAM_RATE_LIMITS = {
+    "power.larc.nasa.gov": (2.0, 5),
+    "cmr.earthdata.nasa.gov": (5.0, 10),
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+RETRY_AFTER_DEFAULT = 30.0  # seconds to back off a host on 429 without a Retry-After header
+
+# IMERG Range Aggregation
+IMERG_RANGE_CONCURRENCY = 4      # granules downloaded/reduced at once (bounds memory to a few granules)
+IMERG_RANGE_MAX_GRANULES = 400   # cap per request; longer ranges are truncated and flagged
+
+# Request Profiling (opt-in per request with the X-Profile header, or by sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.0"))  # share of requests profiled automatically
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")  # X-Profile and /api/debug/* require this value; unset disables both
+PROFILE_PATHS = ("/api/flood-risk",)        # path prefixes that may be profiled
+PROFILE_INTERVAL = 0.005                    # seconds between stack samples
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "bahalana_profiles"))
+PROFILE_MAX_FILES = 50                      # oldest profiles are deleted beyond this
+
+# Slow Request Log (JSON lines with per-stage timings and upstream calls)
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "2000"))
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", os.path.join(tempfile.gettempdir(), "bahalana_slow_requests.jsonl"))
+SLOW_REQUEST_LOG_MAX_BYTES = 5 * 1024 * 1024  # rotated to SLOW_REQUEST_LOG + ".1" beyond this
+SLOW_REQUEST_MAX_LIMIT = 1000                 # most entries /api/debug/slow-requests returns
+
+# Background Jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # jobs running at once per API worker
+JOB_MAX_QUEUED = 100                              # submissions beyond this are rejected with 503
+JOB_RESULT_TTL = 3600                             # seconds finished jobs (and their results) are kept
+JOB_MAX_LOCATIONS = 500                           # locations per batch flood-risk job
+JOB_MAX_YEARS = 30                                # years per multi-year flood-risk job
+
+# POWER Prefetcher (keeps the most requested cells and relative windows warm)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"  # off by default; spends upstream quota
+PREFETCH_INTERVAL = 30 * 60       # seconds between prefetch cycles
+PREFETCH_HALF_LIFE = 24 * 3600    # seconds for an access to lose half its weight
+PREFETCH_TOP_N = 20               # targets warmed per cycle
+PREFETCH_MIN_SCORE = 2.0          # decayed request count a target needs to be warmed
+PREFETCH_MAX_TRACKED = 2000       # tracked targets before the coldest are dropped
+PREFETCH_MAX_END_OFFSET = 7       # only windows ending within this many days of today are relative
+PREFETCH_CONCURRENCY = 2          # prefetch fetches in flight (still paced by the rate scheduler)
+
+# Window Summaries (many sub-ranges answered from one fetched series)
+WINDOW_SUMMARY_MAX_WINDOWS = 500   # windows per request
+WINDOW_SUMMARY_MAX_DAYS = 3660     # days spanned by all windows together (one POWER fetch)
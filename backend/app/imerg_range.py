@@ -0,0 +1,250 @@
+"""Streaming aggregation of IMERG granules over a date range into a daily series"""
+
+import asyncio
+import os
+import tempfile
+from collections import Counter
+from datetime import date, datetime
+from typing import Callable
+
+import numpy as np
+
+from .config import (
+    CMR_SEARCH_URL, IMERG_DATASET_NAME, IMERG_RANGE_CONCURRENCY, IMERG_RANGE_MAX_GRANULES
+)
+from .scheduler import INTERACTIVE
+from .series import DailySeries, parse_date
+from .upstream import UpstreamError, fetch_bytes, get_json
+from .utils import calculate_bbox_center, get_xarray
+
+PRECIP_VARIABLES = ("precipitationCal", "precipitation", "rainfall", "precip")
+DATA_LINK_TYPES = ("application/x-hdf", "application/x-netcdf", "application/octet-stream")
+CMR_PAGE_SIZE = 200
+IMERG_FILL_THRESHOLD = 0.0  # IMERG marks missing cells with large negative fill values
+
+
+def granule_download_url(granule: dict) -> str | None:
+    """Pick the data link of a CMR granule entry (falling back to any link)"""
+    links = granule.get("links", [])
+    for link in links:
+        href = link.get("href")
+        if href and ("data" in link.get("rel", "") or link.get("type", "") in DATA_LINK_TYPES):
+            return href
+    for link in links:
+        if link.get("href"):
+            return link.get("href")
+    return None
+
+
+def _granule_hours(granule: dict) -> float:
+    """Time span a granule covers, in hours rounded to the minute (24 for daily files)"""
+    try:
+        start = datetime.fromisoformat(granule["time_start"].replace("Z", "+00:00"))
+        end = datetime.fromisoformat(granule["time_end"].replace("Z", "+00:00"))
+    except (KeyError, ValueError):
+        return 24.0
+    return round((end - start).total_seconds() / 60) / 60 or 24.0
+
+
+def _depth_factor(units: str, hours: float) -> float:
+    """Multiplier turning a granule's values into an accumulated depth in mm"""
+    units = units.lower().replace(" ", "")
+    if units.endswith(("/hr", "/h", "/hour", "h-1")):
+        return hours
+    if units.endswith(("/day", "/d", "day-1", "d-1")):
+        return hours / 24
+    return 1.0  # already an accumulation over the granule
+
+
+def reduce_granule(content: bytes, suffix: str, bbox: str, hours: float) -> tuple[np.ndarray, str]:
+    """
+    Reduce one downloaded granule to its precipitation depth (mm) over a bbox.
+
+    Runs in a worker thread; the file only lives on disk while it's read.
+    Bboxes smaller than one grid cell use the nearest cell to the center.
+
+    Returns:
+        (flattened per-cell depths with NaN for missing cells, variable name)
+
+    Raises:
+        ValueError: If the granule has no known precipitation variable
+    """
+    xr = get_xarray()
+    min_lon, min_lat, max_lon, max_lat = map(float, bbox.split(","))
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        with xr.open_dataset(tmp_path) as ds:
+            name = next((v for v in PRECIP_VARIABLES if v in ds), None)
+            if name is None:
+                raise ValueError(f"No precipitation variable in granule (have {', '.join(ds.data_vars)})")
+            data = ds[name]
+            subset = data.sel(lat=slice(min_lat, max_lat), lon=slice(min_lon, max_lon))
+            if subset.size == 0:
+                center_lat, center_lon = calculate_bbox_center(bbox)
+                subset = data.sel(lat=center_lat, lon=center_lon, method="nearest")
+            values = np.asarray(subset.values, dtype=np.float64).ravel()
+            units = str(data.attrs.get("units", ""))
+    finally:
+        os.remove(tmp_path)
+
+    values[values < IMERG_FILL_THRESHOLD] = np.nan
+    return values * _depth_factor(units, hours), name
+
+
+async def search_granules(
+    start_date: str,
+    end_date: str,
+    bbox: str,
+    headers: dict | None = None,
+    max_granules: int = IMERG_RANGE_MAX_GRANULES,
+    priority: int = INTERACTIVE
+) -> tuple[list[dict], bool]:
+    """
+    Page through CMR for every IMERG granule in the range.
+
+    Returns:
+        (granule entries sorted by start time, True if capped at max_granules)
+    """
+    granules = []
+    page_num = 1
+    while True:
+        results = await get_json(CMR_SEARCH_URL, params={
+            "short_name": IMERG_DATASET_NAME,
+            "page_size": CMR_PAGE_SIZE,
+            "page_num": page_num,
+            "sort_key": "start_date",
+            "temporal": f"{start_date}T00:00:00Z/{end_date}T23:59:59Z",
+            "bounding_box": bbox,
+        }, headers=headers, priority=priority)
+        entries = results.get("feed", {}).get("entry", [])
+        granules.extend(entries)
+        if len(granules) >= max_granules:
+            return granules[:max_granules], True
+        if len(entries) < CMR_PAGE_SIZE:
+            return granules, False
+        page_num += 1
+
+
+async def aggregate_imerg_range(
+    start_date: str,
+    end_date: str,
+    bbox: str,
+    authorization: str,
+    concurrency: int = IMERG_RANGE_CONCURRENCY,
+    max_granules: int = IMERG_RANGE_MAX_GRANULES,
+    priority: int = INTERACTIVE,
+    on_progress: Callable[[int, int], None] | None = None
+) -> tuple[DailySeries, dict]:
+    """
+    Download every granule in a date range and build a daily bbox series.
+
+    At most `concurrency` granules are downloaded or being reduced at any
+    time, and each is reduced to per-cell depths as soon as it arrives.
+    Per-day grids are summed and closed out once all of that day's
+    granules are in, so memory stays at a few granules plus the open days.
+
+    Args:
+        start_date, end_date: Inclusive range (YYYY-MM-DD)
+        bbox: "minLon,minLat,maxLon,maxLat"
+        authorization: Earthdata "Bearer <token>" header value
+        concurrency: Maximum granules in flight
+        max_granules: Cap on granules processed
+        priority: Scheduler priority class for the upstream calls
+        on_progress: Called with (granules finished, granules planned) after each one
+
+    Returns:
+        (series, summary). The series has IMERG_PRECIP (bbox mean, mm/day),
+        IMERG_PRECIP_MAX (wettest cell, mm/day) and IMERG_HOURS (hours of
+        data that made it in), NaN on days without data. Granules whose
+        grid doesn't match the rest of their day are left out and counted
+        in the summary's granules_skipped.
+
+    Raises:
+        ValueError: If the range is reversed or ends in the future
+        UpstreamError: If the search fails or no granule could be processed
+    """
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if end < start or end > date.today():
+        raise ValueError(f"Invalid IMERG range {start_date} to {end_date} (must be ordered and not in the future)")
+    headers = {"Authorization": authorization}
+    granules, truncated = await search_granules(start_date, end_date, bbox, headers, max_granules, priority)
+
+    n_days = (end - start).days + 1
+    mean_precip = np.full(n_days, np.nan)
+    max_precip = np.full(n_days, np.nan)
+    hours_covered = np.full(n_days, np.nan)
+
+    plan = []
+    for granule in granules:
+        url = granule_download_url(granule)
+        if not url or not granule.get("time_start"):
+            continue
+        day = (parse_date(granule["time_start"][:10]) - start).days
+        if 0 <= day < n_days:
+            plan.append((granule, url, day, _granule_hours(granule)))
+    pending = Counter(day for _, _, day, _ in plan)
+    open_days: dict[int, tuple[np.ndarray | None, float]] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {"granules_found": len(granules), "granules_processed": 0, "granules_failed": 0,
+               "granules_skipped": 0, "truncated": truncated, "variable": None, "errors": []}
+
+    async def process(granule: dict, url: str, day: int, hours: float):
+        async with semaphore:
+            try:
+                content = await fetch_bytes(url, headers=headers, priority=priority)
+                suffix = os.path.splitext(url)[1] or ".h5"
+                depths, name = await asyncio.to_thread(reduce_granule, content, suffix, bbox, hours)
+                return day, hours, depths, name, None
+            except (UpstreamError, ValueError, OSError) as e:
+                return day, hours, None, None, f"{granule.get('id')}: {e}"
+
+    def close_day(day: int):
+        grid, hours = open_days.pop(day)
+        if grid is None or np.isnan(grid).all():
+            return
+        mean_precip[day] = np.nanmean(grid)
+        max_precip[day] = np.nanmax(grid)
+        hours_covered[day] = hours
+
+    for next_done in asyncio.as_completed([process(*item) for item in plan]):
+        day, hours, depths, name, error = await next_done
+        grid, covered = open_days.get(day, (None, 0.0))
+        if error is None and grid is not None and grid.shape != depths.shape:
+            # A different grid than the day's other granules can't be summed cell by cell
+            summary["granules_skipped"] += 1
+            error = f"granule for day {day + 1} has grid shape {depths.shape}, expected {grid.shape}"
+            if len(summary["errors"]) < 5:
+                summary["errors"].append(error)
+        elif error is None:
+            grid = depths if grid is None else np.where(np.isnan(grid), depths, grid + np.nan_to_num(depths))
+            covered += hours
+            summary["granules_processed"] += 1
+            summary["variable"] = name
+        else:
+            summary["granules_failed"] += 1
+            if len(summary["errors"]) < 5:
+                summary["errors"].append(error)
+        open_days[day] = (grid, covered)
+        pending[day] -= 1
+        if pending[day] == 0:
+            close_day(day)
+        if on_progress is not None:
+            finished = summary["granules_processed"] + summary["granules_failed"] + summary["granules_skipped"]
+            on_progress(finished, len(plan))
+
+    if plan and not summary["granules_processed"]:
+        raise UpstreamError(f"No IMERG granule could be processed ({summary['errors'][0]})")
+
+    series = DailySeries(
+        start,
+        {
+            "IMERG_PRECIP": np.round(mean_precip, 2),
+            "IMERG_PRECIP_MAX": np.round(max_precip, 2),
+            "IMERG_HOURS": np.round(hours_covered, 2),
+        },
+        meta={"source": "IMERG", "dataset": IMERG_DATASET_NAME, "bbox": bbox, "units": "mm/day"}
+    )
+    return series, summary
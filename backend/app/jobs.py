@@ -0,0 +1,246 @@
+"""In-process background jobs with progress events, deduplication and result TTL"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from .config import JOB_MAX_QUEUED, JOB_RESULT_TTL, JOB_WORKERS
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already waiting to run"""
+
+
+class Job:
+    """
+    One submitted analysis: its parameters, progress, partial and final results.
+    Partial results are dropped once the job succeeds, since the final
+    result contains them.
+
+    Every change bumps `version` and wakes subscribers, which is what the
+    Server-Sent Events stream follows.
+    """
+
+    def __init__(self, kind: str, params: dict, key: str, secrets: dict | None = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.secrets = secrets or {}  # e.g. Authorization; never serialized
+        self.key = key
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.partial_results: list = []
+        self.result = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.version = 0
+        self._updated = asyncio.Event()
+
+    def report(self, done: int, total: int | None = None, partial=None):
+        """Record progress (and optionally one partial result) from a running job"""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if partial is not None:
+            self.partial_results.append(partial)
+        self._publish()
+
+    def _publish(self):
+        self.version += 1
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_for_update(self, since_version: int, timeout: float):
+        """Wait until `version` moves past `since_version` (or the timeout passes)"""
+        if self.version != since_version:
+            return
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def expired(self, now: float) -> bool:
+        return self.finished_at is not None and now - self.finished_at > JOB_RESULT_TTL
+
+    def status_dict(self) -> dict:
+        """Everything except partial and final results"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.finished_at + JOB_RESULT_TTL if self.finished_at else None,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.status_dict(),
+            "params": self.params,
+            "partial_results": self.partial_results,
+            "result": self.result,
+        }
+
+
+JobRunner = Callable[[dict, Job], Awaitable[object]]
+
+
+def job_key(kind: str, params: dict, secrets: dict | None = None) -> str:
+    """Identity of a job for deduplication: kind, canonical parameters and credentials"""
+    canonical = json.dumps(
+        {"kind": kind, "params": params, "secrets": secrets or {}}, sort_keys=True, default=str
+    )
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class JobManager:
+    """
+    Runs registered job kinds on a bounded pool of asyncio workers.
+
+    Submitting a job identical to one that is queued, running or finished
+    within JOB_RESULT_TTL returns the existing job instead of a new one;
+    failed jobs are not reused. Jobs live in this process only.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED):
+        self.workers = workers
+        self.runners: dict[str, JobRunner] = {}
+        self._jobs: dict[str, Job] = {}
+        self._by_key: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._max_queued = max_queued
+        self._worker_tasks: list[asyncio.Task] = []
+
+    def register(self, kind: str, runner: JobRunner):
+        """Make a job kind available; `runner(params, job)` returns the final result"""
+        self.runners[kind] = runner
+
+    def submit(self, kind: str, params: dict, secrets: dict | None = None) -> tuple[Job, bool]:
+        """
+        Queue a job, or return the matching existing one.
+
+        Jobs only match when submitted with the same `secrets`, so results
+        fetched with one caller's credentials aren't handed to another.
+
+        Returns:
+            (job, deduplicated)
+
+        Raises:
+            KeyError: Unknown job kind
+            JobQueueFullError: Too many jobs already waiting
+        """
+        if kind not in self.runners:
+            raise KeyError(kind)
+        self._expire()
+        key = job_key(kind, params, secrets)
+        existing = self._by_key.get(key)
+        if existing is not None and existing.status != FAILED:
+            return existing, True
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._max_queued)
+        job = Job(kind, params, key, secrets)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"{self._queue.qsize()} jobs already waiting")
+        self._jobs[job.id] = job
+        self._by_key[key] = job
+        return job, False
+
+    def get(self, job_id: str) -> Job | None:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def _expire(self):
+        now = time.time()
+        for job in [j for j in self._jobs.values() if j.expired(now)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            job._publish()
+            try:
+                job.result = await self.runners[job.kind](job.params, job)
+                job.status = SUCCEEDED
+                job.partial_results = []  # the result holds them all; don't keep two copies
+            except asyncio.CancelledError:
+                job.status = FAILED
+                job.error = "Cancelled (server shutting down)"
+                raise
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e) or e.__class__.__name__
+                print(f"⚠️ Job {job.id} ({job.kind}) failed: {job.error}")
+            finally:
+                job.finished_at = time.time()
+                job._publish()
+                self._queue.task_done()
+
+    def start(self):
+        """Start the worker pool (call from the running event loop)"""
+        if self._worker_tasks:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._max_queued)
+        self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": counts,
+        }
+
+
+async def job_events(job: Job, keepalive: float = 15.0):
+    """
+    Server-Sent Events for a job: `status` on every change, one `partial`
+    per new partial result, and a final `done` carrying the whole job.
+    """
+    sent_partials = 0
+    version = -1
+    while True:
+        if job.version != version:
+            version = job.version
+            for partial in job.partial_results[sent_partials:]:
+                yield f"event: partial\ndata: {json.dumps(partial, default=str)}\n\n"
+            sent_partials = len(job.partial_results)
+            if job.status in FINISHED_STATES:
+                yield f"event: done\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                return
+            yield f"event: status\ndata: {json.dumps(job.status_dict())}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+        await job.wait_for_update(version, keepalive)
+
+
+jobs = JobManager()
@@ -0,0 +1,327 @@
+"""Versioned, hot-reloadable flood model registry"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .config import MODEL_DIR, MODEL_POLL_INTERVAL, SHADOW_SAMPLE_RATE
+
+# Optional imports for ML inference (see requirements-ml.txt)
+try:
+    import joblib  # type: ignore
+    from ml.feature_engineering import create_prediction_features, select_feature_columns
+    HAS_ML = True
+except Exception:
+    joblib = None
+    HAS_ML = False
+
+MODEL_FILE = "flood_model.pkl"
+METADATA_FILE = "flood_model.json"
+BASELINE_VERSION = "baseline"
+
+
+class ModelCompatibilityError(Exception):
+    """Raised when a model artifact doesn't match the API's feature pipeline"""
+
+
+class ModelVersion:
+    """A loaded model artifact together with its training metadata"""
+
+    def __init__(self, version: str, path: Path, model, metadata: dict, fingerprint: tuple):
+        self.version = version
+        self.path = path
+        self.model = model
+        self.metadata = metadata
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+
+    def predict_proba(self, features) -> float:
+        """Flood probability for a single-row feature frame"""
+        return float(self.model.predict_proba(features)[0, 1])
+
+    def summary(self) -> dict:
+        return {
+            "version": self.version,
+            "model_type": self.metadata.get("model_type"),
+            "train_date": self.metadata.get("train_date"),
+            "test_f1_score": self.metadata.get("test_f1_score"),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ShadowStats:
+    """Running comparison of a candidate model against the active one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.agreements = 0
+        self.abs_diff_total = 0.0
+        self.active_ms_total = 0.0
+        self.candidate_ms_total = 0.0
+
+    def record(self, active_prob: float, candidate_prob: float, active_ms: float, candidate_ms: float):
+        # Called from executor threads
+        with self._lock:
+            self.samples += 1
+            self.agreements += int((active_prob >= 0.5) == (candidate_prob >= 0.5))
+            self.abs_diff_total += abs(active_prob - candidate_prob)
+            self.active_ms_total += active_ms
+            self.candidate_ms_total += candidate_ms
+
+    def report(self) -> dict:
+        with self._lock:
+            samples, agreements, abs_diff_total = self.samples, self.agreements, self.abs_diff_total
+            active_ms_total, candidate_ms_total = self.active_ms_total, self.candidate_ms_total
+        if not samples:
+            return {"samples": 0}
+        active_ms = active_ms_total / samples
+        candidate_ms = candidate_ms_total / samples
+        return {
+            "samples": samples,
+            "agreement_rate": agreements / samples,
+            "mean_abs_probability_diff": abs_diff_total / samples,
+            "active_latency_ms": round(active_ms, 3),
+            "candidate_latency_ms": round(candidate_ms, 3),
+            "latency_overhead_ms": round(candidate_ms - active_ms, 3),
+        }
+
+
+class ModelRegistry:
+    """
+    Loads versioned model artifacts and swaps the active one atomically.
+
+    Layout under `model_dir`:
+        flood_model.pkl / flood_model.json              -> version "baseline"
+        versions/<version>/flood_model.pkl + .json      -> version "<version>"
+
+    The newest version (by the train_date in its metadata, else the model
+    file's mtime) becomes active unless one is pinned.
+    Requests read `registry.active` once and keep that reference, so a
+    swap never affects a request already in flight.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, shadow_sample_rate: float = SHADOW_SAMPLE_RATE):
+        self.model_dir = Path(model_dir)
+        self.shadow_sample_rate = shadow_sample_rate
+        self.active: ModelVersion | None = None
+        self.candidate: ModelVersion | None = None
+        self.pinned: str | None = None
+        self.shadow_stats = ShadowStats()
+        self.last_error: str | None = None
+        self._lock = threading.Lock()
+        self._watcher: asyncio.Task | None = None
+
+    def available_versions(self) -> dict[str, Path]:
+        """Version name -> artifact directory, oldest first (see _trained_at)"""
+        versions = {}
+        if (self.model_dir / MODEL_FILE).exists():
+            versions[BASELINE_VERSION] = self.model_dir
+        versions_dir = self.model_dir / "versions"
+        if versions_dir.is_dir():
+            for path in versions_dir.iterdir():
+                if (path / MODEL_FILE).exists():
+                    versions[path.name] = path
+        ordered = sorted(versions.items(), key=lambda item: (self._trained_at(item[1]), item[0]))
+        return dict(ordered)
+
+    def latest_version(self) -> str | None:
+        """Name of the newest available version"""
+        versions = self.available_versions()
+        return list(versions)[-1] if versions else None
+
+    @staticmethod
+    def _trained_at(path: Path) -> float:
+        """
+        When a version was trained, as a timestamp.
+
+        Version names mix hand-picked names and timestamps, so they can't
+        be ordered by name; the metadata train_date is used, falling back
+        to the model file's mtime.
+        """
+        try:
+            with open(path / METADATA_FILE) as f:
+                return datetime.fromisoformat(json.load(f)["train_date"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return (path / MODEL_FILE).stat().st_mtime
+
+    def load_version(self, version: str) -> ModelVersion:
+        """
+        Load and validate one version.
+
+        Raises:
+            KeyError: Unknown version
+            ModelCompatibilityError: Metadata is missing or its feature_columns
+                                     don't match the API
+        """
+        if not HAS_ML:
+            raise ImportError("ML dependencies are not installed (see requirements-ml.txt)")
+        path = self.available_versions()[version]
+        model_file = path / MODEL_FILE
+        metadata_file = path / METADATA_FILE
+
+        if not metadata_file.exists():
+            raise ModelCompatibilityError(f"Model {version} has no {METADATA_FILE}, so its features can't be checked")
+        with open(metadata_file) as f:
+            metadata = json.load(f)
+        expected = select_feature_columns()
+        if metadata.get("feature_columns") != expected:
+            raise ModelCompatibilityError(
+                f"Model {version} was trained on different feature_columns than the API produces"
+            )
+
+        model = joblib.load(model_file)
+        n_features = getattr(model, "n_features_in_", len(expected))
+        if n_features != len(expected):
+            raise ModelCompatibilityError(
+                f"Model {version} expects {n_features} features, API produces {len(expected)}"
+            )
+        return ModelVersion(version, path, model, metadata, self._fingerprint(path))
+
+    @staticmethod
+    def _fingerprint(path: Path) -> tuple:
+        files = [path / MODEL_FILE, path / METADATA_FILE]
+        return tuple(f.stat().st_mtime_ns if f.exists() else None for f in files)
+
+    def refresh(self) -> bool:
+        """
+        Activate the pinned or newest version if it changed on disk.
+
+        Loading happens before the swap, so requests keep using the old
+        model until the new one is fully ready. Incompatible or broken
+        artifacts are skipped and reported in `last_error`.
+
+        Returns:
+            True if the active model changed
+        """
+        with self._lock:
+            versions = self.available_versions()
+            if not versions:
+                return False
+            target = self.pinned if self.pinned in versions else list(versions)[-1]
+            current = self.active
+            if current and current.version == target and current.fingerprint == self._fingerprint(versions[target]):
+                return False
+            try:
+                loaded = self.load_version(target)
+            except Exception as e:
+                self.last_error = f"{target}: {e}"
+                print(f"⚠️ Model {target} not activated: {e}")
+                return False
+            self.active = loaded
+            self.last_error = None
+            print(f"✅ Active flood model: {target}")
+            return True
+
+    def set_candidate(self, version: str | None):
+        """Shadow-score `version` on a sample of traffic (None stops shadowing)"""
+        with self._lock:
+            self.candidate = self.load_version(version) if version else None
+            self.shadow_stats = ShadowStats()
+
+    def promote_candidate(self) -> ModelVersion:
+        """Make the shadow candidate the active model and pin it"""
+        with self._lock:
+            if self.candidate is None:
+                raise ValueError("No candidate model to promote")
+            self.active, self.candidate = self.candidate, None
+            self.pinned = self.active.version
+            return self.active
+
+    def active_version(self) -> str | None:
+        active = self.active
+        return active.version if active else None
+
+    def active_tag(self) -> str | None:
+        """
+        Active version plus its artifacts' mtimes.
+
+        Retraining can rewrite a version's files in place (e.g. "baseline"),
+        so anything cached per model must key on this, not the name alone.
+        """
+        active = self.active
+        if active is None:
+            return None
+        return f"{active.version}@" + "-".join(str(t) for t in active.fingerprint)
+
+    async def predict(self, precipitation, temperature, humidity, wind_speed, dates) -> dict | None:
+        """
+        Score the latest day of a daily series with the active model.
+
+        Feature engineering and inference run in a worker thread so they
+        never block the event loop. A sampled share of calls is also scored
+        by the candidate in the background, off the request path.
+
+        Returns:
+            {"flood_probability", "model_version"} or None when no model is loaded
+        """
+        active = self.active
+        if active is None or not len(dates):
+            return None
+
+        features, probability, active_ms = await asyncio.to_thread(
+            self._score, active, precipitation, temperature, humidity, wind_speed, dates
+        )
+
+        candidate = self.candidate
+        if candidate is not None and random.random() < self.shadow_sample_rate:
+            task = asyncio.get_running_loop().run_in_executor(
+                None, self._shadow_score, candidate, features, probability, active_ms
+            )
+            task.add_done_callback(lambda t: t.exception())  # shadow failures must not surface
+
+        return {"flood_probability": round(probability, 4), "model_version": active.version}
+
+    @staticmethod
+    def _score(active: ModelVersion, precipitation, temperature, humidity, wind_speed, dates):
+        features = create_prediction_features(precipitation, temperature, humidity, wind_speed, dates)
+        started = time.perf_counter()
+        probability = active.predict_proba(features)
+        return features, probability, (time.perf_counter() - started) * 1000
+
+    def _shadow_score(self, candidate: ModelVersion, features, active_prob: float, active_ms: float):
+        started = time.perf_counter()
+        candidate_prob = candidate.predict_proba(features)
+        candidate_ms = (time.perf_counter() - started) * 1000
+        if self.candidate is candidate:
+            self.shadow_stats.record(active_prob, candidate_prob, active_ms, candidate_ms)
+
+    def status(self) -> dict:
+        active, candidate = self.active, self.candidate
+        return {
+            "ml_available": HAS_ML,
+            "active": active.summary() if active else None,
+            "pinned": self.pinned,
+            "candidate": candidate.summary() if candidate else None,
+            "shadow": self.shadow_stats.report() if candidate else None,
+            "shadow_sample_rate": self.shadow_sample_rate,
+            "versions": list(self.available_versions()),
+            "last_error": self.last_error,
+        }
+
+    def start(self, interval: float = MODEL_POLL_INTERVAL):
+        """Load the current model and keep polling for new versions"""
+        if not HAS_ML or self._watcher is not None:
+            return
+
+        async def watch():
+            while True:
+                try:
+                    await asyncio.to_thread(self.refresh)
+                except Exception as e:
+                    print(f"⚠️ Model registry refresh failed: {e}")
+                await asyncio.sleep(interval)
+
+        self._watcher = asyncio.create_task(watch())
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+
+registry = ModelRegistry()
@@ -10,6 +10,13 @@ class ImergRequest(BaseModel):
     bbox: str | None = None  # minLon,minLat,maxLon,maxLat
 
 
+class ImergRangeRequest(BaseModel):
+    """Request model for aggregating IMERG granules over a date range"""
+    start_date: str  # YYYY-MM-DD
+    end_date: str    # YYYY-MM-DD
+    bbox: str        # minLon,minLat,maxLon,maxLat
+
+
 class PowerRequest(BaseModel):
     """Request model for NASA POWER API queries"""
     start_date: str  # YYYYMMDD
@@ -26,3 +33,49 @@ class FloodRiskRequest(BaseModel):
     end_date: str    # YYYY-MM-DD
     latitude: float
     longitude: float
+
+
+class DateWindow(BaseModel):
+    """An inclusive date range"""
+    start_date: str  # YYYY-MM-DD
+    end_date: str    # YYYY-MM-DD
+
+
+class WindowSummaryRequest(BaseModel):
+    """Request model for climate summaries of many date windows at one location"""
+    latitude: float
+    longitude: float
+    windows: list[DateWindow]
+
+
+class ShadowRequest(BaseModel):
+    """Request model for starting/stopping shadow scoring"""
+    version: str | None = None  # None stops shadow scoring
+
+
+class JobRequest(BaseModel):
+    """Request model for submitting a background job"""
+    kind: str     # batch_flood_risk, multi_year_flood_risk or imerg_range
+    params: dict  # validated against the kind's params model
+
+
+class LocationPoint(BaseModel):
+    """A named point for batch scoring"""
+    latitude: float
+    longitude: float
+    name: str | None = None
+
+
+class BatchFloodRiskParams(BaseModel):
+    """Params for a batch_flood_risk job: one date range, many locations"""
+    start_date: str  # YYYY-MM-DD
+    end_date: str    # YYYY-MM-DD
+    locations: list[LocationPoint]
+
+
+class MultiYearFloodRiskParams(BaseModel):
+    """Params for a multi_year_flood_risk job: one location, one assessment per year"""
+    latitude: float
+    longitude: float
+    start_year: int
+    end_year: int
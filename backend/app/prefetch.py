@@ -0,0 +1,165 @@
+"""Access-frequency driven prefetching of hot POWER cells and windows"""
+
+import asyncio
+import math
+import time
+from datetime import date, timedelta
+
+from .config import (
+    PREFETCH_CONCURRENCY, PREFETCH_ENABLED, PREFETCH_HALF_LIFE, PREFETCH_INTERVAL,
+    PREFETCH_MAX_END_OFFSET, PREFETCH_MAX_TRACKED, PREFETCH_MIN_SCORE, PREFETCH_TOP_N,
+)
+from .scheduler import BATCH
+from .upstream import POWER_CELL_PARAMETERS, UpstreamError, fetch_power
+from .utils import snap_to_power_cell
+
+
+class AccessTracker:
+    """
+    Exponentially decayed request counts per prefetch target.
+
+    A target is (cell_lat, cell_lon, window_days, end_offset, parameters,
+    community), where end_offset is how many days before "today" the
+    window ended. Tracking windows relative to today lets tomorrow's
+    version of a popular window be fetched before anyone asks for it.
+    """
+
+    def __init__(self, half_life: float = PREFETCH_HALF_LIFE, max_tracked: int = PREFETCH_MAX_TRACKED):
+        self.decay = math.log(2) / half_life
+        self.max_tracked = max_tracked
+        self._scores: dict[tuple, tuple[float, float]] = {}  # target -> (score, updated_at)
+
+    def _score(self, target: tuple, now: float) -> float:
+        score, updated = self._scores.get(target, (0.0, now))
+        return score * math.exp(-self.decay * (now - updated))
+
+    def record(self, latitude: float, longitude: float, start: date, end: date,
+               parameters: str, community: str, today: date | None = None):
+        """
+        Count one request for a POWER window.
+
+        Ignored unless the window ends near today and only asks for
+        per-cell parameters (other requests can't share a cell-center fetch).
+        """
+        if not set(parameters.split(",")) <= POWER_CELL_PARAMETERS:
+            return
+        end_offset = ((today or date.today()) - end).days
+        window_days = (end - start).days + 1
+        if not 0 <= end_offset <= PREFETCH_MAX_END_OFFSET or window_days < 1:
+            return
+        cell_lat, cell_lon = snap_to_power_cell(latitude, longitude)
+        target = (cell_lat, cell_lon, window_days, end_offset, parameters, community)
+        now = time.time()
+        self._scores[target] = (self._score(target, now) + 1.0, now)
+        if len(self._scores) > self.max_tracked:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop the coldest quarter of tracked targets"""
+        ranked = sorted(self._scores, key=lambda t: self._score(t, now))
+        for target in ranked[:len(ranked) // 4]:
+            del self._scores[target]
+
+    def hottest(self, n: int, min_score: float = 0.0) -> list[tuple[tuple, float]]:
+        """Top `n` targets by decayed score, hottest first"""
+        now = time.time()
+        scored = ((target, self._score(target, now)) for target in self._scores)
+        ranked = sorted((item for item in scored if item[1] >= min_score), key=lambda item: -item[1])
+        return ranked[:n]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+def target_params(target: tuple, today: date | None = None) -> dict:
+    """fetch_power params for a target's window as of `today`"""
+    cell_lat, cell_lon, window_days, end_offset, parameters, community = target
+    end = (today or date.today()) - timedelta(days=end_offset)
+    start = end - timedelta(days=window_days - 1)
+    return {
+        "parameters": parameters,
+        "community": community,
+        "longitude": cell_lon,
+        "latitude": cell_lat,
+        "start": start.strftime("%Y%m%d"),
+        "end": end.strftime("%Y%m%d"),
+        "format": "JSON"
+    }
+
+
+class Prefetcher:
+    """
+    Periodically warms the POWER cache for the hottest targets.
+
+    Fetches run at BATCH priority, so the rate scheduler always serves
+    live requests first and 429s back the prefetcher off. Targets whose
+    window is already cached and fresh cost no upstream call.
+    """
+
+    def __init__(self, tracker: AccessTracker, interval: float = PREFETCH_INTERVAL,
+                 top_n: int = PREFETCH_TOP_N, min_score: float = PREFETCH_MIN_SCORE):
+        self.tracker = tracker
+        self.interval = interval
+        self.top_n = top_n
+        self.min_score = min_score
+        self.cycles = 0
+        self.last_cycle: dict | None = None
+        self._task: asyncio.Task | None = None
+
+    async def run_cycle(self) -> dict:
+        """Warm the current top targets once"""
+        started = time.time()
+        targets = self.tracker.hottest(self.top_n, self.min_score)
+        semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        outcome = {"targets": len(targets), "warmed": 0, "failed": 0}
+
+        async def warm(target: tuple):
+            async with semaphore:
+                try:
+                    await fetch_power(target_params(target), priority=BATCH)
+                    outcome["warmed"] += 1
+                except UpstreamError as e:
+                    outcome["failed"] += 1
+                    print(f"⚠️ Prefetch of {target[:2]} ({target[2]}d, -{target[3]}d) failed: {e}")
+
+        await asyncio.gather(*(warm(target) for target, _ in targets))
+        self.cycles += 1
+        self.last_cycle = {**outcome, "started_at": started, "duration_seconds": round(time.time() - started, 3)}
+        return self.last_cycle
+
+    def start(self):
+        """Start the prefetch loop: one cycle now, then one every `interval` (call from the running event loop)"""
+        if not PREFETCH_ENABLED or self._task is not None:
+            return
+
+        async def loop():
+            while True:
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    print(f"⚠️ Prefetch cycle failed: {e}")
+                await asyncio.sleep(self.interval)
+
+        self._task = asyncio.create_task(loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": PREFETCH_ENABLED,
+            "tracked_targets": len(self.tracker),
+            "cycles": self.cycles,
+            "last_cycle": self.last_cycle,
+            "hottest": [
+                {"cell": list(target[:2]), "window_days": target[2], "end_offset_days": target[3],
+                 "score": round(score, 2)}
+                for target, score in self.tracker.hottest(5)
+            ],
+        }
+
+
+access_tracker = AccessTracker()
+prefetcher = Prefetcher(access_tracker)
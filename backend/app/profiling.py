@@ -0,0 +1,279 @@
+"""Per-request tracing, on-demand sampling profiles and the slow-request log"""
+
+import asyncio
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .config import (
+    PROFILE_DIR, PROFILE_INTERVAL, PROFILE_MAX_FILES, PROFILE_PATHS, PROFILE_SAMPLE_RATE, PROFILE_TOKEN,
+    SLOW_REQUEST_LOG, SLOW_REQUEST_LOG_MAX_BYTES, SLOW_REQUEST_THRESHOLD_MS,
+)
+
+PROFILE_HEADER = "x-profile"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class RequestTrace:
+    """Stage timings and upstream calls collected while serving one request"""
+
+    def __init__(self, method: str, path: str, query: str):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started = time.perf_counter()
+        self.stages: list[dict] = []
+        self.upstream: list[dict] = []
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self) -> dict:
+        return {"method": self.method, "path": self.path, "query": self.query,
+                "stages": self.stages, "upstream": self.upstream}
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a named stage of the current request (no-op outside a request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.stages.append({
+            "stage": name,
+            "offset_ms": round((started - trace.started) * 1000, 2),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+
+def record_upstream(host: str, path: str, outcome: str, duration_ms: float, queued_ms: float, priority: int):
+    """Attach one upstream attempt to the current request's trace"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.upstream.append({
+            "host": host,
+            "path": path,
+            "outcome": outcome,
+            "duration_ms": round(duration_ms, 2),
+            "queued_ms": round(queued_ms, 2),
+            "priority": priority,
+        })
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack on a timer and exports speedscope JSON.
+
+    Point it at the event loop thread: it sees everything the loop runs
+    (including other requests served meanwhile), but not work handed off
+    to executor threads. Overhead is one stack walk per interval.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: list[dict] = []
+        self.samples: list[list[int]] = []
+        self.weights: list[float] = []
+        self._frame_index: dict[tuple, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        if key not in self._frame_index:
+            self._frame_index[key] = len(self.frames)
+            self.frames.append({
+                "name": getattr(code, "co_qualname", code.co_name),
+                "file": code.co_filename,
+                "line": code.co_firstlineno,
+            })
+        return self._frame_index[key]
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(round((now - last) * 1000, 3))
+            last = now
+
+    def to_speedscope(self, name: str) -> dict:
+        total = sum(self.weights)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "bahalana-api",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+# Only one profiler runs at a time: it samples the shared event loop thread
+_profile_lock = threading.Lock()
+# Slow requests are logged from worker threads; rotation must not interleave with appends
+_slow_log_lock = threading.Lock()
+
+
+def token_matches(value: str | None) -> bool:
+    """True if `value` is the configured PROFILE_TOKEN (always False when none is set)"""
+    return bool(PROFILE_TOKEN and value) and hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode())
+
+
+def _wants_profile(path: str, header_value: str | None) -> bool:
+    if not path.startswith(PROFILE_PATHS):
+        return False
+    if header_value:
+        return token_matches(header_value)
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _write_profile(profiler: SamplingProfiler, trace: RequestTrace) -> str:
+    """Save a speedscope file, prune the oldest beyond PROFILE_MAX_FILES and return its name"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.speedscope.json"
+    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+        json.dump(profiler.to_speedscope(f"{trace.method} {trace.path}"), f)
+    for old in list_profiles()[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+    return name
+
+
+def _finish_profile(profiler: SamplingProfiler, trace: RequestTrace) -> str | None:
+    """Stop the sampler thread and save its profile (runs in a worker thread)"""
+    try:
+        profiler.stop()
+    finally:
+        _profile_lock.release()
+    try:
+        return _write_profile(profiler, trace)
+    except OSError as e:
+        print(f"⚠️ Could not write request profile: {e}")
+        return None
+
+
+def _log_slow_request(trace: RequestTrace, status_code: int, duration_ms: float, profile: str | None):
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **trace.to_dict(),
+        "status_code": status_code,
+        "duration_ms": round(duration_ms, 2),
+        "profile": profile,
+    }
+    try:
+        with _slow_log_lock:
+            if os.path.exists(SLOW_REQUEST_LOG) and os.path.getsize(SLOW_REQUEST_LOG) >= SLOW_REQUEST_LOG_MAX_BYTES:
+                os.replace(SLOW_REQUEST_LOG, SLOW_REQUEST_LOG + ".1")
+            with open(SLOW_REQUEST_LOG, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write slow request log: {e}")
+
+
+async def profiling_middleware(request, call_next):
+    """
+    Trace every request; profile it when asked to; log it when slow.
+
+    Send `X-Profile: <PROFILE_TOKEN>` to profile a request under
+    PROFILE_PATHS (the header is ignored while no token is configured);
+    PROFILE_SAMPLE_RATE profiles a share of them automatically. The
+    profile file name comes back in `X-Profile-Id`. Requests slower than
+    SLOW_REQUEST_THRESHOLD_MS are appended to SLOW_REQUEST_LOG with their
+    stages and upstream calls. Stopping the sampler and writing files
+    happen in worker threads, off the event loop.
+    """
+    trace = RequestTrace(request.method, request.url.path, request.url.query)
+    token = _current_trace.set(trace)
+
+    profiler = None
+    if _wants_profile(trace.path, request.headers.get(PROFILE_HEADER)) and _profile_lock.acquire(blocking=False):
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+
+    status_code = 500
+    profile_name = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        duration_ms = trace.elapsed_ms()
+        _current_trace.reset(token)
+        if profiler is not None:
+            profile_name = await asyncio.to_thread(_finish_profile, profiler, trace)
+        if duration_ms >= SLOW_REQUEST_THRESHOLD_MS:
+            await asyncio.to_thread(_log_slow_request, trace, status_code, duration_ms, profile_name)
+
+    if profile_name:
+        response.headers["X-Profile-Id"] = profile_name
+    return response
+
+
+def list_profiles() -> list[str]:
+    """Saved profile files, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(".speedscope.json")), reverse=True)
+
+
+def profile_path(name: str) -> str | None:
+    """Path of a saved profile, or None if `name` isn't one"""
+    return os.path.join(PROFILE_DIR, name) if name in list_profiles() else None
+
+
+def recent_slow_requests(limit: int = 50) -> list[dict]:
+    """
+    The last `limit` entries of the slow-request log, newest first.
+
+    Raises:
+        ValueError: limit is below 1
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    try:
+        with open(SLOW_REQUEST_LOG) as f:
+            lines = deque(f, maxlen=limit)
+    except FileNotFoundError:
+        return []
+    return [json.loads(line) for line in reversed(lines) if line.strip()]
@@ -10,8 +10,14 @@ from .health import router as health_router
 from .imerg import router as imerg_router
 from .power import router as power_router
 from .flood_risk import router as flood_risk_router
+from .model import router as model_router
+from .debug import router as debug_router
+from .jobs import router as jobs_router
 
 api_router.include_router(health_router, tags=["health"])
 api_router.include_router(imerg_router, prefix="/imerg", tags=["imerg"])
 api_router.include_router(power_router, prefix="/power", tags=["power"])
 api_router.include_router(flood_risk_router, prefix="/flood-risk", tags=["flood-risk"])
+api_router.include_router(model_router, prefix="/model", tags=["model"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(debug_router, prefix="/debug", tags=["debug"])
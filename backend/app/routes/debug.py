@@ -0,0 +1,42 @@
+"""Profiling and slow-request inspection endpoints"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ..config import PROFILE_TOKEN, SLOW_REQUEST_MAX_LIMIT, SLOW_REQUEST_THRESHOLD_MS
+from ..profiling import list_profiles, profile_path, recent_slow_requests, token_matches
+
+
+async def require_profile_token(x_profile_token: str = Header(None)):
+    """Debug output exposes request paths and query strings, so it needs PROFILE_TOKEN"""
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Debug endpoints are disabled (PROFILE_TOKEN is not set)")
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Missing or invalid X-Profile-Token header")
+
+
+router = APIRouter(dependencies=[Depends(require_profile_token)])
+
+
+@router.get("/profiles")
+async def get_profiles():
+    """Saved request profiles (open them at https://www.speedscope.app)"""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str):
+    """Download one speedscope profile by the name returned in X-Profile-Id"""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(limit: int = Query(50, ge=1, le=SLOW_REQUEST_MAX_LIMIT)):
+    """Most recent requests slower than the threshold, with stage and upstream timings"""
+    return {
+        "threshold_ms": SLOW_REQUEST_THRESHOLD_MS,
+        "requests": recent_slow_requests(limit)
+    }
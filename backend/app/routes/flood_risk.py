@@ -1,24 +1,62 @@
 """Flood risk assessment endpoint"""
 
-from fastapi import APIRouter, Header, HTTPException
-import httpx
-from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException, Response
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import json
+import time
 
-from ..models import FloodRiskRequest, ImergRequest, PowerRequest
-from ..config import CMR_SEARCH_URL, NASA_POWER_URL, EARTHDATA_JWT, IMERG_DATASET_NAME
-from ..utils import create_bbox_from_point, convert_date_format
+import numpy as np
+
+from ..cache import get_cache
+from ..models import FloodRiskRequest, ImergRequest, PowerRequest, WindowSummaryRequest
+from ..model_registry import registry
+from ..prefetch import access_tracker
+from ..profiling import stage
+from ..scheduler import INTERACTIVE
+from ..config import (
+    CMR_SEARCH_URL,
+    EARTHDATA_JWT,
+    IMERG_DATASET_NAME,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_FRESH_TTL,
+    RECENT_WINDOW_DAYS,
+    WINDOW_SUMMARY_MAX_DAYS,
+    WINDOW_SUMMARY_MAX_WINDOWS,
+)
+from ..scoring import find_geo_region, risk_factors, score_locations
+from ..series import SeriesIndex
+from ..upstream import UpstreamError, fetch_power, get_json
+from ..utils import create_bbox_from_point, convert_date_format, snap_to_power_cell
 
 router = APIRouter()
 
+# POWER parameters every assessment needs
+POWER_PARAMETERS = "T2M,PRECTOTCORR,RH2M,WS2M"
+POWER_COMMUNITY = "AG"
+
+# Normalized request -> {"body", "historical", "fresh_until"}
+_response_cache = get_cache("flood_risk", RESPONSE_CACHE_SIZE)
+_refreshing: set = set()
+_background_tasks: set = set()
+
 
 @router.post("")
 async def assess_flood_risk(
     req: FloodRiskRequest,
-    authorization: str = Header(None)
+    response: Response,
+    authorization: str = Header(None),
+    if_none_match: str = Header(None)
 ):
     """
     Combined endpoint: Fetch both IMERG rainfall and POWER climate data,
     then calculate a simple flood risk score.
+
+    Results are cached per POWER grid cell and date range. Historical
+    windows are served from cache indefinitely; windows touching the last
+    RECENT_WINDOW_DAYS days are served stale while a background refresh
+    runs. Responses carry an ETag, and a matching If-None-Match gets a 304.
     
     This is a basic MVP implementation - can be enhanced with ML models later.
     """
@@ -46,6 +84,192 @@ async def assess_flood_risk(
             detail="Invalid date format. Use YYYY-MM-DD format."
         )
     
+    historical = end_date_obj < today - timedelta(days=RECENT_WINDOW_DAYS)
+    access_tracker.record(req.latitude, req.longitude, start_date_obj, end_date_obj,
+                          POWER_PARAMETERS, POWER_COMMUNITY, today)
+    cell_lat, cell_lon = snap_to_power_cell(req.latitude, req.longitude)
+    cache_key = (
+        cell_lat, cell_lon,
+        find_geo_region(req.latitude, req.longitude),
+        req.start_date, req.end_date,
+        bool(authorization or EARTHDATA_JWT),
+        registry.active_tag()
+    )
+
+    with stage("response_cache_lookup"):
+        entry = await _response_cache.aget(cache_key)
+    if entry is None:
+        body = await compute_assessment(req, authorization)
+        await _store_response(cache_key, body, historical)
+        cache_status = "MISS"
+    else:
+        body = entry["body"]
+        cache_status = "HIT"
+        if entry["fresh_until"] is not None and time.time() >= entry["fresh_until"]:
+            _schedule_refresh(cache_key, req, authorization, historical)
+            cache_status = "STALE"
+
+    result = {
+        "location": {
+            "latitude": req.latitude,
+            "longitude": req.longitude
+        },
+        **body
+    }
+
+    # The model tag changes when a model file is replaced in place, even if its predictions don't
+    etag_source = json.dumps([cache_key[-1], result], sort_keys=True)
+    etag = '"' + hashlib.sha1(etag_source.encode()).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=86400" if historical else "no-cache",
+        "X-Cache": cache_status
+    }
+    if if_none_match and etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return result
+
+
+@router.post("/windows")
+async def summarize_windows(req: WindowSummaryRequest):
+    """
+    Climate summaries for many date windows at one location in one call.
+
+    POWER data covering every window is fetched once (through the shared,
+    cell-keyed cache), and each window's avg/max precipitation, average
+    humidity and average temperature are read in constant time from a
+    range index built once for this request (it isn't kept on the cached
+    series), so sliding or resizing windows costs no refetch and no rescan.
+    """
+    if not req.windows:
+        raise HTTPException(status_code=400, detail="At least one window is required")
+    if len(req.windows) > WINDOW_SUMMARY_MAX_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"At most {WINDOW_SUMMARY_MAX_WINDOWS} windows per request")
+
+    today = datetime.now().date()
+    try:
+        spans = [
+            (datetime.strptime(w.start_date, "%Y-%m-%d").date(), datetime.strptime(w.end_date, "%Y-%m-%d").date())
+            for w in req.windows
+        ]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD format.")
+    if any(end < start for start, end in spans):
+        raise HTTPException(status_code=400, detail="End date must be after start date")
+    start = min(s for s, _ in spans)
+    end = max(e for _, e in spans)
+    if end > today:
+        raise HTTPException(status_code=400, detail="Windows cannot extend into the future")
+    if (end - start).days + 1 > WINDOW_SUMMARY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Windows must fall within {WINDOW_SUMMARY_MAX_DAYS} days")
+
+    access_tracker.record(req.latitude, req.longitude, start, end, POWER_PARAMETERS, POWER_COMMUNITY, today)
+    try:
+        with stage("power_fetch"):
+            series, stale_age = await fetch_power({
+                "parameters": POWER_PARAMETERS,
+                "community": POWER_COMMUNITY,
+                "longitude": req.longitude,
+                "latitude": req.latitude,
+                "start": start.strftime("%Y%m%d"),
+                "end": end.strftime("%Y%m%d"),
+                "format": "JSON"
+            })
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"NASA POWER data unavailable: {e}")
+
+    with stage("scoring"):
+        index = SeriesIndex(series)
+        windows = []
+        for w, (window_start, window_end) in zip(req.windows, spans):
+            stats = index.window_summary(window_start, window_end, CLIMATE_SUMMARY_PARAMETERS)["parameters"]
+            windows.append({
+                "date_range": {"start": w.start_date, "end": w.end_date},
+                "climate_summary": _climate_summary(stats),
+                "power_data_days": stats["PRECTOTCORR"]["count"]
+            })
+
+    return {
+        "location": {
+            "latitude": req.latitude,
+            "longitude": req.longitude
+        },
+        "date_range": {
+            "start": start.isoformat(),
+            "end": end.isoformat()
+        },
+        "windows": windows,
+        "data_sources": {
+            "power_data_days": len(series),
+            "stale": stale_age is not None,
+            "stale_age_seconds": int(stale_age) if stale_age is not None else None
+        }
+    }
+
+
+CLIMATE_SUMMARY_PARAMETERS = ["PRECTOTCORR", "RH2M", "T2M"]
+
+
+def _climate_summary(stats: dict) -> dict:
+    """climate_summary block from SeriesIndex summaries (None where a parameter has no data)"""
+    precip, humidity, temp = stats["PRECTOTCORR"], stats["RH2M"], stats["T2M"]
+    return {
+        "avg_precipitation_mm": precip["mean"],
+        "max_precipitation_mm": precip["max"],
+        "avg_temperature_c": temp["mean"],
+        "avg_humidity_percent": humidity["mean"]
+    }
+
+
+def _scored_climate_summary(scores: dict, humidity_days: int) -> dict:
+    """climate_summary block for the first score_locations row, over the same valid days as its risk factors"""
+    precip_days = int(scores["power_days"][0])
+
+    def value(key: str, days: int) -> float | None:
+        v = float(scores[key][0])
+        return round(v, 2) if days and not np.isnan(v) else None
+
+    return {
+        "avg_precipitation_mm": value("avg_precip", precip_days),
+        "max_precipitation_mm": value("max_precip", precip_days),
+        "avg_temperature_c": value("avg_temp", 1),
+        "avg_humidity_percent": value("avg_humidity", humidity_days)
+    }
+
+
+async def _store_response(cache_key: tuple, body: dict, historical: bool):
+    """Cache an assessment body unless it was built from stale POWER data"""
+    if body["data_sources"]["stale"]:
+        return
+    await _response_cache.aset(cache_key, {
+        "body": body,
+        "fresh_until": None if historical else time.time() + RESPONSE_FRESH_TTL
+    })
+
+
+def _schedule_refresh(cache_key: tuple, req: FloodRiskRequest, authorization: str | None, historical: bool):
+    """Recompute a cached assessment in the background (once per key)"""
+    if cache_key in _refreshing:
+        return
+    _refreshing.add(cache_key)
+
+    async def refresh():
+        try:
+            await _store_response(cache_key, await compute_assessment(req, authorization), historical)
+        except Exception as e:
+            print(f"⚠️ Background flood risk refresh failed: {e}")
+        finally:
+            _refreshing.discard(cache_key)
+
+    task = asyncio.create_task(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def compute_assessment(req: FloodRiskRequest, authorization: str | None, priority: int = INTERACTIVE) -> dict:
+    """Fetch upstream data and score it; returns the response body without location"""
     # Convert date formats
     # IMERG uses YYYY-MM-DD, POWER uses YYYYMMDD
     power_start = convert_date_format(req.start_date, "YYYYMMDD")
@@ -70,10 +294,10 @@ async def assess_flood_risk(
                 "bounding_box": bbox
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                r = await client.get(CMR_SEARCH_URL, params=params, headers={"Authorization": authorization})
-                r.raise_for_status()
-                imerg_results = r.json()
+            with stage("imerg_search"):
+                imerg_results = await get_json(
+                    CMR_SEARCH_URL, params=params, headers={"Authorization": authorization}, priority=priority
+                )
             
             imerg_granules = imerg_results.get("feed", {}).get("entry", [])
         except Exception as e:
@@ -86,143 +310,68 @@ async def assess_flood_risk(
         end_date=power_end,
         latitude=req.latitude,
         longitude=req.longitude,
-        parameters="T2M,PRECTOTCORR,RH2M,WS2M"
+        parameters=POWER_PARAMETERS,
+        community=POWER_COMMUNITY
     )
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        r = await client.get(NASA_POWER_URL, params={
-            "parameters": power_req.parameters,
-            "community": power_req.community,
-            "longitude": power_req.longitude,
-            "latitude": power_req.latitude,
-            "start": power_req.start_date,
-            "end": power_req.end_date,
-            "format": "JSON"
-        })
-        r.raise_for_status()
-        power_data = r.json()
-    
-    power_params = power_data.get("properties", {}).get("parameter", {})
-    
-    # Simple flood risk calculation
-    precip_data = power_params.get("PRECTOTCORR", {})
-    temp_data = power_params.get("T2M", {})
-    humidity_data = power_params.get("RH2M", {})
-    
-    # Calculate average precipitation
-    precip_values = [v for v in precip_data.values() if v is not None and v >= 0]
-    avg_precip = sum(precip_values) / len(precip_values) if precip_values else 0
-    max_precip = max(precip_values) if precip_values else 0
-    
-    # Calculate average humidity
-    humidity_values = [v for v in humidity_data.values() if v is not None]
-    avg_humidity = sum(humidity_values) / len(humidity_values) if humidity_values else 0
-    
-    # Calculate average temperature
-    temp_values = [v for v in temp_data.values() if v is not None]
-    avg_temp = sum(temp_values) / len(temp_values) if temp_values else None
+    try:
+        with stage("power_fetch"):
+            series, stale_age = await fetch_power({
+                "parameters": power_req.parameters,
+                "community": power_req.community,
+                "longitude": power_req.longitude,
+                "latitude": power_req.latitude,
+                "start": power_req.start_date,
+                "end": power_req.end_date,
+                "format": "JSON"
+            }, priority=priority)
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"NASA POWER data unavailable: {e}")
     
-    # Enhanced flood risk scoring (0-100)
+    # Rule-based flood risk scoring (0-100)
     # Factors: precipitation, humidity, geography, topography
-    risk_score = 0
-    risk_level = "LOW"
-    risk_factors = []
-    
-    # Base precipitation risk
-    precip_risk = 0
-    if max_precip > 100:  # >100mm in a day
-        precip_risk += 40
-        risk_factors.append(f"Very high daily rainfall ({max_precip:.1f}mm)")
-    elif max_precip > 50:
-        precip_risk += 25
-        risk_factors.append(f"High daily rainfall ({max_precip:.1f}mm)")
-    elif max_precip > 20:
-        precip_risk += 10
-        risk_factors.append(f"Moderate rainfall ({max_precip:.1f}mm)")
-    
-    if avg_precip > 50:
-        precip_risk += 20
-        risk_factors.append(f"High average rainfall ({avg_precip:.1f}mm/day)")
-    elif avg_precip > 20:
-        precip_risk += 10
-        risk_factors.append(f"Moderate average rainfall ({avg_precip:.1f}mm/day)")
-    
-    # Humidity factor (minor impact)
-    humidity_bonus = 0
-    if avg_humidity > 80:
-        humidity_bonus += 10
-        risk_factors.append(f"High humidity ({avg_humidity:.1f}%)")
-    elif avg_humidity > 70:
-        humidity_bonus += 3
-        risk_factors.append(f"Elevated humidity ({avg_humidity:.1f}%)")
-    
-    # Geographic risk modifiers based on known flood-prone areas
-    geo_modifier = 1.0
-    location_bonus = 0
-    
-    # High-risk areas (river valleys, low-lying coastal plains)
-    if (14.4 <= req.latitude <= 14.8 and 120.9 <= req.longitude <= 121.2):  # Metro Manila/Marikina
-        geo_modifier = 1.5
-        location_bonus = 20
-        risk_factors.append("Located in flood-prone Metro Manila region")
-    elif (14.0 <= req.latitude <= 15.0 and 120.5 <= req.longitude <= 121.5):  # Central Luzon plains
-        geo_modifier = 1.3
-        location_bonus = 15
-        risk_factors.append("Located in Central Luzon flood plains")
-    elif (10.0 <= req.latitude <= 11.5 and 123.5 <= req.longitude <= 125.0):  # Leyte/Samar lowlands
-        geo_modifier = 1.2
-        location_bonus = 10
-        risk_factors.append("Located in Eastern Visayas coastal lowlands")
-    
-    # Low-risk areas (mountainous, well-drained, small islands)
-    elif (9.0 <= req.latitude <= 10.5 and 123.5 <= req.longitude <= 124.5):  # Bohol/Siquijor
-        geo_modifier = 0.4  # Significantly reduce risk
-        risk_factors.append("Limestone terrain with underground drainage (reduced flood risk)")
-    elif (16.0 <= req.latitude <= 17.0 and 120.0 <= req.longitude <= 121.0):  # Baguio/Cordillera
-        geo_modifier = 0.6
-        risk_factors.append("Mountainous terrain with steep drainage (reduced flood risk)")
-    elif (9.0 <= req.latitude <= 9.5 and 124.5 <= req.longitude <= 125.0):  # Camiguin
-        geo_modifier = 0.5
-        risk_factors.append("Volcanic island with rapid drainage (reduced flood risk)")
-    
-    # Calculate final risk score
-    risk_score = int((precip_risk * geo_modifier) + humidity_bonus + location_bonus)
-    risk_score = max(0, min(100, risk_score))  # Clamp to 0-100
-    
-    if len(imerg_granules) > 0:
-        risk_score += 3  # Reduced bonus for satellite data
-        risk_factors.append("IMERG satellite data available")
+    with stage("scoring"):
+        scores = score_locations(
+            [req.latitude],
+            [req.longitude],
+            precipitation=series.values("PRECTOTCORR")[np.newaxis, :],
+            humidity=series.values("RH2M")[np.newaxis, :],
+            temperature=series.values("T2M")[np.newaxis, :],
+            imerg_granules=[len(imerg_granules)]
+        )
+        humidity_days = int(np.count_nonzero(~np.isnan(series.values("RH2M"))))
     
-    # Determine risk level
-    if risk_score >= 60:
-        risk_level = "HIGH"
-    elif risk_score >= 30:
-        risk_level = "MEDIUM"
-    else:
-        risk_level = "LOW"
+    # ML flood probability for the last day of the window (if a model is loaded)
+    with stage("ml_prediction"):
+        try:
+            ml_prediction = await registry.predict(
+                series.values("PRECTOTCORR").tolist(),
+                series.values("T2M").tolist(),
+                series.values("RH2M").tolist(),
+                series.values("WS2M").tolist(),
+                [d.isoformat() for d in series.dates()]
+            )
+        except Exception as e:
+            # The rule-based assessment stands on its own; a broken model must not fail it
+            print(f"⚠️ ML prediction failed: {e}")
+            ml_prediction = None
     
     return {
-        "location": {
-            "latitude": req.latitude,
-            "longitude": req.longitude
-        },
         "date_range": {
             "start": req.start_date,
             "end": req.end_date
         },
         "flood_risk": {
-            "level": risk_level,
-            "score": risk_score,
-            "factors": risk_factors
-        },
-        "climate_summary": {
-            "avg_precipitation_mm": round(avg_precip, 2),
-            "max_precipitation_mm": round(max_precip, 2),
-            "avg_temperature_c": round(avg_temp, 2) if avg_temp is not None else None,
-            "avg_humidity_percent": round(avg_humidity, 2)
+            "level": str(scores["level"][0]),
+            "score": int(scores["score"][0]),
+            "factors": risk_factors(scores, 0)
         },
+        "ml_prediction": ml_prediction,
+        "climate_summary": _scored_climate_summary(scores, humidity_days),
         "data_sources": {
             "imerg_granules_found": len(imerg_granules),
-            "power_data_days": len(precip_values)
+            "power_data_days": int(scores["power_days"][0]),
+            "stale": stale_age is not None,
+            "stale_age_seconds": int(stale_age) if stale_age is not None else None
         }
     }
@@ -2,6 +2,12 @@
 
 from fastapi import APIRouter
 
+from ..cache import cache_stats
+from ..jobs import jobs
+from ..prefetch import prefetcher
+from ..scheduler import scheduler_stats
+from ..upstream import breaker_states
+
 router = APIRouter()
 
 
@@ -16,5 +22,10 @@ async def health_check():
             "imerg": "/api/imerg",
             "power": "/api/power/climate",
             "flood_risk": "/api/flood-risk"
-        }
+        },
+        "upstreams": breaker_states(),
+        "caches": cache_stats(),
+        "rate_limits": scheduler_stats(),
+        "jobs": jobs.stats(),
+        "prefetch": prefetcher.stats()
     }
@@ -1,13 +1,18 @@
 """IMERG data endpoints"""
 
 from fastapi import APIRouter, Header, HTTPException
-import httpx
+from datetime import datetime
 import os
 import tempfile
 
-from ..models import ImergRequest
-from ..config import CMR_SEARCH_URL, EARTHDATA_JWT, IMERG_DATASET_NAME
-from ..utils import has_xarray, get_xarray
+import numpy as np
+
+from ..models import ImergRequest, ImergRangeRequest
+from ..config import CMR_SEARCH_URL, EARTHDATA_JWT, IMERG_DATASET_NAME, REQUEST_TIMEOUT
+from ..imerg_range import aggregate_imerg_range, granule_download_url
+from ..scoring import risk_factors, score_locations
+from ..upstream import UpstreamError, fetch_bytes, get_json
+from ..utils import calculate_bbox_center, has_xarray, get_xarray
 
 router = APIRouter()
 
@@ -34,41 +39,26 @@ async def fetch_imerg(req: ImergRequest, authorization: str = Header(None)):
     if req.bbox:
         params["bounding_box"] = req.bbox
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        r = await client.get(CMR_SEARCH_URL, params=params)
-        r.raise_for_status()
-        results = r.json()
+    try:
+        results = await get_json(CMR_SEARCH_URL, params=params, timeout=REQUEST_TIMEOUT)
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"CMR search failed: {e}")
 
     items = results.get("feed", {}).get("entry", [])
     if not items:
         raise HTTPException(status_code=404, detail="No IMERG granules found for the query")
 
     granule = items[0]
-    links = granule.get("links", [])
-
-    # Find a download URL
-    download_url = None
-    for L in links:
-        href = L.get("href")
-        rel = L.get("rel", "")
-        type_ = L.get("type", "")
-        if href and ("data" in rel or type_ in ("application/x-hdf", "application/x-netcdf", "application/octet-stream")):
-            download_url = href
-            break
-    if not download_url:
-        for L in links:
-            if L.get("href"):
-                download_url = L.get("href")
-                break
+    download_url = granule_download_url(granule)
 
     if not download_url:
         raise HTTPException(status_code=404, detail="No downloadable URL found")
 
     headers = {"Authorization": authorization}
-    async with httpx.AsyncClient(timeout=120.0, follow_redirects=True) as client:
-        resp = await client.get(download_url, headers=headers)
-        resp.raise_for_status()
-        content = resp.content
+    try:
+        content = await fetch_bytes(download_url, headers=headers)
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"IMERG download failed: {e}")
 
     # Save to temporary file
     suffix = os.path.splitext(download_url)[1] or ".h5"
@@ -114,6 +104,75 @@ async def fetch_imerg(req: ImergRequest, authorization: str = Header(None)):
     }
 
 
+@router.post("/range")
+async def imerg_range(req: ImergRangeRequest, authorization: str = Header(None)):
+    """
+    Aggregate every IMERG granule in a date range into a daily bbox series.
+
+    Granules are downloaded a few at a time and reduced as they arrive;
+    the resulting daily precipitation is also run through the flood score.
+    Long ranges are better submitted as an "imerg_range" job (/api/jobs).
+    """
+    if not authorization:
+        if EARTHDATA_JWT:
+            authorization = f"Bearer {EARTHDATA_JWT}"
+        else:
+            raise HTTPException(
+                status_code=401,
+                detail="Missing Authorization header. Provide 'Bearer <token>' or set EARTHDATA_JWT environment variable."
+            )
+    validate_range_request(req)
+
+    try:
+        series, summary = await aggregate_imerg_range(req.start_date, req.end_date, req.bbox, authorization)
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"IMERG range aggregation failed: {e}")
+    return range_body(req, series, summary)
+
+
+def validate_range_request(req: ImergRangeRequest):
+    """Reject range requests that can't be served (HTTPException 400/501)"""
+    if not has_xarray():
+        raise HTTPException(status_code=501, detail="xarray is not installed; IMERG range aggregation needs it")
+    try:
+        start_date_obj = datetime.strptime(req.start_date, "%Y-%m-%d").date()
+        end_date_obj = datetime.strptime(req.end_date, "%Y-%m-%d").date()
+        calculate_bbox_center(req.bbox)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid request. Use YYYY-MM-DD dates and a 'minLon,minLat,maxLon,maxLat' bbox."
+        )
+    if end_date_obj < start_date_obj:
+        raise HTTPException(status_code=400, detail="End date must be after start date")
+    if end_date_obj > datetime.now().date():
+        raise HTTPException(status_code=400, detail="End date cannot be in the future")
+
+
+def range_body(req: ImergRangeRequest, series, summary: dict) -> dict:
+    """Response body for an aggregated range, scored at the bbox center"""
+    latitude, longitude = calculate_bbox_center(req.bbox)
+    precipitation = series.values("IMERG_PRECIP")
+    scores = score_locations(
+        [latitude], [longitude],
+        precipitation[np.newaxis, :],
+        np.full((1, len(series)), np.nan),
+        imerg_granules=[summary["granules_processed"]]
+    )
+    return {
+        "date_range": {"start": req.start_date, "end": req.end_date},
+        "bbox": req.bbox,
+        **summary,
+        "days_with_data": int(np.count_nonzero(~np.isnan(precipitation))),
+        "daily": series.daily_records(),
+        "flood_risk": {
+            "level": str(scores["level"][0]),
+            "score": int(scores["score"][0]),
+            "factors": risk_factors(scores, 0),
+        },
+    }
+
+
 @router.post("/metadata")
 async def imerg_metadata(req: ImergRequest, authorization: str = Header(None)):
     """Return metadata for IMERG granules from CMR (no downloads)."""
@@ -135,10 +194,10 @@ async def imerg_metadata(req: ImergRequest, authorization: str = Header(None)):
     if req.bbox:
         params["bounding_box"] = req.bbox
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        r = await client.get(CMR_SEARCH_URL, params=params)
-        r.raise_for_status()
-        results = r.json()
+    try:
+        results = await get_json(CMR_SEARCH_URL, params=params)
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"CMR search failed: {e}")
 
     entries = results.get("feed", {}).get("entry", [])
     granules = []
@@ -0,0 +1,203 @@
+"""Background job endpoints for long-running analyses"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from ..config import EARTHDATA_JWT, JOB_MAX_LOCATIONS, JOB_MAX_YEARS
+from ..imerg_range import aggregate_imerg_range
+from ..jobs import Job, JobQueueFullError, job_events, jobs
+from ..models import (
+    BatchFloodRiskParams, FloodRiskRequest, ImergRangeRequest, JobRequest, MultiYearFloodRiskParams
+)
+from ..scheduler import BATCH
+from .flood_risk import compute_assessment
+from .imerg import range_body, validate_range_request
+
+router = APIRouter()
+
+# Assessments one job runs at once (the per-host scheduler still paces upstream calls)
+JOB_FANOUT = 4
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD format.")
+
+
+def _validate_batch(params: BatchFloodRiskParams):
+    start, end = _parse_day(params.start_date), _parse_day(params.end_date)
+    if end < start or end > date.today():
+        raise HTTPException(status_code=400, detail="Date range must be in the past and end after it starts")
+    if not 0 < len(params.locations) <= JOB_MAX_LOCATIONS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {JOB_MAX_LOCATIONS} locations")
+
+
+def _validate_multi_year(params: MultiYearFloodRiskParams):
+    if not params.start_year <= params.end_year <= date.today().year:
+        raise HTTPException(status_code=400, detail="Years must be in order and not in the future")
+    if params.end_year > (date.today() - timedelta(days=1)).year:
+        raise HTTPException(status_code=400, detail=f"{params.end_year} has no completed days yet; end at {params.end_year - 1}")
+    if params.end_year - params.start_year + 1 > JOB_MAX_YEARS:
+        raise HTTPException(status_code=400, detail=f"At most {JOB_MAX_YEARS} years per job")
+
+
+async def _run_assessments(requests: list[FloodRiskRequest], labels: list[dict], job: Job) -> list[dict]:
+    """Assess many requests with bounded fan-out, reporting each as a partial result"""
+    authorization = job.secrets.get("authorization")
+    semaphore = asyncio.Semaphore(JOB_FANOUT)
+    results = [None] * len(requests)
+    job.report(0, len(requests))
+
+    async def assess(i: int):
+        async with semaphore:
+            try:
+                body = await compute_assessment(requests[i], authorization, priority=BATCH)
+            except HTTPException as e:
+                body = {"error": e.detail}
+        return i, {**labels[i], **body}
+
+    for done, next_done in enumerate(asyncio.as_completed([assess(i) for i in range(len(requests))]), 1):
+        i, result = await next_done
+        results[i] = result
+        job.report(done, partial=result)
+    return results
+
+
+async def run_batch_flood_risk(params: dict, job: Job) -> dict:
+    """Score many locations over one date range"""
+    batch = BatchFloodRiskParams(**params)
+    requests = [
+        FloodRiskRequest(start_date=batch.start_date, end_date=batch.end_date,
+                         latitude=loc.latitude, longitude=loc.longitude)
+        for loc in batch.locations
+    ]
+    labels = [
+        {"index": i, "name": loc.name, "location": {"latitude": loc.latitude, "longitude": loc.longitude}}
+        for i, loc in enumerate(batch.locations)
+    ]
+    results = await _run_assessments(requests, labels, job)
+    levels = [r["flood_risk"]["level"] for r in results if "flood_risk" in r]
+    return {
+        "date_range": {"start": batch.start_date, "end": batch.end_date},
+        "summary": {
+            "locations": len(results),
+            "failed": len(results) - len(levels),
+            "levels": {level: levels.count(level) for level in ("HIGH", "MEDIUM", "LOW")},
+        },
+        "results": results,
+    }
+
+
+async def run_multi_year_flood_risk(params: dict, job: Job) -> dict:
+    """Assess one location year by year"""
+    multi = MultiYearFloodRiskParams(**params)
+    yesterday = date.today() - timedelta(days=1)
+    years = list(range(multi.start_year, multi.end_year + 1))
+    requests = [
+        FloodRiskRequest(start_date=f"{year}-01-01", end_date=min(date(year, 12, 31), yesterday).isoformat(),
+                         latitude=multi.latitude, longitude=multi.longitude)
+        for year in years
+    ]
+    results = await _run_assessments(requests, [{"year": year} for year in years], job)
+    scored = [r for r in results if "flood_risk" in r]
+    worst = max(scored, key=lambda r: r["flood_risk"]["score"], default=None)
+    return {
+        "location": {"latitude": multi.latitude, "longitude": multi.longitude},
+        "summary": {
+            "years": len(results),
+            "failed": len(results) - len(scored),
+            "mean_score": round(sum(r["flood_risk"]["score"] for r in scored) / len(scored), 2) if scored else None,
+            "worst_year": worst["year"] if worst else None,
+        },
+        "years": results,
+    }
+
+
+async def run_imerg_range(params: dict, job: Job) -> dict:
+    """IMERG range aggregation (see /api/imerg/range) at batch priority"""
+    req = ImergRangeRequest(**params)
+    series, summary = await aggregate_imerg_range(
+        req.start_date, req.end_date, req.bbox, job.secrets["authorization"],
+        priority=BATCH, on_progress=lambda done, total: job.report(done, total)
+    )
+    return range_body(req, series, summary)
+
+
+JOB_KINDS = {
+    "batch_flood_risk": (BatchFloodRiskParams, _validate_batch, run_batch_flood_risk),
+    "multi_year_flood_risk": (MultiYearFloodRiskParams, _validate_multi_year, run_multi_year_flood_risk),
+    "imerg_range": (ImergRangeRequest, validate_range_request, run_imerg_range),
+}
+for kind, (_, _, runner) in JOB_KINDS.items():
+    jobs.register(kind, runner)
+
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown or expired)")
+    return job
+
+
+@router.post("", status_code=202)
+async def submit_job(req: JobRequest, authorization: str = Header(None)):
+    """
+    Submit a long-running analysis and get a job id back immediately.
+
+    Kinds: batch_flood_risk, multi_year_flood_risk, imerg_range. Submitting
+    the same kind and params again returns the existing job while it is
+    queued, running or its result is still kept.
+    """
+    if req.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind. Choose from: {', '.join(JOB_KINDS)}")
+    params_model, validate, _ = JOB_KINDS[req.kind]
+    try:
+        params = params_model(**req.params)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    validate(params)
+
+    if not authorization and EARTHDATA_JWT:
+        authorization = f"Bearer {EARTHDATA_JWT}"
+    if req.kind == "imerg_range" and not authorization:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing Authorization header. Provide 'Bearer <token>' or set EARTHDATA_JWT environment variable."
+        )
+
+    try:
+        job, deduplicated = jobs.submit(
+            req.kind, jsonable_encoder(params), {"authorization": authorization} if authorization else None
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Job queue is full ({e}); try again later")
+
+    return {
+        **job.status_dict(),
+        "deduplicated": deduplicated,
+        "links": {"self": f"/api/jobs/{job.id}", "events": f"/api/jobs/{job.id}/events"},
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Job status, progress, partial results and (once finished) the result"""
+    return _get_job(job_id).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def job_event_stream(job_id: str):
+    """Server-Sent Events: status on each change, partial results, then done"""
+    job = _get_job(job_id)
+    return StreamingResponse(
+        job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
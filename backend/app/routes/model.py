@@ -0,0 +1,45 @@
+"""Model registry endpoints"""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+
+from ..models import ShadowRequest
+from ..model_registry import ModelCompatibilityError, registry
+
+router = APIRouter()
+
+
+@router.get("")
+async def model_status():
+    """Active model, shadow candidate, shadow comparison and available versions"""
+    return registry.status()
+
+
+@router.post("/reload")
+async def reload_model():
+    """Check for a new model version now instead of waiting for the next poll"""
+    changed = await asyncio.to_thread(registry.refresh)
+    return {"changed": changed, **registry.status()}
+
+
+@router.post("/shadow")
+async def set_shadow_model(req: ShadowRequest):
+    """Shadow-score a candidate version on a sample of live flood-risk traffic"""
+    try:
+        await asyncio.to_thread(registry.set_candidate, req.version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {req.version}")
+    except (ModelCompatibilityError, ImportError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.status()
+
+
+@router.post("/promote")
+async def promote_shadow_model():
+    """Make the shadow candidate the active model"""
+    try:
+        registry.promote_candidate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.status()
@@ -1,10 +1,12 @@
 """NASA POWER API endpoints"""
 
+from datetime import datetime
+
 from fastapi import APIRouter, HTTPException
-import httpx
 
 from ..models import PowerRequest
-from ..config import NASA_POWER_URL
+from ..prefetch import access_tracker
+from ..upstream import UpstreamError, fetch_power
 
 router = APIRouter()
 
@@ -26,7 +28,8 @@ async def fetch_power_data(req: PowerRequest):
                  WS2M (wind), ALLSKY_SFC_SW_DWN (solar radiation), etc.
     - community: Data community (AG=Agroclimatology, RE=Renewable Energy, SB=Sustainable Buildings)
     
-    Returns daily climate data for the location.
+    Returns daily climate data for the location. POWER fill values (-999)
+    are reported as null.
     """
     params = {
         "parameters": req.parameters,
@@ -38,28 +41,20 @@ async def fetch_power_data(req: PowerRequest):
         "format": "JSON"
     }
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        r = await client.get(NASA_POWER_URL, params=params)
-        r.raise_for_status()
-        data = r.json()
-    
-    # Extract and format the response
-    if "properties" not in data or "parameter" not in data["properties"]:
-        raise HTTPException(status_code=500, detail="Unexpected POWER API response format")
-    
-    parameters_data = data["properties"]["parameter"]
-    
-    # Reorganize data by date instead of by parameter
-    dates = set()
-    for param_name, param_values in parameters_data.items():
-        dates.update(param_values.keys())
-    
-    daily_data = []
-    for date in sorted(dates):
-        day_record = {"date": date}
-        for param_name, param_values in parameters_data.items():
-            day_record[param_name] = param_values.get(date)
-        daily_data.append(day_record)
+    try:
+        access_tracker.record(
+            req.latitude, req.longitude,
+            datetime.strptime(req.start_date, "%Y%m%d").date(),
+            datetime.strptime(req.end_date, "%Y%m%d").date(),
+            req.parameters, req.community
+        )
+    except ValueError:
+        pass  # POWER itself reports malformed dates
+
+    try:
+        series, stale_age = await fetch_power(params)
+    except UpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"NASA POWER data unavailable: {e}")
     
     return {
         "location": {
@@ -70,11 +65,13 @@ async def fetch_power_data(req: PowerRequest):
             "start": req.start_date,
             "end": req.end_date
         },
-        "parameters_info": data.get("parameters", {}),
-        "daily_data": daily_data,
+        "parameters_info": series.meta.get("parameters_info", {}),
+        "daily_data": series.daily_records(),
         "metadata": {
             "source": "NASA POWER API",
             "community": req.community,
-            "version": data.get("header", {}).get("api_version", "unknown")
+            "version": series.meta.get("api_version", "unknown"),
+            "stale": stale_age is not None,
+            "stale_age_seconds": int(stale_age) if stale_age is not None else None
         }
     }
@@ -0,0 +1,180 @@
+"""Priority-aware token-bucket scheduling for outbound upstream calls"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from .config import UPSTREAM_RATE_LIMITS, DEFAULT_RATE_LIMIT, RETRY_AFTER_DEFAULT
+
+# Priority classes (lower runs first)
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class HostBlockedError(Exception):
+    """Raised to interactive callers while a host is backing off after a 429"""
+
+
+class HostScheduler:
+    """
+    Token bucket for one upstream host with a priority wait queue.
+
+    Tokens refill at `rate` per second up to `burst`. When none are free,
+    callers wait in a queue ordered by (priority, arrival), so queued
+    interactive calls always go before queued batch calls. A 429 blocks
+    the whole host until its Retry-After has passed: batch calls queue
+    through the block, interactive calls fail with HostBlockedError so
+    they can fall back to cached data instead of hanging.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.rejected = 0
+        self._waiters = []  # heap of (priority, seq, future, enqueued_at)
+        self._seq = itertools.count()
+        self._pump: asyncio.Task | None = None
+        self._granted = {p: 0 for p in PRIORITY_NAMES}
+        self._wait_total = {p: 0.0 for p in PRIORITY_NAMES}
+        self._wait_max = {p: 0.0 for p in PRIORITY_NAMES}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _record(self, priority: int, waited: float):
+        self._granted[priority] += 1
+        self._wait_total[priority] += waited
+        self._wait_max[priority] = max(self._wait_max[priority], waited)
+
+    def try_acquire(self, priority: int = INTERACTIVE) -> bool:
+        """Take a token only if one is free right now and nobody is queued"""
+        now = time.monotonic()
+        self._refill(now)
+        if self._waiters or now < self.blocked_until or self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self._record(priority, 0.0)
+        return True
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        """
+        Wait for a token in priority order.
+
+        Raises:
+            HostBlockedError: An interactive call arrived (or was queued)
+                              while the host is blocked after a 429
+        """
+        if self.try_acquire(priority):
+            return
+        if priority == INTERACTIVE and time.monotonic() < self.blocked_until:
+            self.rejected += 1
+            raise HostBlockedError(self._blocked_message())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future, time.monotonic()))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump())
+        await future
+
+    async def _run_pump(self):
+        while self._waiters:
+            if self._waiters[0][2].cancelled():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            priority, _, future, enqueued_at = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.tokens -= 1
+            self._record(priority, now - enqueued_at)
+            future.set_result(None)
+
+    def backoff(self, seconds: float):
+        """Block the whole host for `seconds` (e.g. after a 429); queued interactive calls fail now"""
+        self.throttled += 1
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        if seconds <= 0:
+            return
+        remaining = []
+        for waiter in self._waiters:
+            priority, _, future, _ = waiter
+            if priority == INTERACTIVE and not future.done():
+                self.rejected += 1
+                future.set_exception(HostBlockedError(self._blocked_message()))
+            elif not future.done():
+                remaining.append(waiter)
+        heapq.heapify(remaining)
+        self._waiters = remaining
+
+    def _blocked_message(self) -> str:
+        return f"{self.host} is rate limiting requests (retry in {self.blocked_until - time.monotonic():.0f}s)"
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future, _ in self._waiters:
+            if not future.cancelled():
+                queued[PRIORITY_NAMES[priority]] += 1
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1),
+            "throttled_responses": self.throttled,
+            "rejected_while_blocked": self.rejected,
+            "queue_depth": queued,
+            "granted": {PRIORITY_NAMES[p]: n for p, n in self._granted.items()},
+            "avg_wait_ms": {
+                PRIORITY_NAMES[p]: round(self._wait_total[p] / n * 1000, 1) if n else None
+                for p, n in self._granted.items()
+            },
+            "max_wait_ms": {PRIORITY_NAMES[p]: round(w * 1000, 1) for p, w in self._wait_max.items()},
+        }
+
+
+_schedulers: dict[str, HostScheduler] = {}
+
+
+def get_scheduler(url: str) -> HostScheduler:
+    """Get (or create) the scheduler for the host of `url`"""
+    host = urlsplit(url).netloc
+    if host not in _schedulers:
+        rate, burst = UPSTREAM_RATE_LIMITS.get(urlsplit(url).hostname, DEFAULT_RATE_LIMIT)
+        _schedulers[host] = HostScheduler(host, rate, burst)
+    return _schedulers[host]
+
+
+def scheduler_stats() -> dict[str, dict]:
+    """Rate-limit state, queue depth and wait times per upstream host"""
+    return {host: scheduler.stats() for host, scheduler in _schedulers.items()}
+
+
+def parse_retry_after(value: str | None) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return RETRY_AFTER_DEFAULT
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return RETRY_AFTER_DEFAULT
@@ -0,0 +1,183 @@
+"""Vectorized rule-based flood risk scoring"""
+
+import numpy as np
+
+# Geographic risk modifiers based on known flood-prone areas, checked in order.
+# Each entry: (lat range, lon range, modifier, location bonus, risk factor)
+GEO_REGIONS = [
+    # High-risk areas (river valleys, low-lying coastal plains)
+    ((14.4, 14.8), (120.9, 121.2), 1.5, 20, "Located in flood-prone Metro Manila region"),
+    ((14.0, 15.0), (120.5, 121.5), 1.3, 15, "Located in Central Luzon flood plains"),
+    ((10.0, 11.5), (123.5, 125.0), 1.2, 10, "Located in Eastern Visayas coastal lowlands"),
+    # Low-risk areas (mountainous, well-drained, small islands)
+    ((9.0, 10.5), (123.5, 124.5), 0.4, 0, "Limestone terrain with underground drainage (reduced flood risk)"),
+    ((16.0, 17.0), (120.0, 121.0), 0.6, 0, "Mountainous terrain with steep drainage (reduced flood risk)"),
+    ((9.0, 9.5), (124.5, 125.0), 0.5, 0, "Volcanic island with rapid drainage (reduced flood risk)"),
+]
+
+
+def find_geo_region(latitude: float, longitude: float) -> int | None:
+    """Return the index of the first GEO_REGIONS entry containing the point"""
+    for i, ((lat_min, lat_max), (lon_min, lon_max), *_) in enumerate(GEO_REGIONS):
+        if lat_min <= latitude <= lat_max and lon_min <= longitude <= lon_max:
+            return i
+    return None
+
+
+def series_matrix(series: list) -> np.ndarray:
+    """
+    Stack per-location daily value lists into a (locations, days) array.
+
+    Shorter series are right-padded and None becomes NaN; both are ignored
+    by score_locations.
+    """
+    n_days = max((len(s) for s in series), default=0)
+    matrix = np.full((len(series), n_days), np.nan)
+    for i, values in enumerate(series):
+        matrix[i, :len(values)] = [np.nan if v is None else v for v in values]
+    return matrix
+
+
+def _masked_mean(values: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row mean over valid entries, summed left to right"""
+    counts = valid.sum(axis=1)
+    if values.shape[1] == 0:
+        return np.zeros(len(values)), counts
+    # cumsum accumulates sequentially (unlike pairwise np.sum), and adding
+    # the 0.0 fill for masked entries is exact. That matches sum(list) on
+    # Python < 3.12 only; newer sum() compensates float rounding, so the
+    # scalar rules can differ from these means in the last few ulps.
+    totals = np.cumsum(np.where(valid, values, 0.0), axis=1)[:, -1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+    return np.where(counts > 0, means, 0.0), counts
+
+
+def score_locations(
+    latitudes,
+    longitudes,
+    precipitation: np.ndarray,
+    humidity: np.ndarray,
+    temperature: np.ndarray | None = None,
+    imerg_granules=None
+) -> dict[str, np.ndarray]:
+    """
+    Score many locations in one vectorized pass.
+
+    Applies the same rules as the /api/flood-risk endpoint: precipitation
+    max/average tiers, humidity bonus, geographic modifier, clamping to
+    0-100, IMERG bonus and level bucketing.
+
+    Args:
+        latitudes, longitudes: Arrays of shape (n,)
+        precipitation: Daily precipitation (mm), shape (n, days); NaN or
+                       negative values are ignored
+        humidity: Daily relative humidity (%), shape (n, days); NaN ignored
+        temperature: Optional daily temperature (C), shape (n, days)
+        imerg_granules: Optional IMERG granule counts, shape (n,)
+
+    Returns:
+        Dict of arrays, each of shape (n,): score, level, precip_risk,
+        humidity_bonus, geo_region (-1 if none), geo_modifier,
+        location_bonus, avg_precip, max_precip, avg_humidity, avg_temp
+        (NaN if no data), power_days, imerg_granules
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    precipitation = np.asarray(precipitation, dtype=float)
+    humidity = np.asarray(humidity, dtype=float)
+    n = len(latitudes)
+    imerg_granules = np.zeros(n, dtype=int) if imerg_granules is None else np.asarray(imerg_granules)
+
+    # Climate summaries
+    precip_valid = ~np.isnan(precipitation) & (np.nan_to_num(precipitation, nan=-1.0) >= 0)
+    avg_precip, power_days = _masked_mean(precipitation, precip_valid)
+    if precipitation.shape[1]:
+        max_precip = np.where(precip_valid, precipitation, -np.inf).max(axis=1)
+    else:
+        max_precip = np.full(n, -np.inf)
+    max_precip = np.where(power_days > 0, max_precip, 0.0)
+
+    avg_humidity, _ = _masked_mean(humidity, ~np.isnan(humidity))
+
+    if temperature is not None:
+        temperature = np.asarray(temperature, dtype=float)
+        avg_temp, temp_days = _masked_mean(temperature, ~np.isnan(temperature))
+        avg_temp = np.where(temp_days > 0, avg_temp, np.nan)
+    else:
+        avg_temp = np.full(n, np.nan)
+
+    # Base precipitation risk
+    precip_risk = (
+        np.select([max_precip > 100, max_precip > 50, max_precip > 20], [40, 25, 10], default=0)
+        + np.select([avg_precip > 50, avg_precip > 20], [20, 10], default=0)
+    )
+
+    # Humidity factor (minor impact)
+    humidity_bonus = np.select([avg_humidity > 80, avg_humidity > 70], [10, 3], default=0)
+
+    # Geographic risk modifiers (first matching region wins)
+    in_region = [
+        (lat_min <= latitudes) & (latitudes <= lat_max) & (lon_min <= longitudes) & (longitudes <= lon_max)
+        for (lat_min, lat_max), (lon_min, lon_max), *_ in GEO_REGIONS
+    ]
+    geo_region = np.select(in_region, list(range(len(GEO_REGIONS))), default=-1)
+    geo_modifier = np.select(in_region, [r[2] for r in GEO_REGIONS], default=1.0)
+    location_bonus = np.select(in_region, [r[3] for r in GEO_REGIONS], default=0)
+
+    # Final risk score, evaluated in the same order as the scalar rules
+    score = np.trunc(precip_risk * geo_modifier + humidity_bonus + location_bonus).astype(int)
+    score = np.clip(score, 0, 100)
+    score = score + np.where(imerg_granules > 0, 3, 0)  # Reduced bonus for satellite data
+
+    level = np.select([score >= 60, score >= 30], ["HIGH", "MEDIUM"], default="LOW")
+
+    return {
+        "score": score,
+        "level": level,
+        "precip_risk": precip_risk,
+        "humidity_bonus": humidity_bonus,
+        "geo_region": geo_region,
+        "geo_modifier": geo_modifier,
+        "location_bonus": location_bonus,
+        "avg_precip": avg_precip,
+        "max_precip": max_precip,
+        "avg_humidity": avg_humidity,
+        "avg_temp": avg_temp,
+        "power_days": power_days,
+        "imerg_granules": imerg_granules,
+    }
+
+
+def risk_factors(scores: dict[str, np.ndarray], i: int) -> list[str]:
+    """Human-readable risk factors for location `i` of a score_locations result"""
+    factors = []
+    max_precip = float(scores["max_precip"][i])
+    avg_precip = float(scores["avg_precip"][i])
+    avg_humidity = float(scores["avg_humidity"][i])
+
+    if max_precip > 100:
+        factors.append(f"Very high daily rainfall ({max_precip:.1f}mm)")
+    elif max_precip > 50:
+        factors.append(f"High daily rainfall ({max_precip:.1f}mm)")
+    elif max_precip > 20:
+        factors.append(f"Moderate rainfall ({max_precip:.1f}mm)")
+
+    if avg_precip > 50:
+        factors.append(f"High average rainfall ({avg_precip:.1f}mm/day)")
+    elif avg_precip > 20:
+        factors.append(f"Moderate average rainfall ({avg_precip:.1f}mm/day)")
+
+    if avg_humidity > 80:
+        factors.append(f"High humidity ({avg_humidity:.1f}%)")
+    elif avg_humidity > 70:
+        factors.append(f"Elevated humidity ({avg_humidity:.1f}%)")
+
+    region = int(scores["geo_region"][i])
+    if region >= 0:
+        factors.append(GEO_REGIONS[region][4])
+
+    if scores["imerg_granules"][i] > 0:
+        factors.append("IMERG satellite data available")
+
+    return factors
@@ -0,0 +1,238 @@
+"""Compact array-backed daily climate series"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# NASA POWER marks missing values with this fill value
+POWER_FILL_VALUE = -999.0
+# Parameters whose negative values count as missing, as in the risk scorer
+NON_NEGATIVE_PARAMETERS = {"PRECTOTCORR"}
+
+
+def parse_date(value) -> date:
+    """Date from a date/datetime or a YYYYMMDD / YYYY-MM-DD string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value.replace("-", ""), "%Y%m%d").date()
+
+
+class DailySeries:
+    """
+    Daily climate series for one location: a start date plus one float32
+    array per parameter, with NaN marking missing/fill values.
+
+    POWER publishes values rounded to `decimals` places, so float32 storage
+    is lossless: values() rounds back to the exact float64 the JSON held.
+    """
+
+    __slots__ = ("start", "decimals", "meta", "_values")
+
+    def __init__(self, start, values: dict[str, np.ndarray], meta: dict | None = None, decimals: int = 2):
+        self.start = parse_date(start)
+        self.decimals = decimals
+        self.meta = meta or {}
+        self._values = {name: np.asarray(arr, dtype=np.float32) for name, arr in values.items()}
+
+    @classmethod
+    def from_power_json(cls, payload: dict) -> "DailySeries":
+        """
+        Build a series from a NASA POWER daily point JSON response.
+
+        Raises:
+            ValueError: If the response has no properties.parameter block
+        """
+        if "properties" not in payload or "parameter" not in payload["properties"]:
+            raise ValueError("Unexpected POWER API response format")
+        parameters = payload["properties"]["parameter"]
+
+        keys = set()
+        for param_values in parameters.values():
+            keys.update(param_values.keys())
+        meta = {
+            "parameters_info": payload.get("parameters", {}),
+            "api_version": payload.get("header", {}).get("api_version", "unknown"),
+        }
+        if not keys:
+            return cls(date.today(), {name: np.empty(0) for name in parameters}, meta)
+
+        days = {key: parse_date(key) for key in keys}
+        start = min(days.values())
+        length = (max(days.values()) - start).days + 1
+        index = {key: (d - start).days for key, d in days.items()}
+
+        values = {}
+        for name, param_values in parameters.items():
+            arr = np.full(length, np.nan, dtype=np.float32)
+            positions = np.fromiter((index[k] for k in param_values), dtype=np.int64, count=len(param_values))
+            arr[positions] = np.fromiter(
+                (np.nan if v is None else v for v in param_values.values()),
+                dtype=np.float32, count=len(param_values)
+            )
+            arr[arr == POWER_FILL_VALUE] = np.nan
+            values[name] = arr
+        return cls(start, values, meta)
+
+    def __len__(self) -> int:
+        return max((len(arr) for arr in self._values.values()), default=0)
+
+    @property
+    def parameters(self) -> list[str]:
+        return list(self._values)
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=len(self) - 1)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self._values.values())
+
+    def dates(self) -> list[date]:
+        return [self.start + timedelta(days=i) for i in range(len(self))]
+
+    def values(self, name: str) -> np.ndarray:
+        """
+        Float64 values for a parameter (NaN where missing).
+
+        Unknown parameters come back as all-NaN so callers can treat them
+        as "no data".
+        """
+        arr = self._values.get(name)
+        if arr is None:
+            return np.full(len(self), np.nan)
+        return np.round(arr.astype(np.float64), self.decimals)
+
+    def window(self, start, end) -> "DailySeries":
+        """Sub-series for [start, end] (inclusive), clipped to the available days"""
+        lo = max((parse_date(start) - self.start).days, 0)
+        hi = max((parse_date(end) - self.start).days + 1, lo)
+        return DailySeries(
+            self.start + timedelta(days=lo),
+            {name: arr[lo:hi] for name, arr in self._values.items()},
+            self.meta,
+            self.decimals
+        )
+
+    def _decoded(self) -> dict[str, list]:
+        return {
+            name: [None if np.isnan(v) else v for v in self.values(name).tolist()]
+            for name in self._values
+        }
+
+    def to_power_parameters(self) -> dict[str, dict[str, float | None]]:
+        """Back to POWER's parameter -> {"YYYYMMDD": value} layout"""
+        keys = [d.strftime("%Y%m%d") for d in self.dates()]
+        return {name: dict(zip(keys, values)) for name, values in self._decoded().items()}
+
+    def daily_records(self) -> list[dict]:
+        """One {"date": "YYYYMMDD", <param>: value, ...} record per day"""
+        decoded = self._decoded()
+        return [
+            {"date": d.strftime("%Y%m%d"), **{name: values[i] for name, values in decoded.items()}}
+            for i, d in enumerate(self.dates())
+        ]
+
+    def to_dict(self) -> dict:
+        """JSON-serializable form (see from_dict)"""
+        return {
+            "start": self.start.strftime("%Y%m%d"),
+            "decimals": self.decimals,
+            "meta": self.meta,
+            "values": self._decoded(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DailySeries":
+        return cls(
+            data["start"],
+            {name: [np.nan if v is None else v for v in values] for name, values in data["values"].items()},
+            data.get("meta"),
+            data.get("decimals", 2)
+        )
+
+    def __getstate__(self):
+        return (self.start, self.decimals, self.meta, self._values)
+
+    def __setstate__(self, state):
+        self.start, self.decimals, self.meta, self._values = state
+
+
+class SeriesIndex:
+    """
+    Constant-time summaries of any sub-range of a DailySeries.
+
+    Its tables are float64 and the max table is O(n log n), several times
+    the size of the float32 series, so build one per request that needs
+    many windows and don't attach it to cached series.
+
+    Per parameter it keeps prefix sums and counts of valid days (not NaN,
+    and not negative for NON_NEGATIVE_PARAMETERS) for sum, count and
+    mean, and a sparse table of power-of-two range maxima
+    (any range is covered by two overlapping blocks). A parameter's
+    tables are built the first time it is queried, in O(n log n); each
+    query after that is O(1).
+    """
+
+    def __init__(self, series: DailySeries):
+        self.series = series
+        self.length = len(series)
+        self._sums: dict[str, np.ndarray] = {}
+        self._counts: dict[str, np.ndarray] = {}
+        self._max_tables: dict[str, list[np.ndarray]] = {}
+
+    def _build(self, name: str) -> bool:
+        """Build one parameter's tables if needed; False if the series doesn't have it"""
+        if name in self._sums:
+            return True
+        if name not in self.series.parameters:
+            return False
+        values = self.series.values(name)
+        valid = ~np.isnan(values)
+        if name in NON_NEGATIVE_PARAMETERS:
+            valid &= values >= 0
+        table = [np.where(valid, values, -np.inf)]
+        span = 1
+        while span * 2 <= self.length:
+            previous = table[-1]
+            table.append(np.maximum(previous[:-span], previous[span:]))
+            span *= 2
+        self._counts[name] = np.concatenate([[0], np.cumsum(valid)])
+        self._max_tables[name] = table
+        self._sums[name] = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+        return True
+
+    def positions(self, start, end) -> tuple[int, int] | None:
+        """Inclusive array positions for [start, end], clipped to the series (None if empty)"""
+        lo = max((parse_date(start) - self.series.start).days, 0)
+        hi = min((parse_date(end) - self.series.start).days, self.length - 1)
+        return (lo, hi) if lo <= hi else None
+
+    def summary(self, name: str, lo: int, hi: int) -> dict:
+        """sum, count, mean and max of a parameter over positions lo..hi (inclusive)"""
+        if not self._build(name):
+            return {"count": 0, "sum": None, "mean": None, "max": None}
+        count = int(self._counts[name][hi + 1] - self._counts[name][lo])
+        if count == 0:
+            return {"count": 0, "sum": None, "mean": None, "max": None}
+        total = float(self._sums[name][hi + 1] - self._sums[name][lo])
+        level = (hi - lo + 1).bit_length() - 1
+        table = self._max_tables[name][level]
+        decimals = self.series.decimals
+        return {
+            "count": count,
+            "sum": round(total, decimals),
+            "mean": round(total / count, decimals),
+            "max": round(float(max(table[lo], table[hi - (1 << level) + 1])), decimals),
+        }
+
+    def window_summary(self, start, end, parameters: list[str] | None = None) -> dict:
+        """Per-parameter summaries for the dates [start, end]"""
+        names = parameters or self.series.parameters
+        span = self.positions(start, end)
+        if span is None:
+            return {"days": 0, "parameters": {name: self.summary(name, 0, -1) for name in names}}
+        lo, hi = span
+        return {"days": hi - lo + 1, "parameters": {name: self.summary(name, lo, hi) for name in names}}
@@ -0,0 +1,324 @@
+"""Resilient upstream calls: hedged requests, circuit breaking and stale fallback"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from .cache import get_cache
+from .profiling import record_upstream
+from .scheduler import BATCH, INTERACTIVE, HostBlockedError, HostScheduler, get_scheduler, parse_retry_after
+from .series import DailySeries
+from .utils import snap_to_power_cell
+from .config import (
+    NASA_POWER_URL,
+    UPSTREAM_TIMEOUT,
+    DOWNLOAD_TIMEOUT,
+    HEDGE_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    POWER_CACHE_SIZE,
+    POWER_FRESH_TTL,
+)
+
+# 429 retries per priority class: batch work waits out Retry-After, interactive fails fast
+# (and fails immediately, without a request, while the host is still blocked)
+RATE_LIMIT_RETRIES = {INTERACTIVE: 0, BATCH: 3}
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream service cannot produce a usable response"""
+
+    status_code = 502
+
+
+class UpstreamClientError(UpstreamError):
+    """Raised when an upstream service rejects the request itself (4xx)"""
+
+    status_code = 400
+
+
+class UpstreamRateLimitError(UpstreamError):
+    """Raised when an upstream host keeps answering 429 Too Many Requests"""
+
+    status_code = 503
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised when a host's circuit breaker is failing calls fast"""
+
+    status_code = 503
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    Closed: calls go through. After `failure_threshold` consecutive failures
+    the circuit opens and calls fail immediately. Once `reset_timeout` has
+    passed, a single probe call is let through (half-open); its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Let another probe through if the current one ended without an outcome"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Get (or create) the circuit breaker for the host of `url`"""
+    host = urlsplit(url).netloc
+    if host not in _breakers:
+        _breakers[host] = CircuitBreaker()
+    return _breakers[host]
+
+
+def breaker_states() -> dict[str, str]:
+    """Current circuit state per upstream host"""
+    return {host: breaker.state for host, breaker in _breakers.items()}
+
+
+async def hedged_get(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict | None = None,
+    headers: dict | None = None,
+    hedge_delay: float = HEDGE_DELAY,
+    scheduler: HostScheduler | None = None,
+    priority: int = INTERACTIVE
+) -> httpx.Response:
+    """
+    GET with a hedged duplicate.
+
+    If the first attempt has not completed after `hedge_delay` seconds, an
+    identical second request is sent and whichever succeeds first wins; the
+    other is cancelled. Raises the last transport error if both fail.
+    With a `scheduler`, the hedge is only sent if a rate-limit token is
+    free immediately, so hedging never queues behind other traffic.
+    """
+    attempts = [asyncio.create_task(client.get(url, params=params, headers=headers))]
+    done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+    if not done and (scheduler is None or scheduler.try_acquire(priority)):
+        attempts.append(asyncio.create_task(client.get(url, params=params, headers=headers)))
+
+    pending = set(attempts)
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _request(
+    url: str,
+    params: dict | None,
+    headers: dict | None,
+    timeout: float,
+    hedge: bool,
+    priority: int,
+    follow_redirects: bool = False
+) -> httpx.Response:
+    """
+    Send a GET through the host's rate scheduler and circuit breaker.
+
+    Timeouts, transport errors and 5xx responses count as breaker
+    failures; 4xx responses are the caller's fault and do not. A 429
+    backs off the whole host for its Retry-After; batch calls then wait
+    and retry, while interactive calls fail fast with
+    UpstreamRateLimitError until the block ends (fetch_power then serves
+    stale data if it has any).
+    """
+    breaker = get_breaker(url)
+    scheduler = get_scheduler(url)
+    host = urlsplit(url).netloc
+    path = urlsplit(url).path
+
+    for attempt in range(RATE_LIMIT_RETRIES[priority] + 1):
+        probe = breaker.state == "half-open"
+        if not breaker.allow():
+            record_upstream(host, path, "circuit_open", 0.0, 0.0, priority)
+            raise CircuitOpenError(f"{host} is unavailable (circuit open)")
+        try:
+            queued = time.perf_counter()
+            try:
+                await scheduler.acquire(priority)
+            except HostBlockedError as e:
+                record_upstream(host, path, "rate_limited", 0.0, (time.perf_counter() - queued) * 1000, priority)
+                raise UpstreamRateLimitError(str(e)) from e
+            started = time.perf_counter()
+            queued_ms = (started - queued) * 1000
+
+            try:
+                async with httpx.AsyncClient(timeout=timeout, follow_redirects=follow_redirects) as client:
+                    if hedge:
+                        r = await hedged_get(client, url, params=params, headers=headers,
+                                             scheduler=scheduler, priority=priority)
+                    else:
+                        r = await client.get(url, params=params, headers=headers)
+            except httpx.HTTPError as e:
+                breaker.record_failure()
+                record_upstream(host, path, e.__class__.__name__, (time.perf_counter() - started) * 1000,
+                                queued_ms, priority)
+                raise UpstreamError(f"{host} request failed: {e.__class__.__name__}") from e
+            record_upstream(host, path, f"HTTP {r.status_code}", (time.perf_counter() - started) * 1000,
+                            queued_ms, priority)
+
+            if r.status_code >= 500:
+                breaker.record_failure()
+                raise UpstreamError(f"{host} returned HTTP {r.status_code}")
+
+            breaker.record_success()
+            if r.status_code == 429:
+                scheduler.backoff(parse_retry_after(r.headers.get("Retry-After")))
+                continue
+            if r.status_code >= 400:
+                raise UpstreamClientError(f"{host} rejected the request (HTTP {r.status_code})")
+            return r
+        finally:
+            # A cancelled or otherwise abandoned half-open probe must not
+            # keep the breaker waiting for an outcome that never comes
+            if probe:
+                breaker.release_probe()
+
+    raise UpstreamRateLimitError(f"{host} is rate limiting requests")
+
+
+async def get_json(
+    url: str,
+    params: dict | None = None,
+    headers: dict | None = None,
+    timeout: float = UPSTREAM_TIMEOUT,
+    hedge: bool = True,
+    priority: int = INTERACTIVE
+) -> dict:
+    """
+    Fetch JSON from an upstream service (see _request for failure handling).
+
+    Raises:
+        CircuitOpenError: The host's circuit is open
+        UpstreamRateLimitError: The host kept answering 429
+        UpstreamClientError: Upstream rejected the request (4xx)
+        UpstreamError: Upstream failed or timed out
+    """
+    r = await _request(url, params, headers, timeout, hedge, priority)
+    return r.json()
+
+
+async def fetch_bytes(
+    url: str,
+    headers: dict | None = None,
+    timeout: float = DOWNLOAD_TIMEOUT,
+    priority: int = INTERACTIVE
+) -> bytes:
+    """Download a file (following redirects) through the host's scheduler and breaker"""
+    r = await _request(url, None, headers, timeout, False, priority, follow_redirects=True)
+    return r.content
+
+
+# Recent POWER responses: cache key -> (fetched_at, DailySeries)
+_power_cache = get_cache("power", POWER_CACHE_SIZE)
+
+
+# MERRA-2 meteorology parameters: identical for every point in a POWER grid cell
+POWER_CELL_PARAMETERS = {"T2M", "T2M_MAX", "T2M_MIN", "PRECTOTCORR", "RH2M", "QV2M", "WS2M", "WS10M", "PS"}
+
+
+def _power_cache_key(params: dict) -> tuple:
+    """
+    Cache key for a POWER request.
+
+    Requests for only meteorology parameters are keyed by grid cell, so
+    nearby points (and the prefetcher's cell-center fetches) share entries.
+    """
+    key = dict(params)
+    parameters = set(str(key.get("parameters", "")).split(","))
+    if parameters <= POWER_CELL_PARAMETERS and "latitude" in key and "longitude" in key:
+        key["latitude"], key["longitude"] = snap_to_power_cell(float(key["latitude"]), float(key["longitude"]))
+    return tuple(sorted((k, str(v)) for k, v in key.items()))
+
+
+async def fetch_power(params: dict, priority: int = INTERACTIVE) -> tuple[DailySeries, float | None]:
+    """
+    Fetch a NASA POWER daily point response as a DailySeries, falling back
+    to cache.
+
+    Cached series younger than POWER_FRESH_TTL are served directly. If
+    upstream fails and an older cached series exists, that is served
+    instead of raising.
+
+    Args:
+        params: Query parameters for the POWER daily point API
+        priority: Scheduler priority class (INTERACTIVE or BATCH)
+
+    Returns:
+        Tuple of (series, stale_age) where stale_age is None for fresh data,
+        otherwise the age in seconds of the cached series being served
+    """
+    key = _power_cache_key(params)
+    cached = await _power_cache.aget(key)
+    now = time.time()
+    if cached and now - cached[0] < POWER_FRESH_TTL:
+        return cached[1], None
+
+    try:
+        series = DailySeries.from_power_json(await get_json(NASA_POWER_URL, params=params, priority=priority))
+    except ValueError as e:
+        raise UpstreamError(str(e)) from e
+    except UpstreamClientError:
+        raise
+    except UpstreamError as e:
+        if cached is None:
+            raise
+        print(f"⚠️ NASA POWER unavailable ({e}), serving cached data")
+        return cached[1], now - cached[0]
+
+    await _power_cache.aset(key, (now, series))
+    return series, None
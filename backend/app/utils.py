@@ -1,5 +1,7 @@
 """Utility functions for data processing"""
 
+from .config import POWER_CELL_LAT, POWER_CELL_LON
+
 # Optional imports for scientific datasets
 try:
     import xarray as xr  # type: ignore
@@ -72,3 +74,22 @@ def create_bbox_from_point(latitude: float, longitude: float, margin: float = 0.
         Bounding box string "minLon,minLat,maxLon,maxLat"
     """
     return f"{longitude-margin},{latitude-margin},{longitude+margin},{latitude+margin}"
+
+
+def snap_to_power_cell(latitude: float, longitude: float) -> tuple[float, float]:
+    """
+    Snap a point to the center of its NASA POWER grid cell
+    
+    Every point inside a cell gets identical POWER data, so the snapped
+    coordinates are a safe cache key for POWER-derived results.
+    
+    Args:
+        latitude: Latitude in decimal degrees
+        longitude: Longitude in decimal degrees
+    
+    Returns:
+        Tuple of (cell_latitude, cell_longitude)
+    """
+    cell_lat = round(latitude / POWER_CELL_LAT) * POWER_CELL_LAT
+    cell_lon = round(longitude / POWER_CELL_LON) * POWER_CELL_LON
+    return round(cell_lat, 4), round(cell_lon, 4)
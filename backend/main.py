@@ -8,6 +8,10 @@ From "bahala na" to "may plano na" - Flood awareness through data
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.jobs import jobs
+from app.model_registry import registry
+from app.prefetch import prefetcher
+from app.profiling import profiling_middleware
 from app.routes import api_router
 
 # Create FastAPI application
@@ -28,10 +32,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Trace requests, profile them on demand and log slow ones
+app.middleware("http")(profiling_middleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
 
+@app.on_event("startup")
+async def start_model_registry():
+    """Load the flood model and watch for new versions"""
+    registry.start()
+
+
+@app.on_event("shutdown")
+async def stop_model_registry():
+    registry.stop()
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start the worker pool for background jobs"""
+    jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    jobs.stop()
+
+
+@app.on_event("startup")
+async def start_prefetcher():
+    """Keep the most requested POWER cells and windows warm"""
+    prefetcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_prefetcher():
+    prefetcher.stop()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -45,7 +85,10 @@ async def root():
             "imerg_metadata": "/api/imerg/metadata",
             "imerg_download": "/api/imerg",
             "power_climate": "/api/power/climate",
-            "flood_risk": "/api/flood-risk"
+            "flood_risk": "/api/flood-risk",
+            "model": "/api/model",
+            "jobs": "/api/jobs",
+            "debug": "/api/debug/slow-requests"
         }
     }
 
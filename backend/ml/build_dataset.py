@@ -0,0 +1,358 @@
+"""Build training datasets from NASA POWER (and optionally IMERG) in parallel"""
+import argparse
+import asyncio
+import json
+import re
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from app.config import CMR_SEARCH_URL, EARTHDATA_JWT, IMERG_DATASET_NAME, NASA_POWER_URL, RECENT_WINDOW_DAYS
+from app.series import DailySeries
+from app.scheduler import BATCH
+from app.upstream import UpstreamError, get_json
+from app.utils import create_bbox_from_point
+
+# Optional columnar output
+try:
+    import pyarrow  # type: ignore  # noqa: F401
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+
+# Same column layout as training_data_complete.csv
+OUTPUT_COLUMNS = [
+    'date', 'location', 'latitude', 'longitude',
+    'temperature', 'precipitation', 'humidity', 'wind_speed',
+    'imerg_available', 'flood_occurred', 'label_source',
+    'precip_7day', 'precip_3day', 'flood_confidence', 'flood_reason'
+]
+
+POWER_PARAMETERS = {
+    'T2M': 'temperature',
+    'PRECTOTCORR': 'precipitation',
+    'RH2M': 'humidity',
+    'WS2M': 'wind_speed',
+}
+
+# Days fetched before Jan 1 so 7-day sums are complete at the year boundary
+LEAD_IN_DAYS = 6
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_').lower()
+
+
+def load_events(events_file: str | None) -> dict[tuple[str, str], dict]:
+    """
+    Load known flood events for labeling.
+
+    Expected columns: location, date (YYYY-MM-DD), and optionally
+    confidence (0-1) and label_source.
+
+    Returns:
+        Mapping of (location, date) -> {"confidence", "label_source"}
+    """
+    if not events_file:
+        return {}
+    events = pd.read_csv(events_file)
+    labels = {}
+    for row in events.to_dict('records'):
+        day = pd.Timestamp(row['date']).strftime('%Y-%m-%d')
+        labels[(row['location'], day)] = {
+            'confidence': float(row.get('confidence', 1.0)),
+            'label_source': row.get('label_source', 'event_catalog'),
+        }
+    return labels
+
+
+def settled_end(year: int, today: date) -> date:
+    """
+    Last day of `year` whose POWER values are final as of `today`.
+
+    POWER backfills the most recent RECENT_WINDOW_DAYS, so a chunk is only
+    complete once it covers everything up to this day.
+    """
+    return min(date(year, 12, 31), today - timedelta(days=RECENT_WINDOW_DAYS))
+
+
+class CheckpointStore:
+    """
+    Tracks finished (location, year) tasks so interrupted runs can resume.
+
+    Each completed task records its chunk file and the day through which
+    its data is final; chunks for a year that is still filling in are
+    refetched on later runs until they cover the whole year.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.path = output_dir / CHECKPOINT_FILE
+        self.state = {'completed': {}, 'failed': {}}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.state = json.load(f)
+
+    def part_file(self, task_id: str) -> str:
+        return self.state['completed'][task_id]['part']
+
+    def is_done(self, task_id: str, output_dir: Path, final_through: date) -> bool:
+        entry = self.state['completed'].get(task_id)
+        if entry is None or not (output_dir / entry['part']).exists():
+            return False
+        return date.fromisoformat(entry['through']) >= final_through
+
+    def mark_done(self, task_id: str, part_file: str, through: date):
+        self.state['completed'][task_id] = {'part': part_file, 'through': through.isoformat()}
+        self.state['failed'].pop(task_id, None)
+        self._save()
+
+    def mark_failed(self, task_id: str, error: str):
+        self.state['failed'][task_id] = error
+        self._save()
+
+    def _save(self):
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        tmp_path.replace(self.path)
+
+
+async def fetch_power_series(
+    latitude: float,
+    longitude: float,
+    start: date,
+    end: date,
+    power_url: str = NASA_POWER_URL
+) -> DailySeries:
+    """Fetch one POWER daily point series for the builder's parameters"""
+    payload = await get_json(power_url, params={
+        "parameters": ",".join(POWER_PARAMETERS),
+        "community": "AG",
+        "longitude": longitude,
+        "latitude": latitude,
+        "start": start.strftime("%Y%m%d"),
+        "end": end.strftime("%Y%m%d"),
+        "format": "JSON"
+    }, hedge=False, priority=BATCH)
+    return DailySeries.from_power_json(payload)
+
+
+async def fetch_imerg_days(
+    latitude: float,
+    longitude: float,
+    start: date,
+    end: date,
+    cmr_url: str = CMR_SEARCH_URL,
+    authorization: str | None = None
+) -> set[str]:
+    """Dates (YYYY-MM-DD) with at least one IMERG granule over the point"""
+    headers = {"Authorization": authorization} if authorization else None
+    days = set()
+    page_num = 1
+    while True:
+        results = await get_json(cmr_url, params={
+            "short_name": IMERG_DATASET_NAME,
+            "page_size": 2000,
+            "page_num": page_num,
+            "sort_key": "start_date",
+            "temporal": f"{start.isoformat()}T00:00:00Z/{end.isoformat()}T23:59:59Z",
+            "bounding_box": create_bbox_from_point(latitude, longitude, margin=0.5)
+        }, headers=headers, hedge=False, priority=BATCH)
+        entries = results.get("feed", {}).get("entry", [])
+        days.update(g["time_start"][:10] for g in entries if g.get("time_start"))
+        if len(entries) < 2000:
+            return days
+        page_num += 1
+
+
+def build_rows(
+    location: dict,
+    series: DailySeries,
+    year_start: date,
+    imerg_days: set[str] | None,
+    labels: dict
+) -> pd.DataFrame:
+    """Turn a fetched series (with lead-in days) into dataset rows for one year"""
+    df = pd.DataFrame({'date': pd.to_datetime(series.dates())})
+    for param, column in POWER_PARAMETERS.items():
+        df[column] = series.values(param)
+
+    df['precip_7day'] = df['precipitation'].rolling(7, min_periods=1).sum()
+    df['precip_3day'] = df['precipitation'].rolling(3, min_periods=1).sum()
+    df = df[df['date'] >= pd.Timestamp(year_start)].reset_index(drop=True)
+
+    day_keys = df['date'].dt.strftime('%Y-%m-%d')
+    df['date'] = day_keys
+    df['location'] = location['location']
+    df['latitude'] = location['latitude']
+    df['longitude'] = location['longitude']
+    df['imerg_available'] = day_keys.isin(imerg_days).astype(int) if imerg_days is not None else 0
+
+    events = [labels.get((location['location'], d)) for d in day_keys]
+    df['flood_occurred'] = [int(e is not None) for e in events]
+    df['flood_confidence'] = [e['confidence'] if e else 0.0 for e in events]
+    df['label_source'] = [e['label_source'] if e else 'no_flood' for e in events]
+    df['flood_reason'] = df['label_source']
+    return df[OUTPUT_COLUMNS]
+
+
+def write_chunk(df: pd.DataFrame, output_dir: Path, name: str) -> str:
+    """Write one chunk as Parquet (CSV if pyarrow is missing); returns the file name"""
+    if HAS_PYARROW:
+        file_name = f"{name}.parquet"
+        tmp_path = output_dir / f"{file_name}.tmp"
+        df.to_parquet(tmp_path, index=False)
+    else:
+        file_name = f"{name}.csv"
+        tmp_path = output_dir / f"{file_name}.tmp"
+        df.to_csv(tmp_path, index=False)
+    tmp_path.replace(output_dir / file_name)
+    return file_name
+
+
+async def build_dataset(
+    locations: list[dict],
+    years: list[int],
+    output_dir: str,
+    concurrency: int = 4,
+    include_imerg: bool = False,
+    events_file: str | None = None,
+    power_url: str = NASA_POWER_URL,
+    cmr_url: str = CMR_SEARCH_URL,
+    authorization: str | None = None,
+    today: date | None = None
+) -> dict:
+    """
+    Fetch daily data for every (location, year) and write one chunk per pair.
+
+    Tasks run concurrently, at most `concurrency` at a time. Each finished
+    chunk is recorded in checkpoint.json, so rerunning with the same
+    output_dir skips completed work and retries failures. Chunks for the
+    current year (or one whose last days POWER may still backfill) are
+    refetched until they are final.
+
+    Args:
+        locations: Dicts with location, latitude, longitude
+        years: Calendar years to fetch
+        output_dir: Directory for chunks and checkpoint
+        concurrency: Maximum simultaneous (location, year) tasks
+        include_imerg: Also mark days with IMERG granules (imerg_available)
+        events_file: Optional CSV of known floods used for labels
+        power_url, cmr_url: Upstream endpoints (point at a local stand-in to test)
+        authorization: Earthdata "Bearer <token>" for CMR (default: EARTHDATA_JWT)
+        today: Reference date for partial years (default: date.today())
+
+    Returns:
+        Summary with counts of completed, skipped and failed tasks
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    checkpoint = CheckpointStore(out)
+    labels = load_events(events_file)
+    if authorization is None and EARTHDATA_JWT:
+        authorization = f"Bearer {EARTHDATA_JWT}"
+    if not HAS_PYARROW:
+        print("⚠️  pyarrow not installed, writing CSV chunks instead of Parquet")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {'completed': 0, 'skipped': 0, 'failed': 0}
+    today = today or date.today()
+
+    async def run_task(location: dict, year: int):
+        task_id = f"{location['location']}:{year}"
+        final_through = settled_end(year, today)
+        if checkpoint.is_done(task_id, out, final_through):
+            summary['skipped'] += 1
+            return
+
+        year_start = date(year, 1, 1)
+        year_end = min(date(year, 12, 31), today - timedelta(days=1))
+        if year_end < year_start:
+            print(f"   ⏭️  {task_id}: no days before {today} yet")
+            summary['skipped'] += 1
+            return
+
+        async with semaphore:
+            try:
+                series = await fetch_power_series(
+                    location['latitude'], location['longitude'],
+                    year_start - timedelta(days=LEAD_IN_DAYS), year_end, power_url
+                )
+                imerg_days = None
+                if include_imerg:
+                    imerg_days = await fetch_imerg_days(
+                        location['latitude'], location['longitude'],
+                        year_start, year_end, cmr_url, authorization
+                    )
+            except (UpstreamError, ValueError) as e:
+                print(f"   ❌ {task_id}: {e}")
+                checkpoint.mark_failed(task_id, str(e))
+                summary['failed'] += 1
+                return
+
+        df = build_rows(location, series, year_start, imerg_days, labels)
+        part = write_chunk(df, out, f"part-{_slug(location['location'])}-{year}")
+        checkpoint.mark_done(task_id, part, final_through)
+        summary['completed'] += 1
+        print(f"   ✅ {task_id}: {len(df)} rows -> {part}")
+
+    print(f"📡 Building dataset: {len(locations)} locations x {len(years)} years "
+          f"(concurrency {concurrency})")
+    await asyncio.gather(*(run_task(loc, year) for loc in locations for year in years))
+    print(f"\n✅ Done: {summary['completed']} written, {summary['skipped']} skipped, "
+          f"{summary['failed']} failed")
+    if summary['failed']:
+        print("   Rerun the same command to retry failed tasks.")
+    return summary
+
+
+def load_dataset(output_dir: str) -> pd.DataFrame:
+    """Read every completed chunk back into one DataFrame sorted by location and date"""
+    out = Path(output_dir)
+    checkpoint = CheckpointStore(out)
+    parts = sorted(checkpoint.part_file(task_id) for task_id in checkpoint.state['completed'])
+    frames = [
+        pd.read_parquet(out / p) if p.endswith('.parquet') else pd.read_csv(out / p)
+        for p in parts
+    ]
+    if not frames:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values(['location', 'date'], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a flood training dataset from NASA POWER/IMERG")
+    parser.add_argument("locations", help="CSV with location, latitude, longitude columns")
+    parser.add_argument("--start-year", type=int, required=True)
+    parser.add_argument("--end-year", type=int, required=True)
+    parser.add_argument("--output-dir", default=str(Path(__file__).parent / "models" / "dataset"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--imerg", action="store_true", help="Mark days with IMERG granules")
+    parser.add_argument("--events", help="CSV of known flood events (location, date[, confidence, label_source])")
+    parser.add_argument("--power-url", default=NASA_POWER_URL)
+    parser.add_argument("--cmr-url", default=CMR_SEARCH_URL)
+    parser.add_argument("--combine", help="Also write all chunks into this single CSV")
+    args = parser.parse_args()
+
+    locations = pd.read_csv(args.locations)[['location', 'latitude', 'longitude']].to_dict('records')
+    years = list(range(args.start_year, args.end_year + 1))
+    asyncio.run(build_dataset(
+        locations, years, args.output_dir,
+        concurrency=args.concurrency,
+        include_imerg=args.imerg,
+        events_file=args.events,
+        power_url=args.power_url,
+        cmr_url=args.cmr_url
+    ))
+
+    if args.combine:
+        df = load_dataset(args.output_dir)
+        df.to_csv(args.combine, index=False)
+        print(f"💾 Combined {len(df)} rows into {args.combine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Compress the flood model and report size/latency against held-out accuracy"""
+import argparse
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+from .feature_engineering import create_features, select_feature_columns
+
+MODELS_DIR = Path(__file__).parent / "models"
+
+# Candidate shapes: truncate the teacher to its first N trees, or train a
+# smaller booster (hard labels, or distilled from teacher probabilities)
+PRUNE_TREES = [10, 25, 50, 100]
+SMALL_SHAPES = [(25, 3), (50, 3), (50, 4), (100, 4), (100, 6)]  # (n_estimators, max_depth)
+
+
+def held_out_split(data_file: str, test_size: float = 0.2, random_state: int = 42):
+    """
+    Rebuild the exact train/test split train_flood_model used.
+
+    Returns:
+        X_train, X_test, y_train, y_test
+    """
+    df = create_features(pd.read_csv(data_file)).dropna()
+    X = df[select_feature_columns()]
+    y = df['flood_occurred']
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+
+def truncate_model(model: XGBClassifier, n_trees: int) -> XGBClassifier:
+    """Keep only the first `n_trees` boosting rounds, as a loadable XGBClassifier"""
+    booster = model.get_booster()[:n_trees]
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = Path(tmp) / "booster.json"
+        booster.save_model(str(model_file))
+        pruned = XGBClassifier()
+        pruned.load_model(str(model_file))
+    pruned.set_params(max_depth=model.get_params().get('max_depth'))
+    return pruned
+
+
+def train_small_model(
+    teacher: XGBClassifier,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    n_estimators: int,
+    max_depth: int,
+    distill: bool
+) -> XGBClassifier:
+    """
+    Train a smaller booster with the teacher's other hyperparameters.
+
+    With `distill`, every row appears twice, as a flood with weight p and
+    as no flood with weight 1 - p, where p is the teacher's probability.
+    The log loss on that data is exactly the cross-entropy against the
+    teacher's soft labels, so the student learns the teacher's margins
+    rather than just its 0/1 decisions.
+    """
+    params = teacher.get_params()
+    params.update(n_estimators=n_estimators, max_depth=max_depth, verbosity=0)
+    student = XGBClassifier(**params)
+    if not distill:
+        student.fit(X_train, y_train)
+        return student
+
+    soft = teacher.predict_proba(X_train)[:, 1]
+    X_twice = pd.concat([X_train, X_train], ignore_index=True)
+    y_twice = np.concatenate([np.ones(len(X_train), dtype=int), np.zeros(len(X_train), dtype=int)])
+    weights = np.concatenate([soft, 1.0 - soft])
+    # scale_pos_weight is already baked into the teacher's probabilities
+    student.set_params(scale_pos_weight=1.0)
+    student.fit(X_twice, y_twice, sample_weight=weights)
+    return student
+
+
+def model_size(model) -> int:
+    """Bytes of the joblib pickle the API would load"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getbuffer().nbytes
+
+
+def measure(model, X_test: pd.DataFrame, y_test: pd.Series, latency_rows: int = 200, repeats: int = 3) -> dict:
+    """
+    Held-out accuracy plus inference cost.
+
+    Per-row latency is the median of single-row predict_proba calls on a
+    one-row DataFrame, which is what the API does per request. Throughput
+    is the best of `repeats` full-batch passes.
+    """
+    proba = model.predict_proba(X_test)[:, 1]
+    pred = (proba >= 0.5).astype(int)
+
+    rows = [X_test.iloc[[i]] for i in range(min(latency_rows, len(X_test)))]
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - started)
+
+    batch_seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict_proba(X_test)
+        batch_seconds.append(time.perf_counter() - started)
+
+    booster = model.get_booster()
+    depth = model.get_params().get('max_depth')
+    return {
+        'n_trees': booster.num_boosted_rounds(),
+        'max_depth': depth,
+        'size_bytes': model_size(model),
+        'latency_ms_p50': float(np.median(timings) * 1000),
+        'latency_ms_p95': float(np.percentile(timings, 95) * 1000),
+        'throughput_rows_per_s': float(len(X_test) / min(batch_seconds)),
+        'f1': float(f1_score(y_test, pred, zero_division=0)),
+        'auc': float(roc_auc_score(y_test, proba)) if y_test.nunique() > 1 else None,
+    }
+
+
+def compress_flood_model(
+    data_file: str,
+    model_file: str = None,
+    f1_tolerance: float = 0.02,
+    auc_tolerance: float = 0.01,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    report_file: str = None,
+    save_version: str = None
+) -> dict:
+    """
+    Try pruned, retrained and distilled variants of the flood model and
+    pick the smallest one within tolerance of the teacher.
+
+    Args:
+        data_file: The dataset the teacher was trained on (for the same split)
+        model_file: Teacher model (default: backend/ml/models/flood_model.pkl)
+        f1_tolerance: Largest acceptable drop in held-out F1
+        auc_tolerance: Largest acceptable drop in held-out AUC
+        test_size, random_state: Must match the values used for training
+        report_file: Where to write the JSON report (default: next to the model)
+        save_version: Also save the chosen model as registry version
+                      models/versions/<save_version>/ (the API picks it up)
+
+    Returns:
+        Report with every candidate's metrics and the chosen one
+    """
+    if model_file is None:
+        model_file = str(MODELS_DIR / "flood_model.pkl")
+    teacher = joblib.load(model_file)
+
+    print("📂 Rebuilding the held-out split...")
+    X_train, X_test, y_train, y_test = held_out_split(data_file, test_size, random_state)
+    print(f"   Train: {len(X_train)}  Test: {len(X_test)}  Test positives: {int(y_test.sum())}")
+
+    teacher_trees = teacher.get_booster().num_boosted_rounds()
+    candidates = {'teacher': teacher}
+    for n_trees in PRUNE_TREES:
+        if n_trees < teacher_trees:
+            candidates[f'prune_{n_trees}'] = truncate_model(teacher, n_trees)
+    print(f"\n🚀 Training {2 * len(SMALL_SHAPES)} smaller boosters...")
+    for n_estimators, max_depth in SMALL_SHAPES:
+        candidates[f'small_{n_estimators}x{max_depth}'] = train_small_model(
+            teacher, X_train, y_train, n_estimators, max_depth, distill=False
+        )
+        candidates[f'distill_{n_estimators}x{max_depth}'] = train_small_model(
+            teacher, X_train, y_train, n_estimators, max_depth, distill=True
+        )
+
+    print("\n⏱️  Measuring candidates...")
+    results = {name: measure(model, X_test, y_test) for name, model in candidates.items()}
+    baseline = results['teacher']
+    for name, r in results.items():
+        auc_ok = r['auc'] is None or baseline['auc'] is None or r['auc'] >= baseline['auc'] - auc_tolerance
+        r['within_tolerance'] = bool(r['f1'] >= baseline['f1'] - f1_tolerance and auc_ok)
+
+    eligible = [name for name, r in results.items() if r['within_tolerance']]
+    chosen = min(eligible, key=lambda n: (results[n]['size_bytes'], results[n]['latency_ms_p50']))
+
+    print("\n" + "="*96)
+    print(f"{'candidate':18s} {'trees':>5s} {'depth':>5s} {'size KB':>8s} {'p50 ms':>7s} {'p95 ms':>7s} "
+          f"{'rows/s':>10s} {'F1':>6s} {'AUC':>6s}  ok")
+    print("="*96)
+    for name, r in sorted(results.items(), key=lambda item: item[1]['size_bytes']):
+        auc = f"{r['auc']:.3f}" if r['auc'] is not None else "  n/a"
+        marker = "✅" if r['within_tolerance'] else "  "
+        chosen_marker = "  ← chosen" if name == chosen else ""
+        print(f"{name:18s} {r['n_trees']:5d} {str(r['max_depth']):>5s} {r['size_bytes'] / 1024:8.1f} "
+              f"{r['latency_ms_p50']:7.3f} {r['latency_ms_p95']:7.3f} {r['throughput_rows_per_s']:10.0f} "
+              f"{r['f1']:6.3f} {auc:>6s}  {marker}{chosen_marker}")
+
+    report = {
+        'data_file': str(data_file),
+        'teacher': str(model_file),
+        'test_size': len(X_test),
+        'test_positives': int(y_test.sum()),
+        'f1_tolerance': f1_tolerance,
+        'auc_tolerance': auc_tolerance,
+        'chosen': chosen,
+        'size_reduction': round(1 - results[chosen]['size_bytes'] / baseline['size_bytes'], 4),
+        'candidates': results,
+    }
+    if report_file is None:
+        report_file = str(Path(model_file).with_name('compression_report.json'))
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved report to {report_file}")
+    print(f"   Chosen: {chosen} ({report['size_reduction'] * 100:.0f}% smaller than the teacher)")
+
+    if save_version:
+        save_compressed(candidates[chosen], results[chosen], model_file, chosen, save_version)
+    return report
+
+
+def save_compressed(model, metrics: dict, teacher_file: str, candidate: str, version: str):
+    """Write a chosen model as a registry version, with metadata derived from the teacher's"""
+    out_dir = MODELS_DIR / "versions" / version
+    out_dir.mkdir(parents=True, exist_ok=True)
+    teacher_meta_file = Path(teacher_file).with_suffix('.json')
+    metadata = json.loads(teacher_meta_file.read_text()) if teacher_meta_file.exists() else {}
+    metadata.update({
+        'model_type': f"{metadata.get('model_type', 'XGBoost')} (compressed: {candidate})",
+        'feature_columns': select_feature_columns(),
+        'train_date': pd.Timestamp.now().isoformat(),
+        'test_f1_score': metrics['f1'],
+        'test_auc': metrics['auc'],
+        'compressed_from': str(teacher_file),
+        'compression': metrics,
+    })
+    metadata.pop('model_params', None)
+    joblib.dump(model, out_dir / "flood_model.pkl")
+    with open(out_dir / "flood_model.json", 'w') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"💾 Saved {candidate} as model version '{version}' in {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress the flood model and report the trade-offs")
+    parser.add_argument("data_file", help="Dataset the model was trained on")
+    parser.add_argument("--model", help="Teacher model (default: models/flood_model.pkl)")
+    parser.add_argument("--f1-tolerance", type=float, default=0.02)
+    parser.add_argument("--auc-tolerance", type=float, default=0.01)
+    parser.add_argument("--report", help="Report path (default: models/compression_report.json)")
+    parser.add_argument("--save-version", help="Save the chosen model as this registry version")
+    args = parser.parse_args()
+    compress_flood_model(
+        args.data_file,
+        model_file=args.model,
+        f1_tolerance=args.f1_tolerance,
+        auc_tolerance=args.auc_tolerance,
+        report_file=args.report,
+        save_version=args.save_version
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Incremental feature state for continuously monitored locations"""
+import json
+import math
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .feature_engineering import create_features, select_feature_columns
+
+# Longest rolling window used by create_features (precip_14day_avg)
+MAX_WINDOW = 14
+
+
+def _window_sum(values, n: int) -> float:
+    """Sum of the last n values, skipping NaN like pandas rolling(min_periods=1)"""
+    valid = [v for v in list(values)[-n:] if not math.isnan(v)]
+    return sum(valid) if valid else math.nan
+
+
+def _window_mean(values, n: int) -> float:
+    valid = [v for v in list(values)[-n:] if not math.isnan(v)]
+    return sum(valid) / len(valid) if valid else math.nan
+
+
+def _window_max(values, n: int) -> float:
+    valid = [v for v in list(values)[-n:] if not math.isnan(v)]
+    return max(valid) if valid else math.nan
+
+
+def _to_float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+class RollingFeatureState:
+    """
+    Rolling feature state for one location, updated one day at a time.
+
+    Holds just enough history (the last 14 daily observations plus the
+    current rainy-day run length) to emit the same feature vector that
+    create_features produces for the latest row, without recomputing the
+    whole history. Each update costs O(MAX_WINDOW) = O(1).
+    """
+
+    def __init__(self, location: str):
+        self.location = location
+        self.last_date = None
+        self.consecutive_rainy_days = 0
+        self.precipitation = deque(maxlen=MAX_WINDOW)
+        self.temperature = deque(maxlen=7)
+        self.humidity = deque(maxlen=7)
+
+    def update(
+        self,
+        date,
+        precipitation: float,
+        temperature: float,
+        humidity: float,
+        wind_speed: float
+    ) -> dict:
+        """
+        Add one daily observation and return the features for that day.
+
+        Args:
+            date: Observation date (anything pd.Timestamp accepts); must be
+                  later than the previous observation
+            precipitation, temperature, humidity, wind_speed: Daily values
+                  (None is treated as missing)
+
+        Returns:
+            Dict of feature name -> value, in select_feature_columns() order
+        """
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(
+                f"Observation for {date.date()} is not after last observation {self.last_date.date()}"
+            )
+
+        precip = _to_float(precipitation)
+        temp = _to_float(temperature)
+        hum = _to_float(humidity)
+
+        # Lags come from history before this observation is appended
+        precip_lag1 = self.precipitation[-1] if len(self.precipitation) >= 1 else math.nan
+        precip_lag3 = self.precipitation[-3] if len(self.precipitation) >= 3 else math.nan
+        temp_lag1 = self.temperature[-1] if self.temperature else math.nan
+        humidity_lag1 = self.humidity[-1] if self.humidity else math.nan
+
+        self.precipitation.append(precip)
+        self.temperature.append(temp)
+        self.humidity.append(hum)
+        self.last_date = date
+
+        is_rainy = precip > 5
+        self.consecutive_rainy_days = self.consecutive_rainy_days + 1 if is_rainy else 0
+
+        month = date.month
+        features = {
+            'precipitation': precip,
+            'precip_7day_sum': _window_sum(self.precipitation, 7),
+            'precip_7day_max': _window_max(self.precipitation, 7),
+            'precip_3day_sum': _window_sum(self.precipitation, 3),
+            'precip_14day_avg': _window_mean(self.precipitation, 14),
+            'consecutive_rainy_days': self.consecutive_rainy_days,
+            'precip_rate_of_change': precip - precip_lag1,
+            'temperature': temp,
+            'temp_7day_avg': _window_mean(self.temperature, 7),
+            'humidity': hum,
+            'humidity_7day_avg': _window_mean(self.humidity, 7),
+            'high_humidity': int(hum > 80),
+            'wind_speed': _to_float(wind_speed),
+            'day_of_year': date.dayofyear,
+            'month': month,
+            'is_wet_season': int(month in [6, 7, 8, 9, 10]),
+            'precip_humidity_interaction': precip * hum / 100,
+            'precipitation_lag1': precip_lag1,
+            'precipitation_lag3': precip_lag3,
+            'temperature_lag1': temp_lag1,
+            'humidity_lag1': humidity_lag1,
+        }
+        return {col: features[col] for col in select_feature_columns()}
+
+    def to_dict(self) -> dict:
+        """JSON-serializable snapshot (NaN stored as null)"""
+        def encode(values):
+            return [None if math.isnan(v) else v for v in values]
+
+        return {
+            'location': self.location,
+            'last_date': self.last_date.strftime('%Y-%m-%d') if self.last_date is not None else None,
+            'consecutive_rainy_days': self.consecutive_rainy_days,
+            'precipitation': encode(self.precipitation),
+            'temperature': encode(self.temperature),
+            'humidity': encode(self.humidity),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RollingFeatureState":
+        state = cls(data['location'])
+        if data['last_date'] is not None:
+            state.last_date = pd.Timestamp(data['last_date'])
+        state.consecutive_rainy_days = data['consecutive_rainy_days']
+        state.precipitation.extend(_to_float(v) for v in data['precipitation'])
+        state.temperature.extend(_to_float(v) for v in data['temperature'])
+        state.humidity.extend(_to_float(v) for v in data['humidity'])
+        return state
+
+
+def save_states(states: dict[str, RollingFeatureState], path: str):
+    """Write per-location states to a JSON file (atomically replaced)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({loc: state.to_dict() for loc, state in states.items()}, f)
+    tmp_path.replace(path)
+
+
+def load_states(path: str) -> dict[str, RollingFeatureState]:
+    """Load per-location states written by save_states (empty if missing)"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {loc: RollingFeatureState.from_dict(d) for loc, d in data.items()}
+
+
+def check_parity(df: pd.DataFrame, atol: float = 1e-6) -> float:
+    """
+    Replay a dataset through RollingFeatureState and compare every row
+    against create_features.
+
+    Args:
+        df: Raw dataset (date, location, precipitation, temperature,
+            humidity, wind_speed, flood_occurred)
+        atol: Allowed absolute difference (rolling sums differ in the last bits)
+
+    Returns:
+        Largest absolute difference found
+
+    Raises:
+        AssertionError: If any feature differs by more than atol
+    """
+    feature_cols = select_feature_columns()
+    batch = create_features(df)
+
+    states = {}
+    rows = []
+    for row in batch.itertuples(index=False):
+        state = states.setdefault(row.location, RollingFeatureState(row.location))
+        rows.append(state.update(row.date, row.precipitation, row.temperature,
+                                 row.humidity, row.wind_speed))
+
+    expected = batch[feature_cols].to_numpy(dtype=float)
+    actual = pd.DataFrame(rows, columns=feature_cols).to_numpy(dtype=float)
+
+    both_nan = np.isnan(expected) & np.isnan(actual)
+    diff = np.where(both_nan, 0.0, np.abs(expected - actual))
+    diff = np.nan_to_num(diff, nan=np.inf)  # NaN on only one side is a mismatch
+    worst = float(diff.max()) if diff.size else 0.0
+
+    if worst > atol:
+        row_idx, col_idx = np.unravel_index(diff.argmax(), diff.shape)
+        raise AssertionError(
+            f"Feature '{feature_cols[col_idx]}' differs at row {row_idx}: "
+            f"batch={expected[row_idx, col_idx]} incremental={actual[row_idx, col_idx]}"
+        )
+    return worst
+
+
+if __name__ == "__main__":
+    import sys
+
+    data_file = sys.argv[1] if len(sys.argv) > 1 else str(
+        Path(__file__).parent / "models" / "training_data_complete.csv"
+    )
+    print(f"🔍 Checking incremental feature parity on {data_file}")
+    worst = check_parity(pd.read_csv(data_file))
+    print(f"✅ Incremental features match create_features (max abs diff {worst:.2e})")
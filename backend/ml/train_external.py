@@ -0,0 +1,349 @@
+"""Out-of-core flood model training for datasets larger than RAM"""
+import argparse
+import json
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBClassifier
+
+from .feature_engineering import create_features, select_feature_columns
+
+REQUIRED_COLUMNS = [
+    'date', 'location', 'latitude', 'longitude',
+    'precipitation', 'temperature', 'humidity', 'wind_speed',
+    'flood_occurred'
+]
+
+# Probability bins for the streaming AUC estimate
+AUC_BINS = 10_000
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(text)).strip('_').lower() or 'unnamed'
+
+
+def iter_input_chunks(data_path: str, chunksize: int = 500_000) -> Iterator[pd.DataFrame]:
+    """
+    Stream raw rows from a CSV file, a Parquet file, or a directory of
+    chunks (e.g. the output of ml.build_dataset).
+    """
+    path = Path(data_path)
+    if path.is_dir():
+        files = sorted(p for p in path.iterdir() if p.suffix in ('.csv', '.parquet'))
+    else:
+        files = [path]
+
+    for file in files:
+        if file.suffix == '.parquet':
+            import pyarrow.parquet as pq  # type: ignore
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=chunksize, columns=REQUIRED_COLUMNS):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(file, usecols=REQUIRED_COLUMNS, chunksize=chunksize)
+
+
+def partition_by_location(data_path: str, work_dir: Path, chunksize: int = 500_000) -> list[Path]:
+    """
+    Spill raw rows into one file per location.
+
+    Rolling and lag features only look within a location, so each
+    location file can later be engineered on its own with exactly the
+    same result as engineering the full dataset at once.
+
+    Returns:
+        Per-location partition files
+    """
+    partition_dir = work_dir / "locations"
+    shutil.rmtree(partition_dir, ignore_errors=True)
+    partition_dir.mkdir(parents=True)
+    files = {}
+    for chunk in iter_input_chunks(data_path, chunksize):
+        for location, rows in chunk.groupby('location', sort=False):
+            file = partition_dir / f"{_slug(location)}.csv"
+            rows.to_csv(file, mode='a', header=file not in files, index=False)
+            files[file] = True
+    return sorted(files)
+
+
+def engineer_batches(
+    partitions: list[Path],
+    work_dir: Path,
+    batch_rows: int = 1_000_000,
+    test_size: float = 0.2,
+    random_state: int = 42
+) -> dict:
+    """
+    Engineer features for groups of locations and write them as .npz
+    batches, holding out a random `test_size` share of rows.
+
+    Returns:
+        Summary with train/test batch files and class counts
+    """
+    feature_cols = select_feature_columns()
+    feature_dir = work_dir / "features"
+    shutil.rmtree(feature_dir, ignore_errors=True)
+    feature_dir.mkdir(parents=True)
+    summary = {'train_files': [], 'test_files': [], 'train_rows': 0, 'test_rows': 0,
+               'train_positives': 0, 'positives': 0, 'rows': 0}
+
+    def flush(frames: list[pd.DataFrame]):
+        batch_idx = len(summary['train_files'])
+        df = pd.concat(frames, ignore_index=True)
+        X = df[feature_cols].to_numpy(dtype=np.float32)
+        y = df['flood_occurred'].to_numpy(dtype=np.float32)
+        rng = np.random.default_rng([random_state, batch_idx])
+        is_test = rng.random(len(df)) < test_size
+
+        for split, mask in (('train', ~is_test), ('test', is_test)):
+            file = feature_dir / f"{split}_{batch_idx:05d}.npz"
+            np.savez(file, X=X[mask], y=y[mask])
+            summary[f'{split}_files'].append(file)
+            summary[f'{split}_rows'] += int(mask.sum())
+        summary['train_positives'] += int(y[~is_test].sum())
+        summary['positives'] += int(y.sum())
+        summary['rows'] += len(df)
+        print(f"   batch {batch_idx}: {len(df):,} rows")
+
+    frames, rows = [], 0
+    for file in partitions:
+        df = create_features(pd.read_csv(file))
+        df = df.dropna(subset=feature_cols + ['flood_occurred'])
+        frames.append(df)
+        rows += len(df)
+        if rows >= batch_rows:
+            flush(frames)
+            frames, rows = [], 0
+    if frames:
+        flush(frames)
+    return summary
+
+
+class FeatureBatchIter(xgb.DataIter):
+    """Feeds pre-engineered .npz batches to XGBoost's external-memory DMatrix"""
+
+    def __init__(self, files: list[Path], cache_prefix: str):
+        self._files = files
+        self._it = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> int:
+        if self._it == len(self._files):
+            return 0
+        with np.load(self._files[self._it]) as batch:
+            input_data(data=batch['X'], label=batch['y'], feature_names=select_feature_columns())
+        self._it += 1
+        return 1
+
+    def reset(self):
+        self._it = 0
+
+
+def evaluate_streaming(booster: xgb.Booster, files: list[Path], threshold: float = 0.5) -> dict:
+    """
+    Evaluate on held-out batches one at a time.
+
+    The confusion matrix is exact; AUC comes from per-class probability
+    histograms with AUC_BINS bins, so memory stays constant.
+    """
+    tp = fp = tn = fn = 0
+    pos_hist = np.zeros(AUC_BINS, dtype=np.int64)
+    neg_hist = np.zeros(AUC_BINS, dtype=np.int64)
+
+    for file in files:
+        with np.load(file) as batch:
+            X, y = batch['X'], batch['y'].astype(bool)
+        if len(y) == 0:
+            continue
+        prob = booster.predict(xgb.DMatrix(X, feature_names=select_feature_columns()))
+        pred = prob >= threshold
+        tp += int((pred & y).sum())
+        fp += int((pred & ~y).sum())
+        tn += int((~pred & ~y).sum())
+        fn += int((~pred & y).sum())
+
+        bins = np.minimum((prob * AUC_BINS).astype(int), AUC_BINS - 1)
+        pos_hist += np.bincount(bins[y], minlength=AUC_BINS)
+        neg_hist += np.bincount(bins[~y], minlength=AUC_BINS)
+
+    n_pos, n_neg = pos_hist.sum(), neg_hist.sum()
+    if n_pos and n_neg:
+        pos_above = np.cumsum(pos_hist[::-1])[::-1] - pos_hist  # positives in strictly higher bins
+        auc = float((neg_hist * (pos_above + 0.5 * pos_hist)).sum() / (n_pos * n_neg))
+    else:
+        auc = None
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    total = tp + fp + tn + fn
+    return {
+        'accuracy': (tp + tn) / total if total else None,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'auc': auc,
+        'confusion_matrix': [[tn, fp], [fn, tp]],
+    }
+
+
+def train_flood_model_external(
+    data_path: str,
+    model_output: str = None,
+    work_dir: str = None,
+    batch_rows: int = 1_000_000,
+    chunksize: int = 500_000,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    n_estimators: int = 200
+):
+    """
+    Train the flood model without loading the dataset into memory.
+
+    1. Stream the input and spill rows into per-location files
+    2. Engineer features one group of locations at a time
+    3. Train XGBoost from an external-memory DMatrix fed by FeatureBatchIter
+    4. Evaluate on the held-out batches in a streaming pass
+
+    Peak memory is bounded by `chunksize`, `batch_rows` and XGBoost's page
+    cache, not by dataset size.
+
+    Args:
+        data_path: CSV, Parquet file, or directory of chunks
+        model_output: Where to save trained model (default: backend/ml/models/flood_model.pkl)
+        work_dir: Scratch directory (default: a temporary directory, removed afterwards)
+        batch_rows: Approximate rows per engineered feature batch
+        chunksize: Rows read per input chunk
+        test_size: Proportion of rows held out for evaluation
+        random_state: Random seed for reproducibility
+        n_estimators: Number of boosting rounds
+
+    Returns:
+        Trained model
+    """
+    if model_output is None:
+        model_output = str(Path(__file__).parent / "models" / "flood_model.pkl")
+    cleanup = work_dir is None
+    work = Path(work_dir or tempfile.mkdtemp(prefix="flood_train_"))
+    work.mkdir(parents=True, exist_ok=True)
+    train_iter = dtrain = None
+
+    try:
+        print("📂 Partitioning data by location...")
+        partitions = partition_by_location(data_path, work, chunksize)
+        print(f"   {len(partitions)} locations")
+
+        print("\n🔧 Creating features in batches...")
+        summary = engineer_batches(partitions, work, batch_rows, test_size, random_state)
+        print(f"   {summary['rows']:,} records after removing NaN")
+        print(f"   Positive samples (floods): {summary['positives']:,}")
+
+        train_pos = summary['train_positives']
+        train_neg = summary['train_rows'] - train_pos
+        scale_pos_weight = train_neg / train_pos if train_pos else 1.0
+        print(f"\n📈 Training set: {summary['train_rows']:,} samples")
+        print(f"   Test set: {summary['test_rows']:,} samples")
+        print(f"   Scale pos weight: {scale_pos_weight:.2f}")
+
+        # Same hyperparameters as train_flood_model
+        params = {
+            'objective': 'binary:logistic',
+            'tree_method': 'hist',
+            'max_depth': 10,
+            'learning_rate': 0.1,
+            'subsample': 0.8,
+            'colsample_bytree': 0.8,
+            'scale_pos_weight': scale_pos_weight,
+            'min_child_weight': 5,
+            'gamma': 0.1,
+            'reg_alpha': 0.1,
+            'reg_lambda': 1.0,
+            'seed': random_state,
+            'eval_metric': 'logloss',
+            'nthread': -1,
+        }
+
+        print("\n🚀 Training XGBoost from external memory...")
+        train_iter = FeatureBatchIter(summary['train_files'], cache_prefix=str(work / "cache"))
+        dtrain = xgb.DMatrix(train_iter, missing=np.nan)
+        booster = xgb.train(params, dtrain, num_boost_round=n_estimators)
+        # The DMatrix holds the page cache files open; release it before the work dir goes
+        dtrain = train_iter = None
+        print("   ✅ Training complete!")
+
+        metrics = evaluate_streaming(booster, summary['test_files'])
+        print("\n" + "="*60)
+        print("TEST SET PERFORMANCE")
+        print("="*60)
+        print(f"F1: {metrics['f1']:.3f}  Precision: {metrics['precision']:.3f}  Recall: {metrics['recall']:.3f}")
+        if metrics['auc'] is not None:
+            print(f"AUC: {metrics['auc']:.3f}")
+
+        # Wrap the booster so it loads like models from train_flood_model
+        model_file = work / "booster.json"
+        booster.save_model(str(model_file))
+        model = XGBClassifier()
+        model.load_model(str(model_file))
+
+        print(f"\n💾 Saving model to {model_output}")
+        Path(model_output).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, model_output)
+
+        feature_cols = select_feature_columns()
+        importance_dict = booster.get_score(importance_type='gain')
+        feature_importance = sorted(
+            ({'feature': col, 'importance': importance_dict.get(col, 0)} for col in feature_cols),
+            key=lambda r: r['importance'], reverse=True
+        )
+        metadata = {
+            'model_type': 'XGBoost (Gradient Boosting, external memory)',
+            'feature_columns': feature_cols,
+            'train_date': pd.Timestamp.now().isoformat(),
+            'train_size': summary['train_rows'],
+            'test_size': summary['test_rows'],
+            'test_accuracy': metrics['accuracy'],
+            'test_f1_score': metrics['f1'],
+            'test_auc': metrics['auc'],
+            'positive_samples': summary['positives'],
+            'negative_samples': summary['rows'] - summary['positives'],
+            'scale_pos_weight': float(scale_pos_weight),
+            'model_params': {**params, 'n_estimators': n_estimators},
+            'feature_importance': feature_importance
+        }
+        metadata_file = str(Path(model_output).with_suffix('.json'))
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        print(f"💾 Saved metadata to {metadata_file}")
+
+        return model
+    finally:
+        dtrain = train_iter = None
+        if cleanup:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the flood model out of core")
+    parser.add_argument("data", help="CSV, Parquet file, or directory of chunks")
+    parser.add_argument("--model-output")
+    parser.add_argument("--work-dir", help="Scratch directory (kept afterwards if given)")
+    parser.add_argument("--batch-rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    args = parser.parse_args()
+    train_flood_model_external(
+        args.data,
+        model_output=args.model_output,
+        work_dir=args.work_dir,
+        batch_rows=args.batch_rows,
+        chunksize=args.chunksize
+    )
+
+
+if __name__ == "__main__":
+    main()
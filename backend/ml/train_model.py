@@ -1,6 +1,5 @@
 """Train flood prediction model using XGBoost"""
 import pandas as pd
-import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 import xgboost as xgb
@@ -10,6 +9,7 @@ import json
 from pathlib import Path
 
 from .feature_engineering import create_features, select_feature_columns
+from .synthetic_data import iter_synthetic_data
 
 
 def train_flood_model(
@@ -192,57 +192,13 @@ def train_with_sample_data():
     print("⚠️  Using synthetic sample data for demonstration")
     print("   Replace with real data for production use!\n")
     
-    # Generate synthetic data
-    np.random.seed(42)
-    n_samples = 1000
-    
-    # Simulate different scenarios
-    dates = pd.date_range(start='2020-01-01', periods=n_samples, freq='D')
-    locations = ['Manila', 'Cebu', 'Davao'] * (n_samples // 3 + 1)
-    
-    data = []
-    for i, date in enumerate(dates):
-        location = locations[i]
-        
-        # Base precipitation (higher during wet season)
-        month = date.month
-        is_wet = month in [6, 7, 8, 9, 10]
-        
-        # Generate precipitation with some extreme events
-        if np.random.rand() < 0.15:  # 15% chance of high rainfall
-            base_precip = np.random.uniform(50, 150)  # Heavy rain
-        elif is_wet:
-            base_precip = np.random.gamma(2, 8)  # Normal wet season
-        else:
-            base_precip = np.random.gamma(1, 3)  # Normal dry season
-        
-        # Temperature (lower during wet season)
-        temp = 27 + np.random.randn() * 2 - (3 if is_wet else 0)
-        
-        # Humidity (higher during wet season)
-        humidity = (75 if is_wet else 65) + np.random.randn() * 10
-        humidity = max(50, min(100, humidity))  # Clamp between 50-100%
-        
-        # Wind speed
-        wind = 3 + np.random.randn() * 1.5
-        wind = max(0, wind)  # No negative wind
-        
-        # Flood occurs if high precipitation (simplified rule)
-        flood = 1 if base_precip > 60 else 0
-        
-        data.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'location': location,
-            'latitude': 14.5 + np.random.randn() * 0.1,
-            'longitude': 121.0 + np.random.randn() * 0.1,
-            'precipitation': base_precip,
-            'temperature': temp,
-            'humidity': humidity,
-            'wind_speed': wind,
-            'flood_occurred': flood
-        })
-    
-    df = pd.DataFrame(data)
+    # Generate synthetic data (3 locations x 334 days ~ 1,000 rows)
+    locations = [
+        {'location': 'Manila', 'latitude': 14.5995, 'longitude': 120.9842},
+        {'location': 'Cebu', 'latitude': 10.3157, 'longitude': 123.8854},
+        {'location': 'Davao', 'latitude': 7.1907, 'longitude': 125.4553},
+    ]
+    df = next(iter_synthetic_data(locations, start='2020-01-01', end='2020-11-29', seed=42))
     
     # Save to temp file
     temp_file = Path(__file__).parent / "models" / "sample_data.csv"
@@ -0,0 +1,371 @@
+"""Incremental flood model updates from newly labeled days, with a retrain fallback"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import f1_score, log_loss, roc_auc_score
+from xgboost import XGBClassifier
+
+from app.model_registry import METADATA_FILE, MODEL_FILE, ModelRegistry
+from .compress_model import held_out_split
+from .feature_engineering import create_features, select_feature_columns
+from .train_model import train_flood_model
+
+MODELS_DIR = Path(__file__).parent / "models"
+TRAINING_DATA_FILE = MODELS_DIR / "training_data_complete.csv"
+# Every labeled row models have been trained on so far: the original
+# training data plus each accepted batch. The default --history.
+LABELED_DATA_FILE = MODELS_DIR / "labeled_data.csv"
+
+# Days of history prepended to new rows so rolling/lag features are complete
+CONTEXT_DAYS = 14
+DRIFT_COLUMNS = ['precipitation', 'temperature', 'humidity', 'wind_speed']
+# Daily weather is strongly autocorrelated, so a batch spanning a few weeks
+# is one weather spell rather than a sample of the climate; its PSI is
+# reported but only forces a retrain once the batch covers this many days
+DRIFT_MIN_DAYS = 90
+# Days either side of the batch's calendar span in the seasonal reference
+DRIFT_SEASON_MARGIN = 15
+
+
+def population_stability(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
+    """PSI of `actual` against `expected` over the expected distribution's deciles"""
+    expected = expected[~np.isnan(expected)]
+    actual = actual[~np.isnan(actual)]
+    if not len(expected) or not len(actual):
+        return 0.0
+    edges = np.unique(np.quantile(expected, np.linspace(0, 1, bins + 1)))
+    if len(edges) < 2:
+        return 0.0
+    edges[0], edges[-1] = -np.inf, np.inf
+    e = np.histogram(expected, edges)[0] / len(expected)
+    a = np.histogram(actual, edges)[0] / len(actual)
+    e, a = np.clip(e, 1e-4, None), np.clip(a, 1e-4, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def seasonal_reference(history: pd.DataFrame, new: pd.DataFrame, margin: int = DRIFT_SEASON_MARGIN) -> pd.DataFrame:
+    """
+    History rows from the same time of year as the new rows (their
+    day-of-year span, plus `margin` days either side), so drift isn't
+    just the season. All history if that leaves nothing.
+    """
+    history_doy = pd.to_datetime(history['date']).dt.dayofyear.to_numpy()
+    new_doy = pd.to_datetime(new['date']).dt.dayofyear
+    lo, hi = new_doy.min() - margin, new_doy.max() + margin
+    in_season = np.zeros(len(history), dtype=bool)
+    for shift in (-366, 0, 366):  # spans that wrap around the new year
+        in_season |= (history_doy + shift >= lo) & (history_doy + shift <= hi)
+    return history[in_season] if in_season.any() else history
+
+
+def continuity_problems(history: pd.DataFrame, new: pd.DataFrame) -> list[str]:
+    """
+    Locations whose new rows don't carry on from their history day by day.
+
+    create_features lags and rolls by row position, so a gap or overlap
+    between history and new rows (or inside the new rows) silently shifts
+    every lag feature near it.
+    """
+    last_day = pd.to_datetime(history['date']).groupby(history['location']).max()
+    problems = []
+    for location, rows in new.assign(date=pd.to_datetime(new['date'])).groupby('location'):
+        days = rows['date'].sort_values()
+        if location in last_day.index and days.iloc[0] != last_day[location] + pd.Timedelta(days=1):
+            problems.append(
+                f"{location}: new rows start {days.iloc[0].date()}, history ends {last_day[location].date()}"
+            )
+        elif (days.diff().dropna() != pd.Timedelta(days=1)).any():
+            problems.append(f"{location}: new rows skip or repeat days")
+    return problems
+
+
+def record_labeled(history: pd.DataFrame, new: pd.DataFrame, labeled_file: Path):
+    """Write history + new rows as the cumulative labeled data (atomically)"""
+    combined = pd.concat([history, new], ignore_index=True)
+    combined = combined.sort_values(['location', 'date'], kind='stable')
+    labeled_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = labeled_file.with_suffix('.csv.tmp')
+    combined.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, labeled_file)
+
+
+def new_feature_rows(history: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Engineer features for the new rows only, using the last CONTEXT_DAYS
+    of each location's history so rolling and lag features are complete.
+    """
+    history = history.assign(date=pd.to_datetime(history['date']))
+    new = new.assign(date=pd.to_datetime(new['date']), _new=True)
+    context = history.sort_values('date').groupby('location').tail(CONTEXT_DAYS).assign(_new=False)
+    features = create_features(pd.concat([context, new], ignore_index=True))
+    return features[features['_new'].astype(bool)].dropna(subset=select_feature_columns())
+
+
+def evaluate(model, X: pd.DataFrame, y: pd.Series) -> dict:
+    """F1, AUC and log loss (AUC is None when only one class is present)"""
+    if not len(X):
+        return {'rows': 0, 'f1': None, 'auc': None, 'logloss': None}
+    proba = model.predict_proba(X)[:, 1]
+    return {
+        'rows': len(X),
+        'f1': float(f1_score(y, proba >= 0.5, zero_division=0)),
+        'auc': float(roc_auc_score(y, proba)) if y.nunique() > 1 else None,
+        'logloss': float(log_loss(y, proba, labels=[0, 1])),
+    }
+
+
+def boost_incrementally(
+    model: XGBClassifier,
+    X: pd.DataFrame,
+    y: pd.Series,
+    mode: str = "continue",
+    extra_rounds: int = 20
+) -> XGBClassifier:
+    """
+    Update an existing booster on new rows only.
+
+    "continue" adds `extra_rounds` trees fitted to the new rows on top of
+    the existing ones. "refresh" keeps every tree's structure and only
+    re-estimates leaf values (and node statistics) from the new rows, so
+    it needs a batch large enough to stand in for the original data.
+    """
+    params = model.get_params()
+    params['verbosity'] = 0
+    booster = model.get_booster()
+    if mode == "continue":
+        updated = XGBClassifier(**{**params, 'n_estimators': extra_rounds})
+        updated.fit(X, y, xgb_model=booster)
+        return updated
+    if mode != "refresh":
+        raise ValueError(f"Unknown update mode '{mode}' (use continue or refresh)")
+
+    # XGBClassifier.fit builds a QuantileDMatrix, which the refresh updater
+    # doesn't support, so refresh through the native API on a plain DMatrix
+    n_rounds = booster.num_boosted_rounds()
+    refreshed = xgb.train(
+        {**model.get_xgb_params(), 'verbosity': 0,
+         'process_type': 'update', 'updater': 'refresh', 'refresh_leaf': True},
+        xgb.DMatrix(X, y, missing=np.nan),
+        num_boost_round=n_rounds,
+        xgb_model=booster
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = Path(tmp) / "booster.json"
+        refreshed.save_model(str(model_file))
+        updated = XGBClassifier()
+        updated.load_model(str(model_file))
+    updated.set_params(**{**params, 'n_estimators': n_rounds})
+    return updated
+
+
+def update_flood_model(
+    new_data_file: str,
+    history_file: str = None,
+    model_file: str = None,
+    mode: str = "continue",
+    extra_rounds: int = 20,
+    holdout_fraction: float = 0.2,
+    f1_tolerance: float = 0.02,
+    auc_tolerance: float = 0.01,
+    max_psi: float = 0.25,
+    output_dir: str = None,
+    labeled_file: str = None,
+    drift_min_days: int = DRIFT_MIN_DAYS
+) -> dict:
+    """
+    Update the flood model with newly labeled days instead of retraining.
+
+    The newest time slice of the new rows (`holdout_fraction`) is held out.
+    The update is accepted only if, compared to the current model, it:
+      - stays within tolerance on the original held-out split
+        (no forgetting of what the model already knew), and
+      - does not get worse log loss on the new held-out rows.
+    If the update is rejected, or the new rows span at least
+    `drift_min_days` days and any input's PSI against the same season in
+    history exceeds `max_psi`, the model is fully retrained on history +
+    new data. PSI of shorter batches is only reported.
+    Either way history + new rows are then saved as `labeled_file`, so
+    the next update builds on them.
+
+    Args:
+        new_data_file: CSV of new labeled rows (training_data_complete.csv layout)
+        history_file: Data the current model was trained on (default: `labeled_file`
+                      if it exists, else models/training_data_complete.csv)
+        model_file: Model to update (default: the newest registry version)
+        mode: "continue" (add trees) or "refresh" (re-fit leaf values)
+        extra_rounds: Trees added in continue mode
+        holdout_fraction: Share of new rows, by date, held out for the guard
+        f1_tolerance, auc_tolerance: Allowed drop on the original held-out split
+        max_psi: Largest per-feature population stability index before retraining
+        drift_min_days: Fewest distinct days in the new rows for PSI to force a retrain
+        output_dir: Where to write the model (default: a new models/versions/<timestamp>/)
+        labeled_file: Cumulative labeled data to update (default: models/labeled_data.csv)
+
+    Returns:
+        Summary of what was done and the metrics behind the decision
+
+    Raises:
+        ValueError: New rows don't continue each location's history day by day
+    """
+    started = time.perf_counter()
+    labeled_file = Path(labeled_file) if labeled_file else LABELED_DATA_FILE
+    if history_file is None:
+        history_file = str(labeled_file if labeled_file.exists() else TRAINING_DATA_FILE)
+    if model_file is None:
+        registry = ModelRegistry(str(MODELS_DIR))
+        model_file = str(registry.available_versions()[registry.latest_version()] / MODEL_FILE)
+    if output_dir is None:
+        output_dir = str(MODELS_DIR / "versions" / f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}")
+    out = Path(output_dir)
+
+    model = joblib.load(model_file)
+    history = pd.read_csv(history_file)
+    new = pd.read_csv(new_data_file)
+    print(f"📂 {len(new)} new rows, {len(history)} history rows, updating {model_file}")
+
+    problems = continuity_problems(history, new)
+    if problems:
+        raise ValueError(
+            f"New rows must start the day after each location's last day in {history_file}: "
+            + "; ".join(problems)
+        )
+    unseen = sorted(set(new['location']) - set(history['location']))
+    if unseen:
+        print(f"⚠️  No history for {', '.join(map(str, unseen))}; their first {CONTEXT_DAYS} days lack lag features")
+
+    # Input drift: large shifts are better served by a full retrain
+    reference = seasonal_reference(history, new)
+    drift = {
+        col: round(population_stability(reference[col].to_numpy(float), new[col].to_numpy(float)), 4)
+        for col in DRIFT_COLUMNS if col in new
+    }
+    new_days = pd.to_datetime(new['date']).nunique()
+    drift_enforced = new_days >= drift_min_days
+    print(f"   Drift (PSI vs {len(reference)} same-season history rows): {drift}"
+          + ("" if drift_enforced else f" (advisory: {new_days} days < {drift_min_days})"))
+
+    summary = {
+        'model_file': model_file, 'new_rows': len(new), 'mode': mode,
+        'drift_psi': drift, 'drift_enforced': drift_enforced, 'decision': None, 'reason': None, 'output_dir': str(out),
+        'labeled_file': str(labeled_file),
+    }
+
+    if drift_enforced and max(drift.values(), default=0.0) > max_psi:
+        summary['reason'] = f"input drift above PSI {max_psi}"
+    else:
+        feature_cols = select_feature_columns()
+        new_rows = new_feature_rows(history, new).sort_values('date')
+        cutoff = new_rows['date'].quantile(1 - holdout_fraction) if len(new_rows) else None
+        train_rows = new_rows[new_rows['date'] < cutoff] if cutoff is not None else new_rows
+        holdout_rows = new_rows[new_rows['date'] >= cutoff] if cutoff is not None else new_rows
+        if train_rows.empty:
+            train_rows, holdout_rows = new_rows, new_rows.iloc[0:0]
+        print(f"   {len(train_rows)} rows to train on, {len(holdout_rows)} held out")
+
+        _, X_test, _, y_test = held_out_split(history_file)
+        print(f"\n🚀 Updating model ({mode})...")
+        update_started = time.perf_counter()
+        updated = boost_incrementally(
+            model, train_rows[feature_cols], train_rows['flood_occurred'], mode, extra_rounds
+        )
+        summary['update_seconds'] = round(time.perf_counter() - update_started, 3)
+
+        before = {'original_holdout': evaluate(model, X_test, y_test),
+                  'new_holdout': evaluate(model, holdout_rows[feature_cols], holdout_rows['flood_occurred'])}
+        after = {'original_holdout': evaluate(updated, X_test, y_test),
+                 'new_holdout': evaluate(updated, holdout_rows[feature_cols], holdout_rows['flood_occurred'])}
+        summary['before'], summary['after'] = before, after
+
+        old, upd = before['original_holdout'], after['original_holdout']
+        problems = []
+        if upd['f1'] < old['f1'] - f1_tolerance:
+            problems.append(f"F1 on original held-out split fell {old['f1']:.3f} -> {upd['f1']:.3f}")
+        if old['auc'] is not None and upd['auc'] is not None and upd['auc'] < old['auc'] - auc_tolerance:
+            problems.append(f"AUC on original held-out split fell {old['auc']:.3f} -> {upd['auc']:.3f}")
+        old_new, upd_new = before['new_holdout'], after['new_holdout']
+        if old_new['logloss'] is not None and upd_new['logloss'] > old_new['logloss']:
+            problems.append(f"log loss on new held-out rows rose {old_new['logloss']:.4f} -> {upd_new['logloss']:.4f}")
+
+        if not problems:
+            save_updated(updated, model_file, out, mode, summary)
+            record_labeled(history, new, labeled_file)
+            summary['decision'] = 'incremental'
+            summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+            print(f"\n✅ Incremental update accepted in {summary['elapsed_seconds']}s -> {out}")
+            return summary
+        summary['reason'] = "; ".join(problems)
+
+    print(f"\n⚠️  Falling back to a full retrain: {summary['reason']}")
+    with tempfile.TemporaryDirectory() as tmp:
+        combined_file = Path(tmp) / "combined.csv"
+        pd.concat([history, new], ignore_index=True).to_csv(combined_file, index=False)
+        out.mkdir(parents=True, exist_ok=True)
+        train_flood_model(str(combined_file), model_output=str(out / MODEL_FILE))
+    record_labeled(history, new, labeled_file)
+    summary['decision'] = 'full_retrain'
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def save_updated(model: XGBClassifier, base_file: str, out: Path, mode: str, summary: dict):
+    """Save an updated model with metadata carried over from the model it started from"""
+    out.mkdir(parents=True, exist_ok=True)
+    base_meta_file = Path(base_file).with_name(METADATA_FILE)
+    metadata = json.loads(base_meta_file.read_text()) if base_meta_file.exists() else {}
+    after = summary['after']['original_holdout']
+    metadata.update({
+        'model_type': f"{metadata.get('model_type', 'XGBoost')} (incremental: {mode})",
+        'feature_columns': select_feature_columns(),
+        'train_date': pd.Timestamp.now().isoformat(),
+        'base_model': base_file,
+        'incremental_rows': summary['new_rows'],
+        'test_f1_score': after['f1'],
+        'test_auc': after['auc'],
+        'n_trees': model.get_booster().num_boosted_rounds(),
+    })
+    metadata.pop('model_params', None)
+    joblib.dump(model, out / MODEL_FILE)
+    with open(out / METADATA_FILE, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the flood model with new labeled data")
+    parser.add_argument("new_data", help="CSV of newly labeled rows")
+    parser.add_argument("--history", help="Data the current model was trained on (default: models/labeled_data.csv)")
+    parser.add_argument("--model", help="Model to update (default: newest registry version)")
+    parser.add_argument("--mode", choices=["continue", "refresh"], default="continue")
+    parser.add_argument("--extra-rounds", type=int, default=20)
+    parser.add_argument("--max-psi", type=float, default=0.25)
+    parser.add_argument("--drift-min-days", type=int, default=DRIFT_MIN_DAYS,
+                        help="Fewest days in the new data for drift to force a retrain")
+    parser.add_argument("--output-dir", help="Model directory (default: new models/versions/<timestamp>)")
+    parser.add_argument("--labeled-data", help="Cumulative labeled data file (default: models/labeled_data.csv)")
+    args = parser.parse_args()
+    try:
+        summary = update_flood_model(
+            args.new_data,
+            history_file=args.history,
+            model_file=args.model,
+            mode=args.mode,
+            extra_rounds=args.extra_rounds,
+            max_psi=args.max_psi,
+            output_dir=args.output_dir,
+            labeled_file=args.labeled_data,
+            drift_min_days=args.drift_min_days
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps({k: v for k, v in summary.items() if k not in ('before', 'after')}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
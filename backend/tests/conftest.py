@@ -0,0 +1,94 @@
+"""Shared fixtures: a local stand-in for the NASA POWER and CMR APIs"""
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """
+    Serves /power (POWER daily point JSON) and /cmr (CMR granule search).
+
+    Values are a deterministic function of the day, so repeated fetches
+    agree. `fail_next` maps a latitude to how many POWER calls for it
+    should answer 503 before succeeding.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.requests: list[tuple[str, dict]] = []
+        self.fail_next: dict[float, int] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def calls(self, path: str) -> list[dict]:
+        return [params for p, params in self.requests if p == path]
+
+
+def power_payload(params: dict) -> dict:
+    start = datetime.strptime(params["start"], "%Y%m%d").date()
+    end = datetime.strptime(params["end"], "%Y%m%d").date()
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    values = {
+        "T2M": lambda d: 25 + d.month / 10,
+        "PRECTOTCORR": lambda d: float(d.day % 9 * 3),
+        "RH2M": lambda d: 70 + d.day % 20,
+        "WS2M": lambda d: 2.5,
+    }
+    return {
+        "header": {"api_version": "fake"},
+        "properties": {"parameter": {
+            name: {d.strftime("%Y%m%d"): round(fn(d), 2) for d in days}
+            for name, fn in values.items() if name in params["parameters"].split(",")
+        }},
+    }
+
+
+def cmr_payload(params: dict) -> dict:
+    start, end = (datetime.fromisoformat(t.rstrip("Z")).date() for t in params["temporal"].split("/"))
+    days = [start + timedelta(days=i) for i in range(0, (end - start).days + 1, 2)]
+    return {"feed": {"entry": [{"time_start": f"{d.isoformat()}T00:00:00.000Z"} for d in days]}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.requests.append((url.path, params))
+        if url.path == "/power":
+            lat = float(params["latitude"])
+            if self.server.fail_next.get(lat, 0) > 0:
+                self.server.fail_next[lat] -= 1
+                return self._send(503, {"message": "unavailable"})
+            return self._send(200, power_payload(params))
+        if url.path == "/cmr":
+            return self._send(200, cmr_payload(params))
+        self._send(404, {"message": "not found"})
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_upstream():
+    server = FakeUpstream()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
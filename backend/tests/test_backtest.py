@@ -0,0 +1,75 @@
+"""Backtest event, lead-time and false-alarm accounting"""
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from ml.backtest import evaluate_alarms, run_backtest
+
+MODELS_DIR = Path(__file__).resolve().parents[1] / "ml" / "models"
+
+
+def days(n: int, *on: int) -> np.ndarray:
+    out = np.zeros(n, dtype=bool)
+    out[list(on)] = True
+    return out
+
+
+def test_alarm_exactly_lead_days_before_is_a_hit():
+    floods = days(20, 10, 11, 12)
+    result = evaluate_alarms(days(20, 7), floods, lead_days=3)
+    assert (result["events"], result["hits"], result["false_alarms"]) == (1, 1, 0)
+    assert result["mean_lead_days"] == result["max_lead_days"] == 3
+
+    early = evaluate_alarms(days(20, 6), floods, lead_days=3)
+    assert (early["hits"], early["false_alarms"]) == (0, 1)
+
+
+def test_alarm_inside_an_event_is_neither_hit_nor_false():
+    result = evaluate_alarms(days(20, 11), days(20, 10, 11, 12), lead_days=3)
+    assert (result["hits"], result["false_alarms"], result["alarm_days"]) == (0, 0, 1)
+    assert result["hit_rate"] == 0.0
+
+
+def test_alarm_after_an_event_ends_is_false():
+    result = evaluate_alarms(days(20, 13), days(20, 10, 11, 12), lead_days=3)
+    assert (result["hits"], result["false_alarms"]) == (0, 1)
+    assert result["false_alarm_ratio"] == 1.0
+
+
+def test_lead_time_uses_earliest_alarm_and_events_split_on_gaps():
+    floods = days(30, 10, 11, 20)
+    result = evaluate_alarms(days(30, 8, 9, 20), floods, lead_days=3)
+    assert (result["events"], result["hits"]) == (2, 2)
+    assert result["mean_lead_days"] == 1.0  # 2 days for the first event, 0 for the second
+    assert result["max_lead_days"] == 2
+
+
+def test_no_events():
+    result = evaluate_alarms(days(10, 2, 5), np.zeros(10, dtype=bool), lead_days=3)
+    assert (result["events"], result["hits"], result["hit_rate"]) == (0, 0, None)
+    assert result["false_alarms"] == 2
+    assert result["mean_lead_days"] is None
+
+    quiet = evaluate_alarms(np.zeros(10, dtype=bool), np.zeros(10, dtype=bool), lead_days=3)
+    assert quiet["false_alarm_ratio"] is None
+
+
+def test_evaluated_days_restrict_events_and_alarms():
+    floods = days(30, 10, 20)
+    alarms = days(30, 9, 19, 25)
+    evaluated = days(30, 10, 25)  # only the first event starts on an evaluated day
+    result = evaluate_alarms(alarms, floods, lead_days=3, evaluated=evaluated)
+    # Alarm on day 9 isn't evaluated, so the first event is missed; day 25 is a false alarm
+    assert (result["events"], result["hits"], result["alarm_days"], result["false_alarms"]) == (1, 0, 1, 1)
+
+
+def test_model_is_scored_on_held_out_days_only():
+    pytest.importorskip("xgboost")
+    report = run_backtest(str(MODELS_DIR / "training_data_complete.csv"), workers=1)
+    totals = report["totals"]
+    assert report["settings"]["model_evaluated_on"] == "held-out split of data_file"
+    assert totals["model"]["events"] == totals["rule_held_out"]["events"]
+    assert totals["model"]["events"] < totals["rule"]["events"]
@@ -0,0 +1,87 @@
+"""Dataset builder against a local stand-in for POWER and CMR"""
+import asyncio
+import json
+import sys
+from datetime import date
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("httpx")
+
+from ml import build_dataset as builder
+
+
+@pytest.fixture
+def locations_file(tmp_path):
+    path = tmp_path / "locations.csv"
+    pd.DataFrame([
+        {"location": "Marikina", "latitude": 14.65, "longitude": 121.1},
+        {"location": "Tacloban", "latitude": 11.24, "longitude": 125.0},
+    ]).to_csv(path, index=False)
+    return path
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["build_dataset", *map(str, args)])
+    builder.main()
+
+
+def test_resume_retries_only_failed_tasks(fake_upstream, locations_file, tmp_path, monkeypatch):
+    out = tmp_path / "dataset"
+    args = [locations_file, "--start-year", 2020, "--end-year", 2021, "--output-dir", out,
+            "--imerg", "--power-url", f"{fake_upstream.url}/power", "--cmr-url", f"{fake_upstream.url}/cmr"]
+    fake_upstream.fail_next[11.24] = 1  # Tacloban's first POWER call fails
+
+    run_cli(monkeypatch, *args)
+    checkpoint = json.loads((out / builder.CHECKPOINT_FILE).read_text())
+    assert len(checkpoint["completed"]) == 3
+    assert list(checkpoint["failed"]) in (["Tacloban:2020"], ["Tacloban:2021"])
+    first_run_calls = len(fake_upstream.requests)
+
+    run_cli(monkeypatch, *args)
+    retried = fake_upstream.requests[first_run_calls:]
+    assert [path for path, _ in retried] == ["/power", "/cmr"]
+    checkpoint = json.loads((out / builder.CHECKPOINT_FILE).read_text())
+    assert len(checkpoint["completed"]) == 4 and not checkpoint["failed"]
+
+    df = builder.load_dataset(str(out))
+    assert len(df) == 2 * (366 + 365)
+    assert list(df.columns) == builder.OUTPUT_COLUMNS
+    # Every other day has a granule, and 7-day sums include the December lead-in
+    first = df[(df["location"] == "Marikina") & (df["date"] == "2020-01-01")].iloc[0]
+    assert first["imerg_available"] == 1
+    assert first["precip_7day"] > first["precipitation"]
+
+
+def test_partial_year_is_refetched_until_final(fake_upstream, tmp_path):
+    out = tmp_path / "dataset"
+    location = [{"location": "Marikina", "latitude": 14.65, "longitude": 121.1}]
+
+    def build(today):
+        return asyncio.run(builder.build_dataset(
+            location, [2024], str(out), power_url=f"{fake_upstream.url}/power", today=today
+        ))
+
+    assert build(date(2024, 3, 15))["completed"] == 1
+    assert builder.load_dataset(str(out))["date"].max() == "2024-03-14"
+    # Same day: nothing new can be final yet
+    assert build(date(2024, 3, 15))["skipped"] == 1
+    # Later in the year the chunk is extended
+    assert build(date(2024, 4, 1))["completed"] == 1
+    assert builder.load_dataset(str(out))["date"].max() == "2024-03-31"
+    # Early January: December may still be backfilled, so refetch once more...
+    assert build(date(2025, 1, 3))["completed"] == 1
+    # ...and once POWER's backfill window has passed the year is final
+    assert build(date(2025, 1, 10))["completed"] == 1
+    assert build(date(2025, 1, 11))["skipped"] == 1
+    assert len(builder.load_dataset(str(out))) == 366
+
+
+def test_future_years_are_counted_as_skipped(fake_upstream, tmp_path):
+    summary = asyncio.run(builder.build_dataset(
+        [{"location": "Marikina", "latitude": 14.65, "longitude": 121.1}], [2024, 2025], str(tmp_path / "dataset"),
+        power_url=f"{fake_upstream.url}/power", today=date(2025, 1, 1)
+    ))
+    assert summary == {"completed": 1, "skipped": 1, "failed": 0}
+    assert [params["end"] for params in fake_upstream.calls("/power")] == ["20241231"]
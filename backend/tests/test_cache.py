@@ -0,0 +1,221 @@
+"""Cache backends: serialization, SQLite, and Redis against a local RESP stand-in"""
+import asyncio
+import pickle
+import socketserver
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app import cache as cache_module
+from app.cache import MemoryBackend, RedisBackend, SQLiteBackend, dumps, loads
+from app.series import DailySeries
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """Just enough of the Redis protocol for RedisBackend (strings and sorted sets)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.strings: dict[bytes, bytes] = {}
+        self.zsets: dict[bytes, dict[bytes, float]] = {}
+        self.lock = threading.Lock()
+        self.connections: set = set()
+        self.commands = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def drop_connections(self):
+        """Close every client connection, as a server restart would"""
+        for conn in list(self.connections):
+            conn.close()
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.connections.add(self.request)
+        try:
+            while True:
+                args = self._read_command()
+                if args is None:
+                    return
+                self.wfile.write(self._dispatch(args))
+        except (OSError, ValueError):
+            return
+        finally:
+            self.server.connections.discard(self.request)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _dispatch(self, args) -> bytes:
+        server = self.server
+        command = args[0].upper()
+        with server.lock:
+            server.commands += 1
+            if command in (b"AUTH", b"SELECT", b"PING"):
+                return b"+OK\r\n"
+            if command == b"GET":
+                return _bulk(server.strings.get(args[1]))
+            if command == b"SET":
+                server.strings[args[1]] = args[2]
+                return b"+OK\r\n"
+            if command == b"DEL":
+                return b":%d\r\n" % sum(server.strings.pop(k, None) is not None for k in args[1:])
+            if command == b"ZADD":
+                server.zsets.setdefault(args[1], {})[args[3]] = float(args[2])
+                return b":1\r\n"
+            if command == b"ZCARD":
+                return b":%d\r\n" % len(server.zsets.get(args[1], {}))
+            if command == b"ZRANGE":
+                members = sorted(server.zsets.get(args[1], {}).items(), key=lambda item: item[1])
+                start, stop = int(args[2]), int(args[3])
+                selected = [m for m, _ in members[start:stop + 1 if stop >= 0 else None]]
+                return b"*%d\r\n" % len(selected) + b"".join(_bulk(m) for m in selected)
+            if command == b"ZREM":
+                zset = server.zsets.get(args[1], {})
+                return b":%d\r\n" % sum(zset.pop(m, None) is not None for m in args[2:])
+        return b"-ERR unknown command\r\n"
+
+
+def _bulk(value: bytes | None) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+@pytest.fixture
+def fake_redis():
+    server = FakeRedis()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def sample_series() -> DailySeries:
+    return DailySeries("20240701", {
+        "PRECTOTCORR": [12.5, np.nan, 80.25],
+        "T2M": [27.1, 27.4, 26.9],
+    }, meta={"api_version": "v2"})
+
+
+def test_codec_round_trips_cached_values():
+    series = sample_series()
+    fetched_at, decoded = loads(dumps((1700000000.5, series)))
+    assert fetched_at == 1700000000.5
+    assert decoded.start == series.start
+    np.testing.assert_array_equal(decoded.values("PRECTOTCORR"), series.values("PRECTOTCORR"))
+    assert decoded.meta == series.meta
+
+    entry = {"body": {"flood_risk": {"score": 63, "factors": ["a"]}, "ml_prediction": None},
+             "fresh_until": None}
+    assert loads(dumps(entry)) == entry
+
+
+def test_pickled_blobs_are_never_unpickled(fake_redis):
+    class Exploit:
+        def __reduce__(self):
+            return (pytest.fail, ("pickle payload executed",))
+
+    backend = RedisBackend("poisoned", 10, url=fake_redis.url)
+    backend.set(("k",), {"v": 1})
+    key = f"bahalana:poisoned:{backend._key_id(('k',))}".encode()
+    fake_redis.strings[key] = pickle.dumps(Exploit())
+    assert backend.get(("k",), "miss") == "miss"
+    assert backend.errors == 1
+
+
+def test_sqlite_get_set_and_eviction(tmp_path):
+    backend = SQLiteBackend("power", 2, path=str(tmp_path / "cache.sqlite3"))
+    backend.set(("a",), (1.0, sample_series()))
+    backend.set(("b",), {"x": [1, 2]})
+    assert backend.get(("a",))[1].values("T2M").tolist() == [27.1, 27.4, 26.9]
+    backend.set(("c",), 3)  # "b" is now least recently used
+    assert backend.get(("b",)) is None
+    assert backend.get(("c",)) == 3
+    assert backend.stats()["entries"] == 2 and backend.evictions == 1
+
+
+def test_redis_get_set_and_eviction(fake_redis):
+    backend = RedisBackend("responses", 2, url=fake_redis.url)
+    backend.set(("a",), {"n": 1})
+    time.sleep(0.01)
+    backend.set(("b",), {"n": 2})
+    time.sleep(0.01)
+    assert backend.get(("a",)) == {"n": 1}  # refreshes "a"
+    time.sleep(0.01)
+    backend.set(("c",), {"n": 3})
+    assert backend.get(("b",)) is None
+    assert backend.get(("a",)) == {"n": 1} and backend.get(("c",)) == {"n": 3}
+    assert backend.stats()["entries"] == 2 and backend.evictions == 1
+    backend.delete(("a",))
+    assert backend.get(("a",)) is None
+
+
+def test_redis_reconnects_after_connection_loss(fake_redis):
+    backend = RedisBackend("reconnect", 10, url=fake_redis.url)
+    backend.set(("a",), 1)
+    fake_redis.drop_connections()
+    assert backend.get(("a",)) == 1
+    assert backend.errors == 0
+
+
+def test_dead_store_falls_back_to_memory(fake_redis, monkeypatch):
+    url = fake_redis.url
+    fake_redis.shutdown()
+    fake_redis.server_close()
+    backend = RedisBackend("down", 10, url=url)
+
+    assert backend.get(("a",)) is None
+    assert backend.errors == 1 and backend.degraded
+    calls_before = backend.errors
+    backend.set(("a",), {"n": 1})
+    # Served from the in-process fallback without touching the dead store
+    assert backend.get(("a",)) == {"n": 1}
+    assert backend.errors == calls_before
+
+    # After the retry interval the store is tried again
+    monkeypatch.setattr(backend, "_down_until", 0.0)
+    assert backend.get(("b",)) is None
+    assert backend.errors == calls_before + 1
+
+
+def test_async_api_runs_blocking_backends_in_threads(fake_redis, monkeypatch):
+    backend = RedisBackend("async", 10, url=fake_redis.url)
+    threads = []
+    original = backend._get
+
+    def record_thread(key):
+        threads.append(threading.current_thread())
+        return original(key)
+
+    monkeypatch.setattr(backend, "_get", record_thread)
+
+    async def run():
+        await backend.aset(("a",), [1, 2])
+        return await backend.aget(("a",))
+
+    assert asyncio.run(run()) == [1, 2]
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_memory_backend_keeps_objects():
+    backend = MemoryBackend("mem", 2)
+    series = sample_series()
+    backend.set("k", series)
+    assert backend.get("k") is series
+    assert not MemoryBackend.blocking and cache_module.SQLiteBackend.blocking
@@ -0,0 +1,49 @@
+"""RollingFeatureState must emit exactly what create_features computes"""
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from ml.feature_engineering import create_features, select_feature_columns
+from ml.incremental_features import RollingFeatureState
+
+DATA_FILE = Path(__file__).parent.parent / "ml" / "models" / "training_data_complete.csv"
+
+
+@pytest.fixture(scope="module")
+def batch() -> pd.DataFrame:
+    if not DATA_FILE.exists():
+        pytest.skip(f"{DATA_FILE} not found")
+    return create_features(pd.read_csv(DATA_FILE))
+
+
+def replay(batch: pd.DataFrame, round_trip_every: int = 0) -> np.ndarray:
+    """Feed rows through per-location states (optionally reloading them from JSON)"""
+    states = {}
+    rows = []
+    for i, row in enumerate(batch.itertuples(index=False)):
+        state = states.setdefault(row.location, RollingFeatureState(row.location))
+        if round_trip_every and i % round_trip_every == 0:
+            state = states[row.location] = RollingFeatureState.from_dict(state.to_dict())
+        rows.append(state.update(row.date, row.precipitation, row.temperature,
+                                 row.humidity, row.wind_speed))
+    return pd.DataFrame(rows, columns=select_feature_columns()).to_numpy(dtype=float)
+
+
+def test_matches_create_features(batch):
+    expected = batch[select_feature_columns()].to_numpy(dtype=float)
+    np.testing.assert_allclose(replay(batch), expected, rtol=0, atol=1e-6, equal_nan=True)
+
+
+def test_state_round_trip_keeps_parity(batch):
+    expected = batch[select_feature_columns()].to_numpy(dtype=float)
+    np.testing.assert_allclose(replay(batch, round_trip_every=5), expected, rtol=0, atol=1e-6, equal_nan=True)
+
+
+def test_rejects_out_of_order_days():
+    state = RollingFeatureState("test")
+    state.update("2024-07-02", 10.0, 27.0, 85.0, 2.0)
+    with pytest.raises(ValueError):
+        state.update("2024-07-01", 3.0, 27.0, 80.0, 2.0)
@@ -0,0 +1,55 @@
+"""Background job validation and result bookkeeping"""
+import asyncio
+from datetime import date
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+from app.jobs import SUCCEEDED, JobManager
+from app.models import MultiYearFloodRiskParams
+from app.routes import jobs as job_routes
+
+
+class _NewYearsDay(date):
+    @classmethod
+    def today(cls):
+        return cls(2026, 1, 1)
+
+
+def test_multi_year_rejects_current_year_on_jan_1(monkeypatch):
+    monkeypatch.setattr(job_routes, "date", _NewYearsDay)
+    params = MultiYearFloodRiskParams(latitude=14.6, longitude=121.0, start_year=2024, end_year=2026)
+    with pytest.raises(HTTPException) as e:
+        job_routes._validate_multi_year(params)
+    assert e.value.status_code == 400
+
+    job_routes._validate_multi_year(MultiYearFloodRiskParams(
+        latitude=14.6, longitude=121.0, start_year=2024, end_year=2025
+    ))
+
+
+def test_partial_results_dropped_once_finished():
+    async def runner(params, job):
+        job.report(0, 2)
+        job.report(1, partial={"n": 1})
+        job.report(2, partial={"n": 2})
+        return {"results": [{"n": 1}, {"n": 2}]}
+
+    async def run():
+        manager = JobManager(workers=1)
+        manager.register("demo", runner)
+        manager.start()
+        job, _ = manager.submit("demo", {})
+        while job.finished_at is None:
+            await asyncio.sleep(0.01)
+        manager.stop()
+        return job.to_dict()
+
+    body = asyncio.run(run())
+    assert body["status"] == SUCCEEDED
+    assert body["partial_results"] == []
+    assert body["result"] == {"results": [{"n": 1}, {"n": 2}]}
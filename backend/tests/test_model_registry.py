@@ -0,0 +1,106 @@
+"""Model registry version ordering and validation"""
+import asyncio
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+joblib = pytest.importorskip("joblib")
+LogisticRegression = pytest.importorskip("sklearn.linear_model").LogisticRegression
+
+from app.model_registry import METADATA_FILE, MODEL_FILE, ModelCompatibilityError, ModelRegistry
+from ml.feature_engineering import select_feature_columns
+
+
+def write_version(root, name, train_date=None, metadata=True, mtime=None):
+    path = root / "versions" / name if name != "baseline" else root
+    path.mkdir(parents=True, exist_ok=True)
+    X = pd.DataFrame(np.random.default_rng(0).normal(size=(40, len(select_feature_columns()))),
+                     columns=select_feature_columns())
+    model = LogisticRegression().fit(X, (X.iloc[:, 0] > 0).astype(int))
+    joblib.dump(model, path / MODEL_FILE)
+    if metadata:
+        meta = {"feature_columns": select_feature_columns(), "model_type": "test"}
+        if train_date:
+            meta["train_date"] = train_date
+        (path / METADATA_FILE).write_text(json.dumps(meta))
+    if mtime is not None:
+        os.utime(path / MODEL_FILE, (mtime, mtime))
+    return path
+
+
+def test_versions_are_ordered_by_train_date_not_name(tmp_path):
+    write_version(tmp_path, "baseline", "2025-10-05T10:38:35")
+    write_version(tmp_path, "v10", "2026-03-01T00:00:00")
+    write_version(tmp_path, "v2", "2026-01-01T00:00:00")
+    write_version(tmp_path, "distilled", "2026-02-01T00:00:00")
+    write_version(tmp_path, "20260401-120000-continue", "2026-04-01T12:00:00")
+    registry = ModelRegistry(str(tmp_path))
+    assert list(registry.available_versions()) == [
+        "baseline", "v2", "distilled", "v10", "20260401-120000-continue"
+    ]
+    assert registry.latest_version() == "20260401-120000-continue"
+
+
+def test_versions_without_train_date_fall_back_to_mtime(tmp_path):
+    write_version(tmp_path, "zzz-old", mtime=1_600_000_000)
+    write_version(tmp_path, "aaa-new", mtime=1_800_000_000)
+    assert ModelRegistry(str(tmp_path)).latest_version() == "aaa-new"
+
+
+def test_version_without_metadata_is_rejected(tmp_path):
+    write_version(tmp_path, "baseline", "2025-10-05T10:38:35")
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.refresh() and registry.active_version() == "baseline"
+
+    write_version(tmp_path, "bare", metadata=False)
+    with pytest.raises(ModelCompatibilityError):
+        registry.load_version("bare")
+    # The newer but unverifiable version is skipped; the active model stays
+    assert not registry.refresh()
+    assert registry.active_version() == "baseline"
+    assert registry.last_error.startswith("bare:")
+
+
+def test_predict_runs_off_the_event_loop(tmp_path):
+    write_version(tmp_path, "baseline", "2025-10-05T10:38:35")
+    registry = ModelRegistry(str(tmp_path))
+    registry.refresh()
+    days = 20
+    dates = [f"2024-07-{d:02d}" for d in range(1, days + 1)]
+    result = asyncio.run(registry.predict([10.0] * days, [27.0] * days, [85.0] * days, [2.0] * days, dates))
+    assert result["model_version"] == "baseline"
+    assert 0.0 <= result["flood_probability"] <= 1.0
+
+
+def test_active_tag_changes_when_a_version_is_rewritten_in_place(tmp_path):
+    write_version(tmp_path, "baseline", "2025-10-05T10:38:35", mtime=1_700_000_000)
+    registry = ModelRegistry(str(tmp_path))
+    registry.refresh()
+    before = registry.active_tag()
+
+    write_version(tmp_path, "baseline", "2025-10-05T10:38:35", mtime=1_700_000_100)
+    assert registry.refresh()
+    assert registry.active_version() == "baseline"
+    assert registry.active_tag() != before
+
+
+def test_failing_model_does_not_fail_the_assessment(fake_upstream, monkeypatch):
+    pytest.importorskip("httpx")
+    from app import upstream
+    from app.models import FloodRiskRequest
+    from app.routes import flood_risk
+
+    async def broken(*args, **kwargs):
+        raise ValueError("feature mismatch")
+
+    monkeypatch.setattr(upstream, "NASA_POWER_URL", f"{fake_upstream.url}/power")
+    monkeypatch.setattr(flood_risk, "EARTHDATA_JWT", None)
+    monkeypatch.setattr(flood_risk.registry, "predict", broken)
+    req = FloodRiskRequest(start_date="2024-05-01", end_date="2024-05-10", latitude=14.6, longitude=121.0)
+
+    body = asyncio.run(flood_risk.compute_assessment(req, None))
+    assert body["ml_prediction"] is None
+    assert body["flood_risk"]["level"] in ("HIGH", "MEDIUM", "LOW")
@@ -0,0 +1,90 @@
+"""Profiling opt-in, debug endpoint access and slow-log / profile retention"""
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.routes import debug
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(debug, "PROFILE_TOKEN", "s3cret")
+    return "s3cret"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(debug.router, prefix="/api/debug")
+    return TestClient(app)
+
+
+def test_header_ignored_without_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+    assert not profiling._wants_profile("/api/flood-risk", "1")
+
+
+def test_header_must_carry_token(token):
+    assert profiling._wants_profile("/api/flood-risk", token)
+    assert not profiling._wants_profile("/api/flood-risk", "1")
+    assert not profiling._wants_profile("/api/power", token)
+
+
+def test_debug_endpoints_disabled_without_token(monkeypatch, client):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    monkeypatch.setattr(debug, "PROFILE_TOKEN", None)
+    assert client.get("/api/debug/slow-requests").status_code == 404
+
+
+def test_debug_endpoints_require_token(token, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_LOG", str(tmp_path / "slow.jsonl"))
+    assert client.get("/api/debug/slow-requests").status_code == 403
+    assert client.get("/api/debug/slow-requests", headers={"X-Profile-Token": "nope"}).status_code == 403
+    ok = client.get("/api/debug/slow-requests", headers={"X-Profile-Token": token})
+    assert ok.status_code == 200
+    assert client.get("/api/debug/slow-requests?limit=0", headers={"X-Profile-Token": token}).status_code == 422
+
+
+def test_recent_slow_requests_reads_tail(tmp_path, monkeypatch):
+    log = tmp_path / "slow.jsonl"
+    log.write_text("".join(json.dumps({"n": i}) + "\n" for i in range(10)))
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_LOG", str(log))
+
+    assert [r["n"] for r in profiling.recent_slow_requests(3)] == [9, 8, 7]
+    with pytest.raises(ValueError):
+        profiling.recent_slow_requests(0)
+
+
+def test_slow_log_rotates(tmp_path, monkeypatch):
+    log = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_LOG", str(log))
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_LOG_MAX_BYTES", 1)
+    trace = profiling.RequestTrace("GET", "/api/flood-risk", "")
+
+    profiling._log_slow_request(trace, 200, 2500.0, None)
+    profiling._log_slow_request(trace, 200, 2600.0, None)
+
+    assert len(log.read_text().splitlines()) == 1
+    assert json.loads((tmp_path / "slow.jsonl.1").read_text())["duration_ms"] == 2500.0
+
+
+def test_profiles_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+    for i in range(4):
+        (tmp_path / f"2020010{i}T000000-0000000{i}.speedscope.json").write_text("{}")
+    profiler = profiling.SamplingProfiler(0)
+    trace = profiling.RequestTrace("GET", "/api/flood-risk", "")
+
+    name = profiling._write_profile(profiler, trace)
+
+    assert profiling.list_profiles() == [name, "20200103T000000-00000003.speedscope.json"]
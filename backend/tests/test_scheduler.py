@@ -0,0 +1,74 @@
+"""Rate scheduler behaviour while a host is backing off after a 429"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from app import upstream
+from app.scheduler import BATCH, INTERACTIVE, HostBlockedError, HostScheduler, get_scheduler
+
+
+def test_interactive_fails_fast_while_blocked():
+    async def run():
+        scheduler = HostScheduler("example.org", rate=100.0, burst=5)
+        scheduler.backoff(30)
+        started = time.monotonic()
+        with pytest.raises(HostBlockedError):
+            await scheduler.acquire(INTERACTIVE)
+        return time.monotonic() - started, scheduler.stats()
+
+    elapsed, stats = asyncio.run(run())
+    assert elapsed < 0.1
+    assert stats["rejected_while_blocked"] == 1
+
+
+def test_batch_waits_out_the_block():
+    async def run():
+        scheduler = HostScheduler("example.org", rate=100.0, burst=5)
+        scheduler.backoff(0.2)
+        started = time.monotonic()
+        await scheduler.acquire(BATCH)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.15
+
+
+def test_backoff_fails_interactive_calls_already_queued():
+    async def run():
+        scheduler = HostScheduler("example.org", rate=1.0, burst=1)
+        await scheduler.acquire(INTERACTIVE)  # drain the only token
+        interactive = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        batch = asyncio.create_task(scheduler.acquire(BATCH))
+        await asyncio.sleep(0.01)
+        scheduler.backoff(0.3)
+        with pytest.raises(HostBlockedError):
+            await interactive
+        await batch
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["granted"]["batch"] == 1
+
+
+def test_fetch_power_serves_stale_data_while_blocked(fake_upstream, monkeypatch):
+    url = f"{fake_upstream.url}/power"
+    monkeypatch.setattr(upstream, "NASA_POWER_URL", url)
+    params = {"parameters": "PRECTOTCORR", "community": "AG", "latitude": 14.6, "longitude": 121.0,
+              "start": "20240701", "end": "20240707", "format": "JSON"}
+
+    async def run():
+        fresh, stale_age = await upstream.fetch_power(params)
+        assert stale_age is None
+        monkeypatch.setattr(upstream, "POWER_FRESH_TTL", 0)
+        get_scheduler(url).backoff(60)
+        started = time.monotonic()
+        served, stale_age = await upstream.fetch_power(params)
+        return fresh, served, stale_age, time.monotonic() - started
+
+    fresh, served, stale_age, elapsed = asyncio.run(run())
+    assert stale_age is not None and elapsed < 0.5
+    assert served.values("PRECTOTCORR").tolist() == fresh.values("PRECTOTCORR").tolist()
+    assert len(fake_upstream.calls("/power")) == 1
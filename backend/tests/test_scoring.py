@@ -0,0 +1,86 @@
+"""score_locations must agree with the original per-request scoring rules"""
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.scoring import GEO_REGIONS, score_locations
+
+
+def scalar_score(latitude, longitude, precip_data, humidity_data, temp_data, imerg_granules):
+    """The rules as /api/flood-risk evaluated them before vectorization"""
+    precip_values = [v for v in precip_data if v is not None and v >= 0]
+    avg_precip = sum(precip_values) / len(precip_values) if precip_values else 0
+    max_precip = max(precip_values) if precip_values else 0
+    humidity_values = [v for v in humidity_data if v is not None]
+    avg_humidity = sum(humidity_values) / len(humidity_values) if humidity_values else 0
+    temp_values = [v for v in temp_data if v is not None]
+    avg_temp = sum(temp_values) / len(temp_values) if temp_values else None
+
+    precip_risk = 0
+    if max_precip > 100:
+        precip_risk += 40
+    elif max_precip > 50:
+        precip_risk += 25
+    elif max_precip > 20:
+        precip_risk += 10
+    if avg_precip > 50:
+        precip_risk += 20
+    elif avg_precip > 20:
+        precip_risk += 10
+
+    humidity_bonus = 10 if avg_humidity > 80 else 3 if avg_humidity > 70 else 0
+
+    geo_modifier, location_bonus = 1.0, 0
+    for (lat_min, lat_max), (lon_min, lon_max), modifier, bonus, _ in GEO_REGIONS:
+        if lat_min <= latitude <= lat_max and lon_min <= longitude <= lon_max:
+            geo_modifier, location_bonus = modifier, bonus
+            break
+
+    score = int((precip_risk * geo_modifier) + humidity_bonus + location_bonus)
+    score = max(0, min(100, score))
+    if imerg_granules > 0:
+        score += 3
+    level = "HIGH" if score >= 60 else "MEDIUM" if score >= 30 else "LOW"
+    return {"score": score, "level": level, "avg_precip": avg_precip, "max_precip": max_precip,
+            "avg_humidity": avg_humidity, "avg_temp": avg_temp}
+
+
+def random_series(rng, days, low, high, missing):
+    values = np.round(rng.uniform(low, high, days), 2).tolist()
+    return [None if rng.random() < missing else v for v in values]
+
+
+def test_matches_scalar_rules():
+    rng = np.random.default_rng(7)
+    n, days = 300, 30
+    latitudes = rng.uniform(8.5, 17.5, n)
+    longitudes = rng.uniform(119.5, 125.5, n)
+    precip = [random_series(rng, days, -5, 140, 0.1) for _ in range(n)]
+    humidity = [random_series(rng, days, 55, 99, 0.1) for _ in range(n)]
+    temp = [random_series(rng, days, 18, 34, 0.1) for _ in range(n)]
+    granules = rng.integers(0, 3, n)
+
+    def matrix(rows):
+        return np.array([[np.nan if v is None else v for v in row] for row in rows])
+
+    scores = score_locations(latitudes, longitudes, matrix(precip), matrix(humidity),
+                             matrix(temp), granules)
+    for i in range(n):
+        expected = scalar_score(latitudes[i], longitudes[i], precip[i], humidity[i], temp[i], granules[i])
+        assert scores["score"][i] == expected["score"]
+        assert scores["level"][i] == expected["level"]
+        # Sequential cumsum vs sum(): identical before Python 3.12, within ulps after
+        assert math.isclose(scores["avg_precip"][i], expected["avg_precip"], rel_tol=1e-12, abs_tol=1e-12)
+        assert scores["max_precip"][i] == expected["max_precip"]
+        assert math.isclose(scores["avg_humidity"][i], expected["avg_humidity"], rel_tol=1e-12)
+        assert math.isclose(scores["avg_temp"][i], expected["avg_temp"], rel_tol=1e-12)
+
+
+def test_empty_series():
+    scores = score_locations([14.6], [121.0], np.full((1, 3), np.nan), np.full((1, 3), np.nan))
+    assert scores["power_days"][0] == 0
+    assert scores["avg_precip"][0] == 0.0 and scores["max_precip"][0] == 0.0
+    assert math.isnan(scores["avg_temp"][0])
+    assert scores["level"][0] == "LOW"
@@ -0,0 +1,95 @@
+"""SeriesIndex range summaries against direct scans"""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.series import DailySeries, SeriesIndex
+from app.scoring import score_locations
+
+
+def _series(n: int = 400, seed: int = 7) -> DailySeries:
+    rng = np.random.default_rng(seed)
+    precip = np.round(rng.gamma(0.6, 12.0, n), 2)
+    precip[rng.random(n) < 0.1] = np.nan
+    temp = np.round(rng.normal(27, 2, n), 2)
+    humidity = np.round(rng.uniform(60, 99, n), 2)
+    return DailySeries("20230101", {"PRECTOTCORR": precip, "T2M": temp, "RH2M": humidity})
+
+
+def test_window_summaries_match_direct_scan():
+    series = _series()
+    index = SeriesIndex(series)
+    rng = random.Random(3)
+    for _ in range(200):
+        lo = rng.randrange(len(series))
+        hi = rng.randrange(lo, len(series))
+        got = index.summary("PRECTOTCORR", lo, hi)
+        window = series.values("PRECTOTCORR")[lo:hi + 1]
+        valid = window[~np.isnan(window)]
+        assert got["count"] == len(valid)
+        if len(valid):
+            # Prefix-sum differences can land either side of a rounding boundary
+            assert got["mean"] == pytest.approx(float(valid.sum() / len(valid)), abs=0.005 + 1e-9)
+            assert got["max"] == round(float(valid.max()), 2)
+
+
+def test_full_window_matches_scoring_summary():
+    series = _series()
+    stats = SeriesIndex(series).window_summary(series.start, series.end)["parameters"]
+    scores = score_locations(
+        [14.6], [121.0],
+        precipitation=series.values("PRECTOTCORR")[np.newaxis, :],
+        humidity=series.values("RH2M")[np.newaxis, :],
+        temperature=series.values("T2M")[np.newaxis, :],
+    )
+    assert stats["PRECTOTCORR"]["max"] == round(float(scores["max_precip"][0]), 2)
+    for name, key in (("PRECTOTCORR", "avg_precip"), ("RH2M", "avg_humidity"), ("T2M", "avg_temp")):
+        assert stats[name]["mean"] == pytest.approx(float(scores[key][0]), abs=0.005 + 1e-9)
+
+
+def test_negative_precipitation_is_ignored_as_in_scoring():
+    from app.routes.flood_risk import _climate_summary, _scored_climate_summary
+
+    precip = _series().values("PRECTOTCORR").astype(float)
+    precip[::17] = -3.5
+    series = DailySeries("20230101", {"PRECTOTCORR": precip, "T2M": np.full(len(precip), 27.0),
+                                      "RH2M": np.full(len(precip), 80.0)})
+    stats = SeriesIndex(series).window_summary(series.start, series.end)["parameters"]
+    scores = score_locations(
+        [14.6], [121.0],
+        precipitation=series.values("PRECTOTCORR")[np.newaxis, :],
+        humidity=series.values("RH2M")[np.newaxis, :],
+        temperature=series.values("T2M")[np.newaxis, :],
+    )
+    assert stats["PRECTOTCORR"]["count"] == int(scores["power_days"][0])
+    windowed, scored = _climate_summary(stats), _scored_climate_summary(scores, len(series))
+    assert windowed.keys() == scored.keys()
+    for key in scored:
+        assert windowed[key] == pytest.approx(scored[key], abs=0.005 + 1e-9)
+
+
+def test_scored_summary_without_data_reports_none():
+    from app.routes.flood_risk import _scored_climate_summary
+
+    empty = np.full((1, 5), np.nan)
+    scores = score_locations([14.6], [121.0], precipitation=empty, humidity=empty, temperature=empty)
+    assert set(_scored_climate_summary(scores, 0).values()) == {None}
+
+
+def test_index_builds_only_queried_parameters():
+    series = _series()
+    index = SeriesIndex(series)
+    index.window_summary(series.start, series.end, ["T2M"])
+    assert list(index._sums) == ["T2M"]
+    assert index.summary("WS2M", 0, 10)["count"] == 0
+
+
+def test_windows_without_data_report_none():
+    from app.routes.flood_risk import _climate_summary
+
+    series = _series()
+    stats = SeriesIndex(series).window_summary("20300101", "20300110", ["PRECTOTCORR", "RH2M", "T2M"])
+    assert stats["days"] == 0
+    assert set(_climate_summary(stats["parameters"]).values()) == {None}
@@ -0,0 +1,32 @@
+"""Synthetic data is reproducible from its seed, whatever the chunk size"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from ml.synthetic_data import iter_synthetic_data, synthetic_locations, write_synthetic_data
+
+
+def _generate(seed: int = 7, chunk_rows: int = 1_000_000) -> pd.DataFrame:
+    locations = synthetic_locations(5, seed)
+    chunks = list(iter_synthetic_data(locations, "2021-01-01", "2021-03-31", seed, chunk_rows))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def test_same_seed_gives_identical_data():
+    pd.testing.assert_frame_equal(_generate(), _generate())
+    assert not _generate(seed=8).equals(_generate())
+
+
+def test_output_does_not_depend_on_chunk_size():
+    whole = _generate()
+    for chunk_rows in (1, 90, 200):
+        pd.testing.assert_frame_equal(_generate(chunk_rows=chunk_rows), whole)
+
+
+def test_written_file_matches_stream(tmp_path):
+    output = tmp_path / "synthetic.csv"
+    rows = write_synthetic_data(str(output), n_locations=5, start="2021-01-01", end="2021-03-31",
+                                seed=7, chunk_rows=100)
+    written = pd.read_csv(output)
+    assert rows == len(written) == len(_generate())
+    assert written["flood_occurred"].tolist() == _generate()["flood_occurred"].tolist()
@@ -0,0 +1,30 @@
+"""Out-of-core training end to end on a small synthetic dataset"""
+import json
+
+import joblib
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("xgboost")
+
+from ml.feature_engineering import create_features, select_feature_columns
+from ml.synthetic_data import write_synthetic_data
+from ml.train_external import train_flood_model_external
+
+
+def test_external_training_saves_a_usable_model(tmp_path, recwarn):
+    data_file = tmp_path / "synthetic.csv"
+    write_synthetic_data(str(data_file), n_locations=6, start="2021-01-01", end="2021-12-31", seed=3)
+    model_file = tmp_path / "model" / "flood_model.pkl"
+
+    train_flood_model_external(str(data_file), model_output=str(model_file),
+                               batch_rows=500, chunksize=1000, n_estimators=10)
+
+    assert not [w for w in recwarn if "External memory cache file" in str(w.message)]
+    model = joblib.load(model_file)
+    features = create_features(pd.read_csv(data_file).head(400)).dropna()[select_feature_columns()]
+    proba = model.predict_proba(features)
+    assert proba.shape == (len(features), 2)
+    assert ((proba >= 0) & (proba <= 1)).all()
+    metadata = json.loads(model_file.with_suffix(".json").read_text())
+    assert metadata["feature_columns"] == select_feature_columns()
@@ -0,0 +1,143 @@
+"""Incremental model updates keep a cumulative labeled history"""
+import shutil
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("xgboost")
+
+import joblib
+
+from ml.feature_engineering import select_feature_columns
+from ml.update_model import boost_incrementally, continuity_problems, new_feature_rows, update_flood_model
+
+MODELS_DIR = Path(__file__).resolve().parents[1] / "ml" / "models"
+
+
+@pytest.fixture(scope="module")
+def data():
+    df = pd.read_csv(MODELS_DIR / "training_data_complete.csv")
+    df['date'] = pd.to_datetime(df['date'])
+    cut = df['date'].max() - pd.Timedelta(days=40)
+    return df[df['date'] <= cut], df[df['date'] > cut]
+
+
+def _days(df, first: int, last: int):
+    start = df['date'].min()
+    return df[(df['date'] >= start + pd.Timedelta(days=first)) & (df['date'] < start + pd.Timedelta(days=last))]
+
+
+def test_continuity_problems_flags_gaps_and_overlaps(data):
+    history, later = data
+    assert continuity_problems(history, _days(later, 0, 10)) == []
+    gap = continuity_problems(history, _days(later, 3, 10))
+    assert len(gap) == history['location'].nunique()
+    assert "history ends" in gap[0]
+    inner_gap = pd.concat([_days(later, 0, 3), _days(later, 5, 10)])
+    assert all("skip or repeat" in p for p in continuity_problems(history, inner_gap))
+
+
+def test_accepted_batches_accumulate(data, tmp_path):
+    history, later = data
+    history_file = tmp_path / "history.csv"
+    history.assign(date=history['date'].dt.strftime('%Y-%m-%d')).to_csv(history_file, index=False)
+    model_file = tmp_path / "flood_model.pkl"
+    shutil.copy(MODELS_DIR / "flood_model.pkl", model_file)
+    labeled_file = tmp_path / "labeled.csv"
+
+    for i, (first, last) in enumerate([(0, 20), (20, 40)]):
+        batch_file = tmp_path / f"batch{i}.csv"
+        batch = _days(later, first, last)
+        batch.assign(date=batch['date'].dt.strftime('%Y-%m-%d')).to_csv(batch_file, index=False)
+        summary = update_flood_model(
+            str(batch_file),
+            history_file=str(history_file) if i == 0 else None,
+            model_file=str(model_file),
+            output_dir=str(tmp_path / f"out{i}"),
+            labeled_file=str(labeled_file),
+        )
+        assert summary['decision'] == 'incremental'
+
+    assert len(pd.read_csv(labeled_file)) == len(history) + len(later)
+
+    stale = tmp_path / "stale.csv"
+    _days(later, 0, 5).to_csv(stale, index=False)
+    with pytest.raises(ValueError, match="history ends"):
+        update_flood_model(str(stale), model_file=str(model_file), labeled_file=str(labeled_file),
+                           output_dir=str(tmp_path / "out-stale"))
+
+
+def _write(df, path):
+    df.assign(date=pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "flood_model.pkl"
+    shutil.copy(MODELS_DIR / "flood_model.pkl", path)
+    return str(path)
+
+
+def test_refresh_mode_refits_leaves_only(data):
+    history, later = data
+    rows = new_feature_rows(history, _days(later, 0, 20))
+    X, y = rows[select_feature_columns()], rows['flood_occurred']
+    model = joblib.load(MODELS_DIR / "flood_model.pkl")
+
+    refreshed = boost_incrementally(model, X, y, mode="refresh")
+
+    rounds = model.get_booster().num_boosted_rounds()
+    assert refreshed.get_booster().num_boosted_rounds() == rounds
+    assert refreshed.get_params()['max_depth'] == model.get_params()['max_depth']
+    proba = refreshed.predict_proba(X)
+    assert proba.shape == (len(X), 2)
+    assert not np.allclose(proba, model.predict_proba(X))
+
+
+@pytest.mark.parametrize("batch_days", [1, 7, 20])
+def test_routine_batches_update_incrementally(data, tmp_path, model_file, batch_days):
+    history, later = data
+    summary = update_flood_model(
+        _write(_days(later, 0, batch_days), tmp_path / "batch.csv"),
+        history_file=_write(history, tmp_path / "history.csv"),
+        model_file=model_file,
+        output_dir=str(tmp_path / "out"), labeled_file=str(tmp_path / "labeled.csv"),
+    )
+    assert not summary['drift_enforced']
+    assert summary['decision'] == 'incremental', summary['reason']
+
+
+def test_refresh_on_a_short_batch_is_caught_by_the_guard(data, tmp_path, model_file):
+    # Leaves re-fit on a few weeks of rows forget the original data
+    history, later = data
+    summary = update_flood_model(
+        _write(_days(later, 0, 20), tmp_path / "batch.csv"),
+        history_file=_write(history, tmp_path / "history.csv"),
+        model_file=model_file, mode="refresh",
+        output_dir=str(tmp_path / "out"), labeled_file=str(tmp_path / "labeled.csv"),
+    )
+    assert summary['after']['original_holdout']['f1'] < summary['before']['original_holdout']['f1']
+    assert summary['decision'] == 'full_retrain'
+    assert "original held-out split" in summary['reason']
+
+
+def test_shifted_batch_triggers_full_retrain(tmp_path, model_file):
+    df = pd.read_csv(MODELS_DIR / "training_data_complete.csv")
+    df['date'] = pd.to_datetime(df['date'])
+    cut = df['date'].max() - pd.Timedelta(days=120)
+    history, batch = df[df['date'] <= cut], df[df['date'] > cut].copy()
+    batch['precipitation'] = batch['precipitation'] * 4 + 40
+
+    summary = update_flood_model(
+        _write(batch, tmp_path / "batch.csv"),
+        history_file=_write(history, tmp_path / "history.csv"),
+        model_file=model_file,
+        output_dir=str(tmp_path / "out"), labeled_file=str(tmp_path / "labeled.csv"),
+    )
+    assert summary['drift_enforced']
+    assert summary['drift_psi']['precipitation'] > 0.25
+    assert summary['decision'] == 'full_retrain'
+    assert summary['reason'].startswith("input drift")
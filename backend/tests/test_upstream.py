@@ -0,0 +1,45 @@
+"""POWER cache keys: points in one grid cell share an entry"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+
+from app import upstream
+from app.upstream import _power_cache_key
+
+BASE = {"community": "AG", "start": "20240301", "end": "20240307", "format": "JSON"}
+
+
+def _params(parameters: str, latitude: float, longitude: float) -> dict:
+    return {**BASE, "parameters": parameters, "latitude": latitude, "longitude": longitude}
+
+
+def test_points_in_one_cell_share_a_key():
+    a = _power_cache_key(_params("T2M,PRECTOTCORR,RH2M,WS2M", 14.6, 121.0))
+    b = _power_cache_key(_params("T2M,PRECTOTCORR,RH2M,WS2M", 14.7, 121.1))
+    c = _power_cache_key(_params("T2M,PRECTOTCORR,RH2M,WS2M", 15.0, 121.0))
+    assert a == b
+    assert a != c
+
+
+def test_non_meteorology_parameters_keep_exact_point():
+    # Solar parameters come from a different grid than MERRA-2 meteorology
+    for parameters in ("ALLSKY_SFC_SW_DWN", "T2M,ALLSKY_SFC_SW_DWN"):
+        a = _power_cache_key(_params(parameters, 14.6, 121.0))
+        b = _power_cache_key(_params(parameters, 14.7, 121.1))
+        assert a != b
+
+
+def test_fetch_power_serves_cell_neighbours_from_one_call(fake_upstream, monkeypatch):
+    monkeypatch.setattr(upstream, "NASA_POWER_URL", f"{fake_upstream.url}/power")
+
+    async def run():
+        first, _ = await upstream.fetch_power(_params("T2M,PRECTOTCORR", 14.6, 121.0))
+        second, _ = await upstream.fetch_power(_params("T2M,PRECTOTCORR", 14.7, 121.1))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(fake_upstream.calls("/power")) == 1
+    assert second.daily_records() == first.daily_records()
@@ -266,7 +266,7 @@ const Dashboard = () => {
                       <div className="text-white font-nasa-body font-bold">
                         {selectedMarker 
                           ? `${selectedMarker.data.precipitation?.toFixed(2) || 'N/A'}mm`
-                          : `${floodData.climate_summary.avg_precipitation_mm}mm`
+                          : `${floodData.climate_summary.avg_precipitation_mm ?? 'N/A'}mm`
                         }
                       </div>
                     </div>
@@ -275,7 +275,7 @@ const Dashboard = () => {
                       <div className="text-white font-nasa-body font-bold">
                         {selectedMarker 
                           ? `${selectedMarker.data.temperature?.toFixed(2) || 'N/A'}°C`
-                          : `${floodData.climate_summary.avg_temperature_c}°C`
+                          : `${floodData.climate_summary.avg_temperature_c ?? 'N/A'}°C`
                         }
                       </div>
                     </div>
@@ -372,7 +372,7 @@ const Dashboard = () => {
                           <span className="text-white font-medium">
                             {selectedMarker 
                               ? `${selectedMarker.data.max_precipitation?.toFixed(2) || 'N/A'}mm`
-                              : `${floodData.climate_summary.max_precipitation_mm}mm`
+                              : `${floodData.climate_summary.max_precipitation_mm ?? 'N/A'}mm`
                             }
                           </span>
                         </div>
@@ -381,7 +381,7 @@ const Dashboard = () => {
                           <span className="text-white font-medium">
                             {selectedMarker 
                               ? `${selectedMarker.data.humidity?.toFixed(2) || '65.00'}%`
-                              : `${floodData.climate_summary.avg_humidity_percent}%`
+                              : `${floodData.climate_summary.avg_humidity_percent ?? 'N/A'}%`
                             }
                           </span>
                         </div>